@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+"""
+Month-close batch job: allowance reports for every department and month of
+a financial year.
+
+Each (department, month, type) task runs in a worker process that imports the
+app once and reads the rota store read-only. The app is imported with
+ROTA_BACKGROUND_WORKERS=0, so neither the batch nor its workers start the
+notification queue, the reset token sweeper or the journal compactor.
+Rosters come from the department configuration, as on the rota pages; by
+default every department with employees is reported. Tasks for the same
+department-month are handed to the same worker, so EST, PST and Weekend share
+one scan of the window. Every task writes a CSV (same layout as
+/export-allowances) and a JSON file to <data dir>/reports/FY<year>-<yy>/<department>/.
+
+Usage: python allowance_batch.py 2025 [--departments "Service Desk" ...]
+                                      [--types EST PST Weekend] [--workers N]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Dict, List, Optional, Sequence, Tuple
+
+ALLOWANCE_TYPES = ('EST', 'PST', 'Weekend')
+# The app's data directory (ROTA_DATA_DIR, as in app.py)
+DATA_DIR = os.environ.get('ROTA_DATA_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data'))
+REPORTS_DIR = os.path.join(DATA_DIR, 'reports')
+
+Task = Tuple[str, int, int, str]  # (department, month, year, allowance type)
+
+_app = None
+
+
+def financial_year_months(year: int, start_month: int = 4) -> List[Tuple[int, int]]:
+    """(month, year) for the twelve months of the financial year starting in start_month of year"""
+    months = []
+    for i in range(12):
+        month = (start_month - 1 + i) % 12 + 1
+        months.append((month, year + (start_month - 1 + i) // 12))
+    return months
+
+
+def _init_worker() -> None:
+    # Reports only read the store; background work stays with the web app
+    os.environ['ROTA_BACKGROUND_WORKERS'] = '0'
+    global _app
+    import app
+    _app = app
+
+
+def run_task(task: Task, out_dir: str) -> Tuple[Task, float, List[str]]:
+    """Compute one report and write its CSV and JSON files, return (task, seconds, paths)"""
+    dept, month, year, allowance_type = task
+    started = time.perf_counter()
+    if allowance_type == 'Weekend':
+        data = _app.calculate_weekend_allowances(dept, month, year)
+        csv_text = _app.generate_weekend_allowances_csv(data)
+    else:
+        data = _app.calculate_night_shift_allowances(dept, month, year, allowance_type)
+        csv_text = _app.generate_night_shift_csv(data, allowance_type)
+
+    dept_dir = os.path.join(out_dir, dept)
+    os.makedirs(dept_dir, exist_ok=True)
+    base = os.path.join(dept_dir, f"{dept}_{allowance_type}_Allowances_{year}-{month:02d}")
+    with open(base + '.csv', 'w', encoding='utf-8', newline='') as f:
+        f.write(csv_text)
+    with open(base + '.json', 'w', encoding='utf-8') as f:
+        # Weekend entries carry date objects
+        json.dump(data, f, indent=2, default=lambda value: value.isoformat())
+    return task, time.perf_counter() - started, [base + '.csv', base + '.json']
+
+
+def run_batch(year: int, departments: Optional[Sequence[str]] = None, types: Sequence[str] = ALLOWANCE_TYPES,
+              workers: Optional[int] = None, reports_dir: str = REPORTS_DIR,
+              start_month: int = 4) -> Dict:
+    """Run every (department, month, type) task of a financial year on a process pool"""
+    if departments is None:
+        _init_worker()
+        departments = [name for name, dept in _app.get_current_departments().items()
+                       if any(dept.get('processes', {}).values())]
+    out_dir = os.path.join(reports_dir, f"FY{year}-{(year + 1) % 100:02d}")
+    tasks: List[Task] = [
+        (dept, month, month_year, allowance_type)
+        for dept in departments
+        for month, month_year in financial_year_months(year, start_month)
+        for allowance_type in types
+    ]
+
+    started = time.perf_counter()
+    # spawn: the parent may already run app threads, which fork would copy half-way
+    with ProcessPoolExecutor(max_workers=workers, mp_context=get_context('spawn'),
+                             initializer=_init_worker) as pool:
+        # One chunk per department-month keeps its types on one worker
+        results = list(pool.map(run_task, tasks, [out_dir] * len(tasks), chunksize=len(types)))
+    wall = time.perf_counter() - started
+
+    return {
+        'out_dir': out_dir,
+        'tasks': len(tasks),
+        'files': [path for _, _, paths in results for path in paths],
+        'wall_seconds': wall,
+        'task_seconds': {task: seconds for task, seconds, _ in results},
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Allowance reports for a whole financial year")
+    parser.add_argument('year', type=int, help='Calendar year the financial year starts in')
+    parser.add_argument('--departments', nargs='+', help='Defaults to every department with employees')
+    parser.add_argument('--types', nargs='+', choices=ALLOWANCE_TYPES, default=list(ALLOWANCE_TYPES))
+    parser.add_argument('--workers', type=int, help='Worker processes (default: CPU count)')
+    parser.add_argument('--start-month', type=int, default=4, help='First month of the financial year (default: 4)')
+    parser.add_argument('--out', default=REPORTS_DIR, help='Reports directory (default: reports in the data directory)')
+    args = parser.parse_args()
+
+    print(f"📊 Allowance batch for FY{args.year}-{(args.year + 1) % 100:02d}")
+    print("=" * 50)
+    summary = run_batch(args.year, args.departments, args.types, args.workers, args.out, args.start_month)
+
+    task_seconds = summary['task_seconds']
+    by_type: Dict[str, float] = {}
+    for (_, _, _, allowance_type), seconds in task_seconds.items():
+        by_type[allowance_type] = by_type.get(allowance_type, 0.0) + seconds
+    for allowance_type, seconds in by_type.items():
+        print(f"{allowance_type:>8}: {seconds:7.2f} s of worker time")
+    slowest = max(task_seconds.items(), key=lambda item: item[1], default=None)
+    if slowest:
+        (dept, month, year, allowance_type), seconds = slowest
+        print(f" slowest: {dept} {allowance_type} {year}-{month:02d} ({seconds:.2f} s)")
+    busy = sum(task_seconds.values())
+    print(f"\n✓ {summary['tasks']} reports, {len(summary['files'])} files in {summary['out_dir']}")
+    print(f"  {summary['wall_seconds']:.2f} s wall clock, {busy:.2f} s in tasks "
+          f"({busy / summary['wall_seconds']:.1f}x parallel)")
+
+
+if __name__ == "__main__":
+    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+    main()
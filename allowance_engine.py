@@ -0,0 +1,205 @@
+"""
+Array-based allowance calculations over a RotaGrid.
+
+The allowance window (26th to 25th) is loaded as an employees x days grid of
+shift codes. A lookup table per code answers "is this an EST/PST shift" or
+"is this a day off", and default shifts fill the cells without a saved
+value. Night-shift day counts and Saturday/Sunday weekend units are then
+computed for the whole matrix at once.
+
+NumPy is optional: when it is installed the masks and sums are vectorised,
+otherwise the same tables are applied row by row in pure Python. Both paths
+return exactly the dicts the allowance pages and CSV export expect.
+"""
+from typing import Dict, Iterable, List, Sequence
+
+from rota_calendar import DateTable
+from rota_grid import RotaGrid
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency, see module docstring
+    np = None
+
+# Shifts that do not count as a worked weekend day
+NON_WORK_SHIFTS = ('WO', 'PL', 'AL', 'Holiday')
+
+
+def _shift_flags(grid: RotaGrid, table: DateTable, groups: Sequence[Iterable[str]]):
+    """
+    rows x dates matrix of bit flags, bit i set where the effective shift is
+    in groups[i]. Every cell is classified once however many groups there are.
+    """
+    groups = [set(group) for group in groups]
+
+    def flags_of(shift: str) -> int:
+        return sum(1 << i for i, group in enumerate(groups) if shift in group)
+
+    code_flags = [0] + [flags_of(shift) for shift in grid.shift_table[1:]]
+    default_flags = [flags_of(shift) for shift in table.default_shifts]
+    if np is not None:
+        codes = np.frombuffer(grid.codes, dtype=np.uint8).reshape(len(grid.rows), grid.width)
+        flags = np.array(code_flags, dtype=np.uint8)[codes]
+        return np.where(codes == 0, np.array(default_flags, dtype=np.uint8), flags)
+    width = grid.width
+    return [
+        [code_flags[code] if code else default_flags[c] for c, code in enumerate(grid.codes[base:base + width])]
+        for base in range(0, len(grid.rows) * width, width)
+    ]
+
+
+def _flag_mask(flags, bit: int, invert: bool = False):
+    """Boolean matrix of one flag bit out of _shift_flags"""
+    value = 1 << bit
+    if np is not None:
+        mask = (flags & value) != 0
+        return ~mask if invert else mask
+    return [[bool(cell & value) != invert for cell in row] for row in flags]
+
+
+def _shift_mask(grid: RotaGrid, table: DateTable, shifts: Iterable[str]):
+    """rows x dates booleans: True where the effective shift is one of shifts"""
+    return _flag_mask(_shift_flags(grid, table, [shifts]), 0)
+
+
+def _effective_shift(grid: RotaGrid, table: DateTable, r: int, c: int) -> str:
+    return grid.get(r, c) or table.default_shifts[c]
+
+
+def night_shift_employees(grid: RotaGrid, table: DateTable, target_shifts: Sequence[str]) -> Dict[str, Dict]:
+    """
+    Days on one of target_shifts per employee, as
+    {employee: {'dates': [{'date', 'shift', 'weekday'}], 'total_days': n}},
+    leaving out employees with none
+    """
+    return _night_shift_from_mask(grid, table, _shift_mask(grid, table, target_shifts))
+
+
+def _night_shift_from_mask(grid: RotaGrid, table: DateTable, mask) -> Dict[str, Dict]:
+    # Matching columns per row, in date order
+    hits: Dict[int, List[int]] = {}
+    if np is not None:
+        hit_rows, hit_cols = np.nonzero(mask)
+        for r, c in zip(hit_rows.tolist(), hit_cols.tolist()):
+            hits.setdefault(r, []).append(c)
+    else:
+        for r, row in enumerate(mask):
+            columns = [c for c, hit in enumerate(row) if hit]
+            if columns:
+                hits[r] = columns
+
+    employee_data: Dict[str, Dict] = {}
+    for row in grid.rows:
+        # Repeated (process, employee) rows all read the last copy, as the grid stores them
+        r = grid.row_index[row]
+        dates: List[Dict] = [{
+            'date': table.date_strs[c],
+            'shift': _effective_shift(grid, table, r, c),
+            'weekday': table.weekday_labels[c]
+        } for c in hits.get(r, ())]
+        # An employee listed under several processes keeps the last process's result
+        employee_data[row[1]] = {'dates': dates, 'total_days': len(dates)}
+    return {emp: data for emp, data in employee_data.items() if data['total_days'] > 0}
+
+
+def _weekend_units(worked, table: DateTable):
+    """Per row, a list with 0, 1 or 2 worked days for each of table.weekend_pairs"""
+    pairs = table.weekend_pairs
+    if np is not None:
+        rows = worked.shape[0]
+        units = np.zeros((rows, len(pairs)), dtype=np.int8)
+        for i, (_, sat, sun) in enumerate(pairs):
+            if sat is not None:
+                units[:, i] += worked[:, sat]
+            if sun is not None:
+                units[:, i] += worked[:, sun]
+        return units
+    return [
+        [(sat is not None and row[sat]) + (sun is not None and row[sun]) for _, sat, sun in pairs]
+        for row in worked
+    ]
+
+
+def weekend_employees(grid: RotaGrid, table: DateTable) -> Dict[str, Dict]:
+    """
+    Weekend allowances per employee: both days of a weekend worked = 1.0,
+    one day = 0.5. Returns {employee: {'weekends': [...], 'total_allowances': x}}
+    leaving out employees with no weekend work.
+    """
+    return _weekend_from_worked(grid, table, _flag_mask(_shift_flags(grid, table, [NON_WORK_SHIFTS]), 0, invert=True))
+
+
+def _weekend_from_worked(grid: RotaGrid, table: DateTable, worked) -> Dict[str, Dict]:
+    units = _weekend_units(worked, table)
+    if np is not None:
+        # Only rows with weekend work are read element by element, so convert just those
+        any_weekend = units.any(axis=1)
+        rows = np.flatnonzero(any_weekend).tolist()
+        worked = dict(zip(rows, worked[any_weekend].tolist()))
+        units = dict(zip(rows, units[any_weekend].tolist()))
+        any_weekend = any_weekend.tolist()
+    else:
+        any_weekend = [any(row) for row in units]
+
+    pairs = table.weekend_pairs
+    employee_data: Dict[str, Dict] = {}
+    for row in grid.rows:
+        r = grid.row_index[row]
+        weekends: List[Dict] = []
+        total = 0.0
+        if any_weekend[r]:
+            for (weekend_start, sat, sun), worked_days in zip(pairs, units[r]):
+                if not worked_days:
+                    continue
+                saturday = sunday = None
+                if sat is not None and worked[r][sat]:
+                    saturday = {'date': table.dates[sat], 'shift': _effective_shift(grid, table, r, sat)}
+                if sun is not None and worked[r][sun]:
+                    sunday = {'date': table.dates[sun], 'shift': _effective_shift(grid, table, r, sun)}
+                allowance = 1.0 if worked_days == 2 else 0.5
+                weekends.append({
+                    'weekend_start': weekend_start,
+                    'saturday': saturday,
+                    'sunday': sunday,
+                    'allowance': allowance,
+                    'worked_days': worked_days
+                })
+                total += allowance
+        employee_data[row[1]] = {'weekends': weekends, 'total_allowances': total}
+    return {emp: data for emp, data in employee_data.items() if data['total_allowances'] > 0}
+
+
+def all_allowance_employees(grid: RotaGrid, table: DateTable, est_shifts: Sequence[str],
+                            pst_shifts: Sequence[str]) -> Dict[str, Dict[str, Dict]]:
+    """
+    EST, PST and weekend results from a single classification of the window:
+    {'EST': night-shift employees, 'PST': ..., 'Weekend': weekend employees}
+    """
+    flags = _shift_flags(grid, table, [est_shifts, pst_shifts, NON_WORK_SHIFTS])
+    return {
+        'EST': _night_shift_from_mask(grid, table, _flag_mask(flags, 0)),
+        'PST': _night_shift_from_mask(grid, table, _flag_mask(flags, 1)),
+        'Weekend': _weekend_from_worked(grid, table, _flag_mask(flags, 2, invert=True)),
+    }
+
+
+def row_counters(grid: RotaGrid, table: DateTable, est_shifts: Sequence[str],
+                 pst_shifts: Sequence[str]) -> List[List[int]]:
+    """
+    [EST days, PST days, full weekends, half weekends] for every grid row, in
+    grid row order. A full weekend is worth 1.0 allowance and a half one 0.5.
+    """
+    flags = _shift_flags(grid, table, [est_shifts, pst_shifts, NON_WORK_SHIFTS])
+    units = _weekend_units(_flag_mask(flags, 2, invert=True), table)
+    if np is not None:
+        return np.stack([
+            _flag_mask(flags, 0).sum(axis=1),
+            _flag_mask(flags, 1).sum(axis=1),
+            (units == 2).sum(axis=1),
+            (units == 1).sum(axis=1),
+        ], axis=1).tolist()
+    return [
+        [sum(cell & 1 for cell in row), sum((cell >> 1) & 1 for cell in row),
+         row_units.count(2), row_units.count(1)]
+        for row, row_units in zip(flags, units)
+    ]
@@ -0,0 +1,127 @@
+"""
+Materialized allowance totals, kept in data/allowance_totals.db (SQLite).
+
+For each department and allowance period (26th to 25th) there is one row
+holding a counter list per roster row: [EST days, PST days, full weekends,
+half weekends]. Each entry records the versions of the rota months it was
+computed from and a digest of the department's roster. Saves adjust the
+counters of the rows they touch, rewriting only that period's row in a
+short transaction, so reading totals never needs a scan and saves to
+different departments do not rewrite each other's totals. An entry whose
+versions no longer match the store or roster is ignored and rebuilt.
+
+Run `python allowance_totals.py rebuild [--verify]` to recompute every
+entry from the rota, optionally reporting where the stored totals differed.
+"""
+import os
+import json
+import sqlite3
+import threading
+from typing import Dict, List, Optional
+
+Counters = List[int]  # [est_days, pst_days, weekend_full, weekend_half]
+
+
+def allowance_key(dept: str, month: int, year: int) -> str:
+    return f"{dept}|{month}|{year}"
+
+
+class AllowanceTotals:
+    """Per-row allowance counters per department and allowance period"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS allowance_totals (
+            key TEXT PRIMARY KEY,
+            versions TEXT NOT NULL,
+            rows TEXT NOT NULL
+        ) WITHOUT ROWID;
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread; the database is created on first use, not at import
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(self.SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def has(self, key: str) -> bool:
+        return self._connect().execute('SELECT 1 FROM allowance_totals WHERE key = ?', (key,)).fetchone() is not None
+
+    def get(self, key: str, versions: List) -> Optional[Dict[str, Counters]]:
+        """Counters by 'process|employee' if the entry was computed at these versions"""
+        row = self._connect().execute('SELECT versions, rows FROM allowance_totals WHERE key = ?', (key,)).fetchone()
+        if row is None or json.loads(row[0]) != list(versions):
+            return None
+        return json.loads(row[1])
+
+    def put(self, key: str, versions: List, rows: Dict[str, Counters]) -> None:
+        self.put_many({key: {'versions': list(versions), 'rows': rows}})
+
+    def put_many(self, entries: Dict[str, Dict]) -> None:
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.executemany('INSERT OR REPLACE INTO allowance_totals (key, versions, rows) VALUES (?, ?, ?)',
+                             [(key, json.dumps(entry['versions']), json.dumps(entry['rows']))
+                              for key, entry in entries.items()])
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    def apply(self, key: str, old_versions: List, new_versions: Optional[List],
+              deltas: Dict[str, Counters]) -> None:
+        """
+        Add deltas to an entry computed at old_versions and mark it as
+        new_versions. The entry is dropped instead if it was at other versions
+        or new_versions is None (the change could not be followed exactly).
+        """
+        conn = self._connect()
+        # BEGIN IMMEDIATE: the read and the write of this key happen under one write lock
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT versions, rows FROM allowance_totals WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                pass
+            elif new_versions is None or json.loads(row[0]) != list(old_versions):
+                conn.execute('DELETE FROM allowance_totals WHERE key = ?', (key,))
+            else:
+                rows = json.loads(row[1])
+                for row_key, delta in deltas.items():
+                    counters = rows.get(row_key, [0, 0, 0, 0])
+                    rows[row_key] = [a + b for a, b in zip(counters, delta)]
+                conn.execute('UPDATE allowance_totals SET versions = ?, rows = ? WHERE key = ?',
+                             (json.dumps(list(new_versions)), json.dumps(rows), key))
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Allowance totals maintenance")
+    sub = parser.add_subparsers(dest='command', required=True)
+    rebuild = sub.add_parser('rebuild', help='Recompute every allowance period from the rota')
+    rebuild.add_argument('--verify', action='store_true',
+                         help='Report stored totals that differ from the recomputed ones')
+    args = parser.parse_args()
+
+    if args.command == 'rebuild':
+        from app import rebuild_allowance_totals
+        periods, mismatches = rebuild_allowance_totals(verify=args.verify)
+        for key in mismatches:
+            print(f"Mismatch: {key}")
+        print(f"Rebuilt {periods} allowance periods")
+        if args.verify:
+            print(f"{len(mismatches)} stored period(s) differed from the rota")
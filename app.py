@@ -1,15 +1,35 @@
 import os
+import copy
 import json
+import csv
+import bisect
 import calendar
+import zipfile
 import smtplib
 import secrets
 import hashlib
+import threading
 from datetime import date, datetime, timedelta
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from flask import Flask, redirect, url_for, session, render_template, request, abort, make_response
+from flask import (Flask, redirect, url_for, session, render_template, request, abort, make_response, Response,
+                   stream_with_context, get_template_attribute)
+from markupsafe import Markup
 from authlib.integrations.flask_client import OAuth
+from rota_storage import (JsonRotaStore, SqliteRotaStore, ShardedRotaStore, VersionConflict, split_cell_key,
+                          split_period_key, apply_changes_to_period)
+from file_cache import json_file_cache
+from rota_grid import RotaGrid, roster_rows
+from token_store import TokenStore
+from shift_index import PeriodIndex, ShiftIndex
+from fragment_cache import FragmentCache
+from notification_queue import NotificationQueue
+from sms_clients import ClientPool, FanOut, batches, summarize as summarize_sms
+from rota_mailer import SmtpPool, Throttle, PublicationStore, send_all
+from allowance_engine import all_allowance_employees, row_counters
+from allowance_totals import AllowanceTotals, allowance_key
+from rota_calendar import rota_month, allowance_period, allowance_window
 
 # --- START: REMOVE AZURE SSO & TWILIO AUTOMATICALLY ---
 import sys
@@ -120,19 +140,55 @@ DEPARTMENTS: Dict[str, Dict] = {
     "Threat Response Team": {"processes": {}, "shifts": {}, "show_filters": False, "password": "threat123"}
 }
 
-DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+# Everything the app stores lives here; point at a fixture directory (see generate_synthetic_data.py) to run against it
+DATA_DIR = os.environ.get('ROTA_DATA_DIR', os.path.join(os.path.dirname(__file__), 'data'))
 DATA_FILE = os.path.join(DATA_DIR, 'rota_data.json')
 DEPT_CONFIG_FILE = os.path.join(DATA_DIR, 'department_config.json')
 PASSWORD_RESET_FILE = os.path.join(DATA_DIR, 'password_reset_tokens.json')
+ALLOWANCE_TOTALS_FILE = os.path.join(DATA_DIR, 'allowance_totals.db')
+# Seconds between background sweeps of expired reset tokens/OTPs (changes are written to disk on each sweep)
+TOKEN_SWEEP_INTERVAL = float(os.environ.get('TOKEN_SWEEP_INTERVAL', '5'))
+# Notification workers, token sweeper and journal compactor start with the first request the
+# server handles (see start_background_workers), never on import; ROTA_BACKGROUND_WORKERS=0 keeps
+# them off altogether, e.g. in the tests and in scripts that only read the rota
+BACKGROUND_WORKERS = os.environ.get('ROTA_BACKGROUND_WORKERS', '1') != '0'
 EDITOR_PASSWORD = os.environ.get('EDITOR_PASSWORD', 'editor123')
 
+# Rota storage engine (see rota_storage.py)
+STORAGE_CONFIG = {
+    'backend': os.environ.get('ROTA_STORAGE', 'json'),  # json, sqlite, sharded
+    'sqlite_path': os.environ.get('ROTA_SQLITE_PATH', os.path.join(DATA_DIR, 'rota_data.db')),
+    'shard_dir': os.environ.get('ROTA_SHARD_DIR', os.path.join(DATA_DIR, 'rota_shards')),
+    # JSON engine: fold the change journal into rota_data.json past this size...
+    'journal_compact_bytes': int(os.environ.get('ROTA_JOURNAL_COMPACT_BYTES', str(256 * 1024))),
+    # ...and in the background every N seconds (0 disables the background compactor)
+    'journal_compact_interval': float(os.environ.get('ROTA_JOURNAL_COMPACT_INTERVAL', '300')),
+}
+
+# Rota page: departments with more rows than page_threshold get the paged
+# grid, which renders page_size rows and fetches the rest from /api/rota
+GRID_CONFIG = {
+    'page_size': int(os.environ.get('ROTA_PAGE_SIZE', '50')),
+    'page_threshold': int(os.environ.get('ROTA_PAGE_THRESHOLD', '150')),
+    'max_page_size': 500,
+    # select: a full <select> per cell; compact: cells as JSON, rendered in the
+    # browser with one shared editor (needs JavaScript)
+    'cells': os.environ.get('ROTA_GRID_CELLS', 'select'),
+    # Budget for rendered rota rows kept between requests (select mode)
+    'fragment_cache_bytes': int(os.environ.get('ROTA_FRAGMENT_CACHE_BYTES', str(32 * 1024 * 1024))),
+}
+
 # Email Configuration
 EMAIL_CONFIG = {
     'smtp_server': os.environ.get('SMTP_SERVER', 'smtp.gmail.com'),
     'smtp_port': int(os.environ.get('SMTP_PORT', '587')),
     'sender_email': os.environ.get('SENDER_EMAIL', 'admin@yourcompany.com'),
     'sender_password': os.environ.get('SENDER_PASSWORD', ''),  # App password for Gmail
-    'use_tls': True
+    'use_tls': True,
+    'timeout': float(os.environ.get('SMTP_TIMEOUT', '30')),
+    # Rota publication: persistent connections used at once, and messages per second overall
+    'publish_connections': int(os.environ.get('PUBLISH_SMTP_CONNECTIONS', '3')),
+    'publish_rate': float(os.environ.get('PUBLISH_RATE', '5')),
 }
 
 # SMS Configuration for OTP
@@ -153,6 +209,31 @@ SMS_CONFIG = {
     # TextLocal Configuration (Alternative)
     'textlocal_api_key': os.environ.get('TEXTLOCAL_API_KEY', ''),
     'textlocal_sender': os.environ.get('TEXTLOCAL_SENDER', 'TXTLCL'),
+    'textlocal_url': os.environ.get('TEXTLOCAL_URL', 'https://api.textlocal.in/send/'),
+    # Numbers per TextLocal request (sent comma-joined)
+    'textlocal_batch_size': int(os.environ.get('TEXTLOCAL_BATCH_SIZE', '500')),
+
+    # Recipients sent to at once across all senders, and per-call timeout
+    'max_concurrency': int(os.environ.get('SMS_MAX_CONCURRENCY', '8')),
+    'timeout': float(os.environ.get('SMS_TIMEOUT', '15')),
+}
+
+# Background delivery of reset emails and SMS OTPs (see notification_queue.py)
+NOTIFICATION_CONFIG = {
+    'queue_path': os.environ.get('NOTIFY_QUEUE_PATH', os.path.join(DATA_DIR, 'notifications.db')),
+    'workers': int(os.environ.get('NOTIFY_WORKERS', '4')),
+    'max_attempts': int(os.environ.get('NOTIFY_MAX_ATTEMPTS', '5')),
+    # Seconds before the first retry, doubling for each further attempt
+    'backoff': float(os.environ.get('NOTIFY_BACKOFF_SECONDS', '5')),
+    # Sent and failed jobs (payloads already cleared) are deleted after this many seconds
+    'retention': float(os.environ.get('NOTIFY_RETENTION_SECONDS', str(7 * 24 * 3600))),
+    # Jobs sent at once per provider, e.g. NOTIFY_PROVIDER_LIMITS="smtp=2,twilio=4"
+    'provider_limits': {
+        'smtp': 2, 'twilio': 4, 'aws_sns': 4, 'textlocal': 2, 'mock': 4,
+        **{name.strip(): int(limit) for name, limit in (
+            item.split('=') for item in os.environ.get('NOTIFY_PROVIDER_LIMITS', '').split(',') if '=' in item
+        )},
+    },
 }
 
 # Department Admin Email Mapping (Keep for backward compatibility)
@@ -196,31 +277,44 @@ DEPARTMENT_ADMIN_PHONES = {
 def ensure_data_dir() -> None:
     os.makedirs(DATA_DIR, exist_ok=True)
 
+_rota_backend = None
+
+def get_rota_backend():
+    """Return the configured rota storage engine, creating it on first use"""
+    global _rota_backend
+    if _rota_backend is None:
+        if STORAGE_CONFIG['backend'] == 'sqlite':
+            _rota_backend = SqliteRotaStore(STORAGE_CONFIG['sqlite_path'])
+        elif STORAGE_CONFIG['backend'] == 'sharded':
+            _rota_backend = ShardedRotaStore(STORAGE_CONFIG['shard_dir'])
+        else:
+            _rota_backend = JsonRotaStore(DATA_FILE, journal_compact_bytes=STORAGE_CONFIG['journal_compact_bytes'])
+    return _rota_backend
+
+# Per-period grids and shift -> rows indexes, kept current by commit_period_changes
+shift_index = ShiftIndex()
+
+# Rendered rota rows by (dept, month, year, process, employee, can_edit); see render_row_fragments
+row_fragments = FragmentCache(GRID_CONFIG['fragment_cache_bytes'])
+
+# Materialized per-row allowance counters, adjusted by commit_period_changes
+allowance_totals = AllowanceTotals(ALLOWANCE_TOTALS_FILE)
+
 def load_store() -> Dict[str, Dict[str, str]]:
-    if not os.path.exists(DATA_FILE):
-        return {}
-    try:
-        with open(DATA_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except Exception:
-        return {}
+    return get_rota_backend().load_all()
 
 def save_store(store: Dict[str, Dict[str, str]]) -> None:
     ensure_data_dir()
-    tmp = DATA_FILE + '.tmp'
-    with open(tmp, 'w', encoding='utf-8') as f:
-        json.dump(store, f, ensure_ascii=False, indent=2)
-    os.replace(tmp, DATA_FILE)
+    get_rota_backend().save_all(store)
+
+def load_cached_department_config() -> Dict[str, Dict]:
+    """Shared, read-only department configuration (revalidated on file mtime/size)"""
+    return json_file_cache.load(DEPT_CONFIG_FILE, DEPARTMENTS.copy)
 
 def load_department_config() -> Dict[str, Dict]:
     """Load department configuration from file, fallback to default if not exists"""
-    if not os.path.exists(DEPT_CONFIG_FILE):
-        return DEPARTMENTS.copy()
-    try:
-        with open(DEPT_CONFIG_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except Exception:
-        return DEPARTMENTS.copy()
+    # Callers may modify the result before saving, so hand out a private copy
+    return copy.deepcopy(load_cached_department_config())
 
 def save_department_config(config: Dict[str, Dict]) -> None:
     """Save department configuration to file with sorted employees"""
@@ -233,22 +327,17 @@ def save_department_config(config: Dict[str, Dict]) -> None:
     
     ensure_data_dir()
     tmp = DEPT_CONFIG_FILE + '.tmp'
-    with open(tmp, 'w', encoding='utf-8') as f:
-        json.dump(config, f, ensure_ascii=False, indent=2)
-    os.replace(tmp, DEPT_CONFIG_FILE)
-
-def load_reset_tokens():
-    """Load password reset tokens from file"""
-    if os.path.exists(PASSWORD_RESET_FILE):
-        with open(PASSWORD_RESET_FILE, 'r') as file:
-            return json.load(file)
-    return {}
-
-def save_reset_tokens(tokens):
-    """Save password reset tokens to file"""
-    ensure_data_dir()
-    with open(PASSWORD_RESET_FILE, 'w') as file:
-        json.dump(tokens, file, indent=2)
+    try:
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(config, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, DEPT_CONFIG_FILE)
+    except Exception:
+        json_file_cache.invalidate(DEPT_CONFIG_FILE)
+        raise
+    json_file_cache.store(DEPT_CONFIG_FILE, copy.deepcopy(config))
+
+# Reset tokens and OTPs are held in memory and written behind to PASSWORD_RESET_FILE
+token_store = TokenStore(PASSWORD_RESET_FILE)
 
 def generate_reset_token():
     """Generate a secure random token for password reset"""
@@ -259,58 +348,41 @@ def create_reset_token(department, expiry_minutes=30):
     token = generate_reset_token()
     expiry_time = datetime.now() + timedelta(minutes=expiry_minutes)
     
-    tokens = load_reset_tokens()
-    tokens[token] = {
+    token_store.add(token, {
         'department': department,
         'expiry': expiry_time.isoformat(),
         'created': datetime.now().isoformat()
-    }
-    save_reset_tokens(tokens)
+    })
     return token
 
 def validate_reset_token(token):
     """Validate a password reset token"""
-    tokens = load_reset_tokens()
-    if token not in tokens:
+    token_data = token_store.get(token)
+    if token_data is None:
         return None
     
-    token_data = tokens[token]
     expiry_time = datetime.fromisoformat(token_data['expiry'])
     
     if datetime.now() > expiry_time:
         # Token expired, remove it
-        del tokens[token]
-        save_reset_tokens(tokens)
+        token_store.remove(token)
         return None
     
     return token_data['department']
 
 def cleanup_expired_tokens():
     """Remove expired tokens from storage"""
-    tokens = load_reset_tokens()
-    current_time = datetime.now()
-    
-    expired_tokens = []
-    for token, data in tokens.items():
-        expiry_time = datetime.fromisoformat(data['expiry'])
-        if current_time > expiry_time:
-            expired_tokens.append(token)
-    
-    for token in expired_tokens:
-        del tokens[token]
-    
-    if expired_tokens:
-        save_reset_tokens(tokens)
-    
-    return len(expired_tokens)
+    # The background sweeper also does this every TOKEN_SWEEP_INTERVAL seconds
+    return token_store.expire()
 
-def send_reset_email(department, token):
+def send_reset_email(department, token, reset_url=None):
     """Send password reset email to department administrators"""
     if department not in DEPARTMENT_ADMIN_EMAILS:
         return False, f"No admin emails configured for {department}"
     
     admin_emails = DEPARTMENT_ADMIN_EMAILS[department]
-    reset_url = url_for('reset_password', token=token, _external=True)
+    # Queue workers have no request context, so the URL is built when queuing
+    reset_url = reset_url or url_for('reset_password', token=token, _external=True)
     
     subject = f"Password Reset Request - {department} Department"
     body = f"""
@@ -333,7 +405,7 @@ Shift Rota System
         msg['From'] = EMAIL_CONFIG['sender_email']
         msg['To'] = ', '.join(admin_emails)
         
-        with smtplib.SMTP(EMAIL_CONFIG['smtp_server'], EMAIL_CONFIG['smtp_port']) as server:
+        with smtplib.SMTP(EMAIL_CONFIG['smtp_server'], EMAIL_CONFIG['smtp_port'], timeout=EMAIL_CONFIG['timeout']) as server:
             if EMAIL_CONFIG['use_tls']:
                 server.starttls()
             
@@ -347,6 +419,85 @@ Shift Rota System
     except Exception as e:
         return False, f"Failed to send email: {str(e)}"
 
+def queue_reset_email(department, token):
+    """Queue the reset email for the background workers and return the job id"""
+    return notification_queue.enqueue('reset_email', 'smtp', {
+        'department': department,
+        'token': token,
+        'reset_url': url_for('reset_password', token=token, _external=True),
+    })
+
+def queue_otp_sms(department, otp_code):
+    """Queue the OTP SMS for the background workers and return the job id"""
+    return notification_queue.enqueue('otp_sms', SMS_CONFIG.get('provider', 'twilio'), {
+        'department': department,
+        'otp_code': otp_code,
+    })
+
+# ===== ROTA PUBLICATION =====
+
+# Publication runs by job id, in the notification database so every server process sees them;
+# finished runs are dropped PUBLICATION_RETENTION seconds after they end
+PUBLICATION_RETENTION = 3600
+publications = PublicationStore(NOTIFICATION_CONFIG['queue_path'], retention=PUBLICATION_RETENTION)
+
+def render_employee_schedules(dept_name, month, year):
+    """
+    One email per employee with an address in the department's
+    'employee_emails' map, listing their shifts for the period as shown on
+    the rota page. Returns (messages, employees without an address).
+    """
+    dept = get_current_departments().get(dept_name, {})
+    emails = dept.get('employee_emails', {})
+    rows, date_headers, shifts = build_rows(dept_name, month, year, [], [])
+    # An employee listed under several processes gets one email covering all of them
+    by_employee: Dict[str, List[Dict]] = {}
+    for row in rows:
+        by_employee.setdefault(row['employee'], []).append(row)
+
+    messages = []
+    skipped = []
+    for employee, employee_rows in by_employee.items():
+        if not emails.get(employee):
+            skipped.append(employee)
+            continue
+        sections = []
+        for row in employee_rows:
+            lines = [f"  {h['weekday']} {h['day']} {h['month_short']}: {c['value']}"
+                     + (f" ({shifts[c['value']]})" if c['value'] in shifts else '')
+                     for h, c in zip(date_headers, row['cells'])]
+            sections.append(f"{row['process']}:\n" + '\n'.join(lines))
+        body = f"""
+Hello {employee},
+
+The {dept_name} rota for {month:02d}/{year} has been published. Your shifts:
+
+{chr(10).join(sections)}
+
+Best regards,
+Shift Rota System
+"""
+        msg = MIMEText(body)
+        msg['Subject'] = f"Your {dept_name} Rota - {month:02d}/{year}"
+        msg['From'] = EMAIL_CONFIG['sender_email']
+        msg['To'] = emails[employee]
+        messages.append(msg)
+    return messages, skipped
+
+def publish_rota(dept_name, month, year):
+    """Start emailing every employee their schedule in the background; returns the job id"""
+    messages, skipped = render_employee_schedules(dept_name, month, year)
+    job_id = secrets.token_urlsafe(12)
+    publications.prune()
+    progress = publications.create(job_id, len(messages), skipped)
+    pool = SmtpPool(EMAIL_CONFIG['smtp_server'], EMAIL_CONFIG['smtp_port'],
+                    EMAIL_CONFIG['sender_email'], EMAIL_CONFIG['sender_password'],
+                    use_tls=EMAIL_CONFIG['use_tls'], size=EMAIL_CONFIG['publish_connections'],
+                    timeout=EMAIL_CONFIG['timeout'])
+    threading.Thread(target=send_all, args=(messages, pool, progress, Throttle(EMAIL_CONFIG['publish_rate'])),
+                     name=f'publish-{dept_name}', daemon=True).start()
+    return job_id
+
 # ===== SMS OTP FUNCTIONS =====
 
 def generate_otp():
@@ -358,26 +509,22 @@ def create_otp_token(department, expiry_minutes=10):
     otp_code = generate_otp()
     expiry_time = datetime.now() + timedelta(minutes=expiry_minutes)
     
-    tokens = load_reset_tokens()
     # Use OTP as key for easier lookup
-    tokens[otp_code] = {
+    token_store.add(otp_code, {
         'type': 'otp',
         'department': department,
         'expiry': expiry_time.isoformat(),
         'created': datetime.now().isoformat(),
         'attempts': 0  # Track failed attempts
-    }
-    save_reset_tokens(tokens)
+    })
     return otp_code
 
 def validate_otp_token(otp_code):
     """Validate an OTP code"""
-    tokens = load_reset_tokens()
-    if otp_code not in tokens:
+    token_data = token_store.get(otp_code)
+    if token_data is None:
         return None, "Invalid OTP code"
     
-    token_data = tokens[otp_code]
-    
     # Check if it's an OTP token
     if token_data.get('type') != 'otp':
         return None, "Invalid token type"
@@ -386,31 +533,23 @@ def validate_otp_token(otp_code):
     expiry_time = datetime.fromisoformat(token_data['expiry'])
     if datetime.now() > expiry_time:
         # Token expired, remove it
-        del tokens[otp_code]
-        save_reset_tokens(tokens)
+        token_store.remove(otp_code)
         return None, "OTP code has expired"
     
     # Check attempts (max 3 attempts)
     if token_data.get('attempts', 0) >= 3:
-        del tokens[otp_code]
-        save_reset_tokens(tokens)
+        token_store.remove(otp_code)
         return None, "Too many failed attempts"
     
     return token_data['department'], "Valid"
 
 def increment_otp_attempts(otp_code):
     """Increment failed attempts for an OTP"""
-    tokens = load_reset_tokens()
-    if otp_code in tokens:
-        tokens[otp_code]['attempts'] = tokens[otp_code].get('attempts', 0) + 1
-        save_reset_tokens(tokens)
+    token_store.increment(otp_code, 'attempts')
 
 def consume_otp_token(otp_code):
-    """Remove OTP token after successful use"""
-    tokens = load_reset_tokens()
-    if otp_code in tokens:
-        del tokens[otp_code]
-        save_reset_tokens(tokens)
+    """Remove OTP token after successful use; False if another request used it first"""
+    return token_store.remove(otp_code)
 
 def send_otp_sms(department, otp_code):
     """Send OTP via SMS to department administrators"""
@@ -443,27 +582,87 @@ Do not share this code."""
     except Exception as e:
         return False, f"SMS sending failed: {str(e)}"
 
+def twilio_client():
+    """Twilio REST client for the configured account, built once and reused"""
+    def build():
+        from twilio.rest import Client
+        return Client(SMS_CONFIG['twilio_account_sid'], SMS_CONFIG['twilio_auth_token'])
+
+    return sms_clients.get(('twilio', SMS_CONFIG['twilio_account_sid'], SMS_CONFIG['twilio_auth_token']), build)
+
+def sns_client():
+    """boto3 SNS client for the configured credentials, built once and reused"""
+    def build():
+        import boto3
+        return boto3.client(
+            'sns',
+            aws_access_key_id=SMS_CONFIG['aws_access_key_id'],
+            aws_secret_access_key=SMS_CONFIG['aws_secret_access_key'],
+            region_name=SMS_CONFIG['aws_region']
+        )
+
+    key = ('aws_sns', SMS_CONFIG['aws_access_key_id'], SMS_CONFIG['aws_secret_access_key'], SMS_CONFIG['aws_region'])
+    return sms_clients.get(key, build)
+
+def textlocal_session():
+    """HTTP session for TextLocal, keeping connections open between sends"""
+    def build():
+        import requests
+        from requests.adapters import HTTPAdapter
+        session = requests.Session()
+        # One kept-alive connection per concurrent send
+        session.mount('https://', HTTPAdapter(pool_maxsize=SMS_CONFIG['max_concurrency']))
+        session.mount('http://', HTTPAdapter(pool_maxsize=SMS_CONFIG['max_concurrency']))
+        return session
+
+    return sms_clients.get(('textlocal',), build)
+
+def twilio_send_each(phone_numbers, message):
+    """{phone: (ok, message SID or error)}, sending to the numbers concurrently"""
+    client = twilio_client()
+    return sms_fan_out.run(list(phone_numbers), lambda phone: client.messages.create(
+        body=message,
+        from_=SMS_CONFIG['twilio_phone_number'],
+        to=phone
+    ).sid)
+
+def sns_send_each(phone_numbers, message):
+    """{phone: (ok, SNS message id or error)}, sending to the numbers concurrently"""
+    sns = sns_client()
+    return sms_fan_out.run(list(phone_numbers), lambda phone: sns.publish(
+        PhoneNumber=phone,
+        Message=message
+    ).get('MessageId'))
+
+def textlocal_send_each(phone_numbers, message):
+    """
+    {phone: (ok, detail)} using TextLocal's bulk API: numbers go comma-joined,
+    SMS_CONFIG['textlocal_batch_size'] per request, batches sent concurrently
+    """
+    session = textlocal_session()
+
+    def send_batch(numbers):
+        response = session.post(SMS_CONFIG['textlocal_url'], data={
+            'apikey': SMS_CONFIG['textlocal_api_key'],
+            'numbers': numbers,
+            'message': message,
+            'sender': SMS_CONFIG['textlocal_sender']
+        }, timeout=SMS_CONFIG['timeout'])
+        response.raise_for_status()
+        result = response.json()
+        if result.get('status') != 'success':
+            errors = result.get('errors') or [{'message': 'unknown error'}]
+            raise RuntimeError(', '.join(str(e.get('message', e)) for e in errors))
+        return result.get('batch_id', '')
+
+    groups = {','.join(batch): batch for batch in batches(phone_numbers, SMS_CONFIG['textlocal_batch_size'])}
+    batch_results = sms_fan_out.run(list(groups), send_batch)
+    return {phone: batch_results[numbers] for numbers, batch in groups.items() for phone in batch}
+
 def send_twilio_sms(phone_numbers, message):
     """Send SMS using Twilio"""
     try:
-        from twilio.rest import Client
-        
-        client = Client(
-            SMS_CONFIG['twilio_account_sid'], 
-            SMS_CONFIG['twilio_auth_token']
-        )
-        
-        sent_count = 0
-        for phone in phone_numbers:
-            client.messages.create(
-                body=message,
-                from_=SMS_CONFIG['twilio_phone_number'],
-                to=phone
-            )
-            sent_count += 1
-        
-        return True, f"OTP sent to {sent_count} administrator(s)"
-    
+        return summarize_sms(twilio_send_each(phone_numbers, message))
     except ImportError:
         return False, "Twilio library not installed. Run: pip install twilio"
     except Exception as e:
@@ -472,25 +671,7 @@ def send_twilio_sms(phone_numbers, message):
 def send_aws_sns_sms(phone_numbers, message):
     """Send SMS using AWS SNS"""
     try:
-        import boto3
-        
-        sns = boto3.client(
-            'sns',
-            aws_access_key_id=SMS_CONFIG['aws_access_key_id'],
-            aws_secret_access_key=SMS_CONFIG['aws_secret_access_key'],
-            region_name=SMS_CONFIG['aws_region']
-        )
-        
-        sent_count = 0
-        for phone in phone_numbers:
-            sns.publish(
-                PhoneNumber=phone,
-                Message=message
-            )
-            sent_count += 1
-        
-        return True, f"OTP sent to {sent_count} administrator(s)"
-    
+        return summarize_sms(sns_send_each(phone_numbers, message))
     except ImportError:
         return False, "AWS boto3 library not installed. Run: pip install boto3"
     except Exception as e:
@@ -499,29 +680,7 @@ def send_aws_sns_sms(phone_numbers, message):
 def send_textlocal_sms(phone_numbers, message):
     """Send SMS using TextLocal"""
     try:
-        import urllib.parse
-        import urllib.request
-        
-        api_key = SMS_CONFIG['textlocal_api_key']
-        sender = SMS_CONFIG['textlocal_sender']
-        
-        numbers = ','.join(phone_numbers)
-        
-        data = urllib.parse.urlencode({
-            'apikey': api_key,
-            'numbers': numbers,
-            'message': message,
-            'sender': sender
-        })
-        
-        request = urllib.request.Request('https://api.textlocal.in/send/')
-        request.add_data(data.encode('utf-8'))
-        
-        response = urllib.request.urlopen(request)
-        result = response.read().decode('utf-8')
-        
-        return True, f"OTP sent to {len(phone_numbers)} administrator(s)"
-    
+        return summarize_sms(textlocal_send_each(phone_numbers, message))
     except Exception as e:
         return False, f"TextLocal SMS failed: {str(e)}"
 
@@ -535,84 +694,144 @@ def send_mock_sms(phone_numbers, message, otp_code):
     # In development, show the OTP in the response
     return True, f"SMS sent to {len(phone_numbers)} number(s). [DEV MODE - OTP: {otp_code}]"
 
+# Provider clients reused between sends, and the shared per-recipient thread pool (see sms_clients.py)
+sms_clients = ClientPool()
+sms_fan_out = FanOut(SMS_CONFIG['max_concurrency'])
+
+notification_queue = NotificationQueue(
+    NOTIFICATION_CONFIG['queue_path'],
+    workers=NOTIFICATION_CONFIG['workers'],
+    max_attempts=NOTIFICATION_CONFIG['max_attempts'],
+    backoff=NOTIFICATION_CONFIG['backoff'],
+    retention=NOTIFICATION_CONFIG['retention'],
+    provider_limits=NOTIFICATION_CONFIG['provider_limits'],
+)
+# Handlers look the senders up at call time so tests and config changes apply
+notification_queue.register('reset_email', lambda job: send_reset_email(job['department'], job['token'], job['reset_url']))
+notification_queue.register('otp_sms', lambda job: send_otp_sms(job['department'], job['otp_code']))
+
+_background_started = False
+_background_lock = threading.Lock()
+
+def start_background_workers() -> None:
+    """
+    Start the notification workers, the reset token sweeper and the rota
+    journal compactor in this process (once; no-op with ROTA_BACKGROUND_WORKERS=0).
+    Called for the first request, so each gunicorn worker starts its own
+    threads after forking and importing the app starts nothing.
+    """
+    global _background_started
+    if _background_started or not BACKGROUND_WORKERS:
+        return
+    with _background_lock:
+        if _background_started:
+            return
+        notification_queue.start()
+        token_store.start_sweeper(TOKEN_SWEEP_INTERVAL)
+        backend = get_rota_backend()
+        if isinstance(backend, JsonRotaStore) and STORAGE_CONFIG['journal_compact_interval'] > 0:
+            backend.start_compactor(STORAGE_CONFIG['journal_compact_interval'])
+        _background_started = True
+
+@app.before_request
+def ensure_background_workers():
+    if not _background_started:
+        start_background_workers()
+
 def get_current_departments() -> Dict[str, Dict]:
-    """Get current department configuration (either from file or default)"""
-    return load_department_config()
+    """
+    Get current department configuration (either from file or default).
+    The result is shared between requests; use load_department_config()
+    when the configuration is going to be modified and saved.
+    """
+    return load_cached_department_config()
 
 def period_key(dept: str, month: int, year: int) -> str:
     return f"{dept}|{month}|{year}"
 
+# Years the API endpoints accept; keeps the calendar tables (whose weeks and
+# allowance windows reach into the neighbouring months) well inside date's range
+ROTA_YEARS = (1900, 2999)
+
+def valid_period(month: int, year: int) -> bool:
+    return 1 <= month <= 12 and ROTA_YEARS[0] <= year <= ROTA_YEARS[1]
+
 def get_saved_period(dept: str, month: int, year: int) -> Dict[str, str]:
-    store = load_store()
-    return store.get(period_key(dept, month, year), {})
+    return get_rota_backend().get_period(period_key(dept, month, year))
 
 def set_saved_period(dept: str, month: int, year: int, data: Dict[str, str]) -> None:
-    store = load_store()
-    store[period_key(dept, month, year)] = data
-    save_store(store)
+    get_rota_backend().set_period(period_key(dept, month, year), data)
 
-def get_month_dates(year: int, month: int) -> List[date]:
+def get_window_saved_data(dept: str, dates: List[date]) -> Dict[str, str]:
     """
-    Return dates covering full weeks (Mon-Sun) that belong to this month's rota.
-    Complete weekly cycles ensure that if a month ends mid-week, that entire week
-    belongs to the previous month's rota (you can't change shifts mid-week).
-    
-    Logic:
-    1. Find all days in the calendar month
-    2. Find the first Monday that starts a week entirely within or starting in this month
-    3. Continue adding complete weeks (Mon-Sun) until we would start a week that
-       has its Monday in the next month
-    4. If the month ends mid-week, that partial week belongs to the next month's rota
+    Merge the saved periods for every calendar month touched by dates, reading
+    only those periods (later months win on overlapping keys)
     """
-    # Get first and last day of the target month
-    first_day = date(year, month, 1)
-    if month == 12:
-        last_day = date(year + 1, 1, 1) - timedelta(days=1)
-    else:
-        last_day = date(year, month + 1, 1) - timedelta(days=1)
-    
-    # Find the first Monday that starts a week we want to include
-    # This should be the first Monday that falls within the month
-    current = first_day
-    while current.weekday() != 0:  # 0 = Monday
-        current += timedelta(days=1)
-        # If we go past the month looking for Monday, start from the first Monday after month start
-        if current.month != month:
-            # The first day was not Monday and there's no Monday in this month
-            # Find the first Monday on or after the 1st
-            current = first_day
-            while current.weekday() != 0:
-                current += timedelta(days=1)
-            break
-    
-    dates: List[date] = []
-    
-    # Add complete weeks (Monday to Sunday)
-    week_start = current
-    while True:
-        # Check if this week's Monday is still in our target month or 
-        # if it's the continuation of a week that started in our month
-        if week_start.month != month:
-            # If we've moved to the next month, we're done
-            break
-            
-        # Add the complete week (7 days starting from Monday)
-        for day_offset in range(7):
-            week_day = week_start + timedelta(days=day_offset)
-            dates.append(week_day)
-        
-        # Move to the next Monday
-        week_start += timedelta(days=7)
-        
-        # Safety check: if the next Monday is more than a month away, break
-        if week_start > last_day + timedelta(days=31):
-            break
-    
-    return dates
-
-def default_shift_for(d: date) -> str:
-    # Saturday=5, Sunday=6
-    return 'WO' if d.weekday() in (5, 6) else 'General'
+    months = []
+    for d in dates:
+        if (d.year, d.month) not in months:
+            months.append((d.year, d.month))
+    periods = get_rota_backend().get_periods([period_key(dept, m, y) for y, m in months])
+    merged: Dict[str, str] = {}
+    for y, m in months:
+        merged.update(periods[period_key(dept, m, y)])
+    return merged
+
+def get_period_version(dept: str, month: int, year: int) -> int:
+    return get_rota_backend().get_version(period_key(dept, month, year))
+
+def commit_period_changes(dept: str, month: int, year: int, changes: Dict[str, Optional[str]],
+                          expected_version: Optional[int] = None) -> int:
+    """
+    Write changed cells as the period's next version and return it.
+    Raises VersionConflict if expected_version is given and is stale.
+    """
+    pk = period_key(dept, month, year)
+    backend = get_rota_backend()
+    if not changes:
+        # Nothing is written, so indexes, totals and cached rows stay as they are
+        return backend.commit(pk, changes, expected_version)
+    snapshots = snapshot_allowance_windows(dept, pk, changes)
+    version = backend.commit(pk, changes, expected_version)
+    digest = department_config_digest(dept)
+    shift_index.apply(pk, (backend, version - 1, digest), (backend, version, digest), changes)
+    update_allowance_totals(dept, pk, changes, snapshots)
+    invalidate_row_fragments(dept, month, year, changes)
+    return version
+
+# dept name -> (config object the digest was computed from, digest)
+_dept_config_digests: Dict[str, Tuple[Dict, str]] = {}
+
+def department_config_digest(dept_name: str) -> str:
+    """Short hash of a department's roster and shifts, recomputed only when the config reloads"""
+    departments = get_current_departments()
+    entry = _dept_config_digests.get(dept_name)
+    if entry is None or entry[0] is not departments:
+        dept = departments.get(dept_name, {})
+        payload = json.dumps([dept.get('processes', {}), dept.get('shifts', {})], sort_keys=True)
+        entry = (departments, hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16])
+        _dept_config_digests[dept_name] = entry
+    return entry[1]
+
+def period_etag(dept: str, version: int) -> str:
+    """Strong ETag for a period's rendered rota: changes with every save and every roster/shift edit"""
+    return f"v{version}-{department_config_digest(dept)}"
+
+def rota_periods_between(start: date, end: date):
+    """
+    Yield (month, year, table, lo, hi) for every rota period with dates in
+    [start, end], where table.dates[lo:hi] are the dates inside the range.
+    Each date belongs to exactly one period, so nothing is repeated across periods.
+    """
+    # The first days of a month can belong to the previous month's rota
+    month, year = (start.month - 1, start.year) if start.month > 1 else (12, start.year - 1)
+    while (year, month) <= (end.year, end.month):
+        table = rota_month(year, month)
+        lo = bisect.bisect_left(table.dates, start)
+        hi = bisect.bisect_right(table.dates, end)
+        if lo < hi:
+            yield month, year, table, lo, hi
+        month, year = (month + 1, year) if month < 12 else (1, year + 1)
 
 def can_edit() -> bool:
     # Allow edit if Azure user authenticated or department user session present
@@ -632,47 +851,123 @@ def parse_filter_list(param_name: str) -> List[str]:
     # Clean empty strings
     return [v for v in vals if v]
 
-def build_rows(dept_name: str, month: int, year: int, selected_processes: List[str], selected_shifts: List[str]) -> Tuple[List[Dict], List[Dict[str, str]], Dict[str, str]]:
+def get_period_grid(dept_name: str, month: int, year: int, dept: Dict, date_strs: List[str],
+                    saved: Optional[Dict[str, str]] = None) -> RotaGrid:
+    """Saved period as a dense grid over the department roster and the rota dates"""
+    if saved is None:
+        saved = get_saved_period(dept_name, month, year)
+    return RotaGrid.from_period(saved, roster_rows(dept['processes']), date_strs, dept.get('shifts', {}))
+
+def get_period_index(dept_name: str, month: int, year: int, dept: Dict) -> PeriodIndex:
+    """Shared grid and shift index for a period at its current version (read-only)"""
+    # Version before data: a save landing in between is caught on the next lookup
+    backend = get_rota_backend()
+    token = (backend, backend.get_version(period_key(dept_name, month, year)), department_config_digest(dept_name))
+
+    def build() -> PeriodIndex:
+        table = rota_month(year, month)
+        return PeriodIndex(get_period_grid(dept_name, month, year, dept, table.date_strs), table.default_shifts)
+
+    return shift_index.get(period_key(dept_name, month, year), token, build)
+
+def filtered_rows(dept: Dict, index: PeriodIndex, selected_processes: List[str],
+                  selected_shifts: List[str]) -> List[Tuple[str, str, int]]:
+    """(process, employee, grid row) of the rota rows shown with these filters, in roster order"""
+    grid = index.grid
+    # With a shift filter, only rows the index lists are kept
+    matching = index.rows_with(selected_shifts) if selected_shifts else None
+    rows = []
+    for process, employees in dept['processes'].items():
+        if selected_processes and process not in selected_processes:
+            continue
+        for emp in employees:
+            r = grid.row_index[(process, emp)]
+            if matching is None or r in matching:
+                rows.append((process, emp, r))
+    return rows
+
+def count_rows(dept_name: str, month: int, year: int, selected_processes: List[str], selected_shifts: List[str]) -> int:
+    """Number of rows build_rows returns without offset/limit, from the shared index"""
+    dept = get_current_departments().get(dept_name)
+    if not dept or not dept.get('processes'):
+        return 0
+    return len(filtered_rows(dept, get_period_index(dept_name, month, year, dept), selected_processes, selected_shifts))
+
+def render_row_fragments(dept_name: str, month: int, year: int, rows: List[Dict], shifts: Dict[str, str],
+                         can_edit: bool) -> List[str]:
+    """
+    HTML of each build_rows row as dept_row.html renders it, reusing cached
+    fragments. A row has no version of its own, so its effective shifts and
+    the department's config digest stand in for one: an edited row renders
+    again even if the save happened in another worker.
+    """
+    rota_row = None
+    digest = department_config_digest(dept_name)
+    fragments = []
+    for row in rows:
+        key = (dept_name, month, year, row['process'], row['employee'], can_edit)
+        token = (digest, tuple(c['value'] for c in row['cells']))
+        html = row_fragments.get(key, token)
+        if html is None:
+            if rota_row is None:
+                rota_row = get_template_attribute('dept_row.html', 'rota_row')
+            html = rota_row(row, shifts, can_edit)
+            row_fragments.put(key, token, html)
+        fragments.append(Markup(html))
+    return fragments
+
+def invalidate_row_fragments(dept_name: str, month: int, year: int, changes: Dict[str, Optional[str]]) -> None:
+    """Drop the cached rows a change set touched"""
+    rows = set()
+    for cell_key in changes:
+        try:
+            process, emp, _ = split_cell_key(cell_key)
+        except ValueError:
+            continue
+        rows.add((process, emp))
+    row_fragments.discard((dept_name, month, year, process, emp, can_edit)
+                          for process, emp in rows for can_edit in (False, True))
+
+def build_rows(dept_name: str, month: int, year: int, selected_processes: List[str], selected_shifts: List[str],
+               saved: Optional[Dict[str, str]] = None, offset: int = 0,
+               limit: Optional[int] = None) -> Tuple[List[Dict], List[Dict[str, str]], Dict[str, str]]:
+    """
+    Rows for the rota table; pass saved to use an already loaded period instead
+    of reading the store. offset/limit select a block of the filtered rows, and
+    only that block's cells are built.
+    """
     departments = get_current_departments()
     dept = departments.get(dept_name)
     if not dept or not dept.get('processes'):
         return [], [], {}
 
-    dates = get_month_dates(year, month)
-    date_headers: List[Dict[str, str]] = []
-    for d in dates:
-        date_headers.append({
-            'date_str': d.isoformat(),
-            'weekday': d.strftime('%a'),
-            'day': str(d.day),
-            'month_short': d.strftime('%b')
-        })
-
-    saved = get_saved_period(dept_name, month, year)
+    # Shared, precomputed per month; the header dicts must not be modified
+    table = rota_month(year, month)
+    date_headers: List[Dict[str, str]] = list(table.headers)
+    date_strs = table.date_strs
+    if saved is None:
+        index = get_period_index(dept_name, month, year, dept)
+    else:
+        index = PeriodIndex(get_period_grid(dept_name, month, year, dept, date_strs, saved), table.default_shifts)
+    grid = index.grid
+    selected = filtered_rows(dept, index, selected_processes, selected_shifts)
+    selected = selected[offset:] if limit is None else selected[offset:offset + limit]
     rows = []
-    for process, employees in dept['processes'].items():
-        if selected_processes and process not in selected_processes:
-            continue
-        for emp in employees:
-            cells = []
-            row_has_selected_shift = False
-            for d in dates:
-                key = f"{process}|{emp}|{d.isoformat()}"
-                current = saved.get(key) or default_shift_for(d)
-                cells.append({
-                    'date_str': d.isoformat(),
-                    'value': current,
-                    'key': key,
-                })
-                if selected_shifts and (current in selected_shifts):
-                    row_has_selected_shift = True
-            if selected_shifts and not row_has_selected_shift:
-                continue
-            rows.append({
-                'process': process,
-                'employee': emp,
-                'cells': cells
+    for process, emp, r in selected:
+        cells = []
+        saved_values = grid.row_values(r)
+        key_prefix = f"{process}|{emp}|"
+        for date_str, default, saved_value in zip(date_strs, table.default_shifts, saved_values):
+            cells.append({
+                'date_str': date_str,
+                'value': saved_value or default,
+                'key': key_prefix + date_str,
             })
+        rows.append({
+            'process': process,
+            'employee': emp,
+            'cells': cells
+        })
 
     return rows, date_headers, dept['shifts']
 
@@ -706,7 +1001,16 @@ def department():
     selected_processes = parse_filter_list('process')
     selected_shifts = parse_filter_list('shift')
 
-    rows, date_headers, shifts = build_rows(name, month, year, selected_processes, selected_shifts)
+    # Read the version first: if a save lands in between, the stale version
+    # makes the next save from this page report a conflict rather than lose it
+    version = get_period_version(name, month, year)
+    total_rows = count_rows(name, month, year, selected_processes, selected_shifts)
+    # Large rotas render the first block only and load the rest on scroll
+    grid_mode = request.args.get('grid')
+    paged = grid_mode == 'paged' or (grid_mode != 'full' and total_rows > GRID_CONFIG['page_threshold'])
+    rows, date_headers, shifts = build_rows(name, month, year, selected_processes, selected_shifts,
+                                            limit=GRID_CONFIG['page_size'] if paged else None)
+    compact = (request.args.get('cells') or GRID_CONFIG['cells']) == 'compact'
     dept = departments[name]
     
     # Check if user can edit this specific department
@@ -722,7 +1026,19 @@ def department():
         dept_name=name,
         month=month,
         year=year,
+        version=version,
         rows=rows,
+        total_rows=total_rows,
+        paged=paged,
+        compact=compact,
+        row_fragments=[] if compact else render_row_fragments(name, month, year, rows, shifts, can_edit_dept),
+        # Same row shape as GET /api/rota, so paged blocks render the same way
+        compact_rows=[{
+            'process': row['process'],
+            'employee': row['employee'],
+            'shifts': [c['value'] for c in row['cells']]
+        } for row in rows] if compact else None,
+        page_size=GRID_CONFIG['page_size'],
         date_headers=date_headers,
         shifts=shifts,
         all_processes=list(dept.get('processes', {}).keys()),
@@ -752,6 +1068,7 @@ def update():
         abort(403)
 
     saved = get_saved_period(name, month, year)
+    changes: Dict[str, Optional[str]] = {}
 
     # Expect field names like: cell[PROCESS][EMPLOYEE][YYYY-MM-DD]
     for k, v in request.form.items():
@@ -767,13 +1084,33 @@ def update():
             continue
         cell_key = f"{process}|{employee}|{date_str}"
         if v:
-            saved[cell_key] = v
+            if saved.get(cell_key) != v:
+                changes[cell_key] = v
         else:
             # Empty selection removes override (fall back to default)
             if cell_key in saved:
-                saved.pop(cell_key)
+                changes[cell_key] = None
 
-    set_saved_period(name, month, year, saved)
+    # Only the cells that actually changed are written, and only if nobody
+    # else saved this period since the page was rendered
+    expected_version = request.form.get('version', type=int)
+    try:
+        commit_period_changes(name, month, year, changes, expected_version)
+    except VersionConflict as conflict:
+        changed_cells = []
+        for cell_key, value in conflict.changed_cells.items():
+            process, employee, date_str = split_cell_key(cell_key)
+            changed_cells.append({'process': process, 'employee': employee, 'date_str': date_str, 'value': value})
+        return make_response(render_template(
+            'rota_conflict.html',
+            dept_name=name,
+            month=month,
+            year=year,
+            expected_version=conflict.expected_version,
+            current_version=conflict.current_version,
+            changed_cells=changed_cells,
+            can_edit=can_edit()
+        ), 409)
 
     # Preserve filters if posted (optional)
     qp = {'name': name, 'month': month, 'year': year}
@@ -796,6 +1133,118 @@ def update():
             query_parts.append((key, str(val)))
     return redirect(url_for('department') + '?' + urlencode(query_parts))
 
+@app.route('/api/rota/<dept>/<int:year>/<int:month>', methods=['GET'])
+def api_get_rota(dept, year, month):
+    """
+    Rota period as compact JSON: one list of shift codes per employee, aligned
+    with "dates". Supports the same process/shift filters as /dept, and
+    offset/limit to fetch one block of the filtered rows ("total" counts them all).
+    Clients sending the previous ETag in If-None-Match get a 304 without the
+    rota being rebuilt.
+    """
+    from flask import jsonify
+
+    departments = get_current_departments()
+    if dept not in departments:
+        abort(404)
+    if not valid_period(month, year):
+        abort(400)
+    try:
+        offset = int(request.args.get('offset') or 0)
+        limit = int(request.args['limit']) if request.args.get('limit') else None
+    except ValueError:
+        abort(400)
+    if offset < 0 or (limit is not None and not 1 <= limit <= GRID_CONFIG['max_page_size']):
+        abort(400)
+
+    # Read before build_rows, as /dept does: a save landing in between only
+    # makes the next poll fetch the rota again
+    version = get_period_version(dept, month, year)
+    etag = period_etag(dept, version)
+    if request.if_none_match.contains(etag):
+        resp = make_response('', 304)
+    else:
+        selected_processes = parse_filter_list('process')
+        selected_shifts = parse_filter_list('shift')
+        rows, date_headers, shifts = build_rows(dept, month, year, selected_processes, selected_shifts,
+                                                offset=offset, limit=limit)
+        total = len(rows) if offset == 0 and limit is None else \
+            count_rows(dept, month, year, selected_processes, selected_shifts)
+        resp = jsonify({
+            'department': dept,
+            'year': year,
+            'month': month,
+            'version': version,
+            'total': total,
+            'offset': offset,
+            'dates': [h['date_str'] for h in date_headers],
+            'shifts': shifts,
+            'rows': [{
+                'process': row['process'],
+                'employee': row['employee'],
+                'shifts': [c['value'] for c in row['cells']]
+            } for row in rows]
+        })
+    resp.set_etag(etag)
+    resp.headers['Cache-Control'] = 'no-cache'
+    return resp
+
+@app.route('/api/rota/<dept>/<int:year>/<int:month>', methods=['PATCH'])
+def api_update_rota(dept, year, month):
+    """
+    Apply only the changed cells of a rota period.
+
+    Body: {"version": 3, "changes": [{"process": ..., "employee": ..., "date": "YYYY-MM-DD",
+    "value": "Night"}, ...]}. An empty or null value removes the override.
+    All changes are written as one new version, or none are if the version is stale.
+    """
+    from flask import jsonify
+
+    departments = get_current_departments()
+    if dept not in departments:
+        abort(404)
+    if not valid_period(month, year):
+        abort(400)
+    if not can_edit_department(dept):
+        abort(403)
+
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict) or not isinstance(payload.get('changes'), list):
+        return jsonify({'success': False, 'message': 'Expected a JSON object with a "changes" list.'}), 400
+    expected_version = payload.get('version')
+    if expected_version is not None and not isinstance(expected_version, int):
+        return jsonify({'success': False, 'message': '"version" must be an integer.'}), 400
+
+    changes: Dict[str, Optional[str]] = {}
+    for change in payload['changes']:
+        try:
+            process, employee, date_str = change['process'], change['employee'], change['date']
+            value = change.get('value') or None
+            date.fromisoformat(date_str)
+        except (TypeError, KeyError, ValueError):
+            return jsonify({'success': False, 'message': f'Invalid change: {change!r}'}), 400
+        if not all(isinstance(x, str) and x and '|' not in x for x in (process, employee)):
+            return jsonify({'success': False, 'message': f'Invalid change: {change!r}'}), 400
+        if value is not None and not isinstance(value, str):
+            return jsonify({'success': False, 'message': f'Invalid change: {change!r}'}), 400
+        changes[f"{process}|{employee}|{date_str}"] = value
+
+    try:
+        version = commit_period_changes(dept, month, year, changes, expected_version)
+    except VersionConflict as conflict:
+        changed_cells = []
+        for cell_key, value in conflict.changed_cells.items():
+            process, employee, date_str = split_cell_key(cell_key)
+            changed_cells.append({'process': process, 'employee': employee, 'date': date_str, 'value': value})
+        return jsonify({
+            'success': False,
+            'message': 'The rota was changed by someone else. Reload to see the latest shifts.',
+            'version': conflict.current_version,
+            'changed_cells': changed_cells
+        }), 409
+
+    return jsonify({'success': True, 'message': f'Saved {len(changes)} change(s).', 'version': version})
+
 @app.route('/export')
 def export_csv():
     name = request.args.get('name')
@@ -812,7 +1261,13 @@ def export_csv():
     selected_shifts = parse_filter_list('shift')
     rows, date_headers, _ = build_rows(name, month, year, selected_processes, selected_shifts)
 
-    # Build CSV text
+    resp = make_response(rota_csv_text(rows, date_headers))
+    resp.headers['Content-Type'] = 'text/csv'
+    resp.headers['Content-Disposition'] = f'attachment; filename="{name}_ShiftRota_{year}-{month:02d}.csv"'
+    return resp
+
+def rota_csv_text(rows: List[Dict], date_headers: List[Dict[str, str]]) -> str:
+    """CSV for one department-month as produced by /export"""
     headers = ['Process', 'Employee'] + [f"{h['weekday']} {h['day']} {h['month_short']}" for h in date_headers]
     lines = []
     lines.append(','.join(['"' + h.replace('"', '""') + '"' for h in headers]))
@@ -820,11 +1275,112 @@ def export_csv():
         cols = [row['process'], row['employee']] + [c['value'] for c in row['cells']]
         esc = ['"' + str(x).replace('"', '""') + '"' for x in cols]
         lines.append(','.join(esc))
-    csv_text = '\n'.join(lines) + '\n'
+    return '\n'.join(lines) + '\n'
 
-    resp = make_response(csv_text)
-    resp.headers['Content-Type'] = 'text/csv'
-    resp.headers['Content-Disposition'] = f'attachment; filename="{name}_ShiftRota_{year}-{month:02d}.csv"'
+class _ZipSink:
+    """Write-only stream for zipfile that buffers bytes until the next drain()"""
+    def __init__(self):
+        self.chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        return data
+
+@app.route('/export-bundle')
+def export_bundle():
+    """
+    Stream a ZIP with one /export-style CSV per department and month of a year.
+    The store is read in a single pass and each entry is sent as soon as it is written.
+    """
+    departments = get_current_departments()
+    try:
+        year = int(request.args.get('year') or date.today().year)
+    except ValueError:
+        abort(400)
+
+    def entry_name(dept_name: str, month: int) -> str:
+        return f"{dept_name}/{dept_name}_ShiftRota_{year}-{month:02d}.csv"
+
+    def generate():
+        sink = _ZipSink()
+        # zipfile falls back to data descriptors on a stream without seek()
+        with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as archive:
+            written = set()
+            for pk, period in get_rota_backend().iter_periods():
+                dept_name, month, period_year = split_period_key(pk)
+                if period_year != year or dept_name not in departments or not 1 <= month <= 12:
+                    continue
+                rows, date_headers, _ = build_rows(dept_name, month, year, [], [], saved=period)
+                archive.writestr(entry_name(dept_name, month), rota_csv_text(rows, date_headers))
+                written.add((dept_name, month))
+                yield sink.drain()
+            # Months nobody has edited yet still get their default shifts
+            for dept_name in departments:
+                for month in range(1, 13):
+                    if (dept_name, month) not in written:
+                        rows, date_headers, _ = build_rows(dept_name, month, year, [], [], saved={})
+                        archive.writestr(entry_name(dept_name, month), rota_csv_text(rows, date_headers))
+                        yield sink.drain()
+        yield sink.drain()
+
+    resp = Response(stream_with_context(generate()), mimetype='application/zip')
+    resp.headers['Content-Disposition'] = f'attachment; filename="ShiftRota_{year}.zip"'
+    return resp
+
+class _CsvLine:
+    """File-like target that hands each csv.writer row back instead of storing it"""
+    def write(self, line: str) -> str:
+        return line
+
+@app.route('/export-range')
+def export_range_csv():
+    """
+    Stream shifts for a date range across one or more departments as CSV,
+    one line per employee per day. Query: start, end (YYYY-MM-DD) and
+    dept (repeatable, defaults to every department).
+    """
+    departments = get_current_departments()
+    try:
+        start = date.fromisoformat(request.args.get('start') or date(date.today().year, 1, 1).isoformat())
+        end = date.fromisoformat(request.args.get('end') or date(start.year, 12, 31).isoformat())
+    except ValueError:
+        abort(400)
+    if end < start:
+        abort(400)
+    dept_names = parse_filter_list('dept') or list(departments.keys())
+    if any(name not in departments for name in dept_names):
+        abort(404)
+
+    def generate():
+        writer = csv.writer(_CsvLine())
+        yield writer.writerow(['Department', 'Process', 'Employee', 'Date', 'Day', 'Shift'])
+        for month, year, table, lo, hi in rota_periods_between(start, end):
+            date_strs = table.date_strs[lo:hi]
+            day_names = table.weekday_labels[lo:hi]
+            defaults = table.default_shifts[lo:hi]
+            for name in dept_names:
+                dept = departments[name]
+                if not dept.get('processes'):
+                    continue
+                # One period in memory at a time; each employee's days go out as one chunk
+                grid = get_period_grid(name, month, year, dept, date_strs)
+                for r, (process, emp) in enumerate(grid.rows):
+                    saved_values = grid.row_values(r)
+                    yield ''.join(
+                        writer.writerow([name, process, emp, date_str, day, saved or default])
+                        for date_str, day, saved, default in zip(date_strs, day_names, saved_values, defaults)
+                    )
+
+    resp = Response(stream_with_context(generate()), mimetype='text/csv')
+    resp.headers['Content-Disposition'] = f'attachment; filename="ShiftRota_{start.isoformat()}_{end.isoformat()}.csv"'
     return resp
 
 # --- Department-specific login ---
@@ -894,9 +1450,9 @@ def forgot_password():
     message = None
     success = False
     error = False
+    notification_job = None
     
-    # Clean up expired tokens on each request
-    cleanup_expired_tokens()
+    # Expired tokens are swept in the background by token_store
     
     if request.method == 'POST':
         action = request.form.get('action')
@@ -910,19 +1466,17 @@ def forgot_password():
             elif department not in get_current_departments():
                 message = 'Invalid department selected.'
                 error = True
+            elif department not in DEPARTMENT_ADMIN_EMAILS:
+                message = f'Failed to send reset email: No admin emails configured for {department}'
+                error = True
             else:
                 # Create reset token
                 token = create_reset_token(department)
                 
-                # Send email
-                email_sent, email_message = send_reset_email(department, token)
-                
-                if email_sent:
-                    message = f'Password reset email sent! {email_message}'
-                    success = True
-                else:
-                    message = f'Failed to send reset email: {email_message}'
-                    error = True
+                # Sent in the background; the page polls the job's status
+                notification_job = queue_reset_email(department, token)
+                message = f'Password reset email queued for {len(DEPARTMENT_ADMIN_EMAILS[department])} administrator(s).'
+                success = True
         
         elif action == 'send_sms_otp':
             department = request.form.get('department', '').strip()
@@ -940,15 +1494,10 @@ def forgot_password():
                 # Create OTP token
                 otp_code = create_otp_token(department)
                 
-                # Send SMS
-                sms_sent, sms_message = send_otp_sms(department, otp_code)
-                
-                if sms_sent:
-                    message = f'OTP sent via SMS to {department} administrators! {sms_message}'
-                    success = True
-                else:
-                    message = f'Failed to send OTP: {sms_message}'
-                    error = True
+                # Sent in the background; the page polls the job's status
+                notification_job = queue_otp_sms(department, otp_code)
+                message = f'OTP sent via SMS to {department} administrators!'
+                success = True
         
         elif action == 'verify_otp':
             department = request.form.get('department', '').strip()
@@ -977,15 +1526,16 @@ def forgot_password():
                 elif validated_dept != department:
                     message = 'OTP does not match the selected department.'
                     error = True
+                elif not consume_otp_token(otp_code):
+                    # Consumed before the password changes, so the OTP works only once across workers
+                    message = 'OTP verification failed: OTP code has already been used'
+                    error = True
                 else:
                     # OTP is valid, update password
-                    departments = get_current_departments()
+                    departments = load_department_config()
                     departments[department]['password'] = new_password
                     save_department_config(departments)
                     
-                    # Remove used OTP
-                    consume_otp_token(otp_code)
-                    
                     message = f'Password for {department} has been successfully updated using SMS OTP!'
                     success = True
         
@@ -1013,8 +1563,50 @@ def forgot_password():
                          message=message, 
                          success=success,
                          error=error,
+                         notification_job=notification_job,
                          departments=departments)
 
+@app.route('/api/notifications/<job_id>')
+def api_notification_status(job_id):
+    """Delivery status of a queued reset email or OTP SMS: queued, running, sent or failed"""
+    from flask import jsonify
+
+    status = notification_queue.status(job_id)
+    if status is None:
+        abort(404)
+    return jsonify(status)
+
+@app.route('/publish-rota', methods=['POST'])
+def publish_rota_route():
+    """Email each employee of a department their schedule for the month; answers with a progress job id"""
+    from flask import jsonify
+
+    name = request.form.get('name')
+    if not name or name not in get_current_departments():
+        abort(404)
+    try:
+        month = int(request.form.get('month'))
+        year = int(request.form.get('year'))
+    except (TypeError, ValueError):
+        abort(400)
+    if not valid_period(month, year):
+        abort(400)
+    if not can_edit_department(name):
+        abort(403)
+
+    job_id = publish_rota(name, month, year)
+    return jsonify({'job_id': job_id, **publications.get(job_id)}), 202
+
+@app.route('/api/publish/<job_id>')
+def api_publish_progress(job_id):
+    """Progress of a rota publication: total, sent, failed (by address), skipped employees"""
+    from flask import jsonify
+
+    progress = publications.get(job_id)
+    if progress is None:
+        abort(404)
+    return jsonify(progress)
+
 @app.route('/debug-forgot-password')
 def debug_forgot_password():
     """Debug route to check template version"""
@@ -1023,10 +1615,7 @@ def debug_forgot_password():
 @app.route('/reset-password/<token>', methods=['GET', 'POST'])
 def reset_password(token):
     """Handle password reset with token validation"""
-    # Clean up expired tokens
-    cleanup_expired_tokens()
-    
-    # Validate token
+    # Validate token (expired tokens are rejected and removed here)
     department = validate_reset_token(token)
     
     if not department:
@@ -1051,18 +1640,16 @@ def reset_password(token):
         elif len(new_password) < 6:
             message = 'Password must be at least 6 characters long.'
             error = True
+        elif not token_store.remove(token):
+            # Consumed before the password changes, so the link works only once across workers
+            message = 'This reset link has already been used. Please request a new password reset.'
+            error = True
         else:
             # Update password
-            departments = get_current_departments()
+            departments = load_department_config()
             departments[department]['password'] = new_password
             save_department_config(departments)
             
-            # Remove used token
-            tokens = load_reset_tokens()
-            if token in tokens:
-                del tokens[token]
-                save_reset_tokens(tokens)
-            
             message = f'Password for {department} has been successfully updated!'
             success = True
     
@@ -1087,7 +1674,7 @@ def department_settings():
     if not is_admin and not user_dept:
         abort(403)
     
-    departments = get_current_departments()
+    departments = load_department_config()
     message = None
     success = False
     
@@ -1164,6 +1751,32 @@ def department_settings():
             else:
                 message = 'Process not found.'
         
+        elif action == 'set_employee_email':
+            target_dept = request.form.get('target_department', user_dept)
+            employee_name = request.form.get('employee_name', '').strip()
+            employee_email = request.form.get('employee_email', '').strip()
+            
+            if not is_admin and target_dept != user_dept:
+                abort(403)
+            
+            if target_dept not in departments:
+                message = 'Invalid department.'
+            elif not any(employee_name in employees for employees in departments[target_dept]['processes'].values()):
+                message = 'Employee not found.'
+            elif employee_email and ('@' not in employee_email or ' ' in employee_email):
+                message = 'Please enter a valid email address.'
+            else:
+                # Addresses used when the rota is published (see render_employee_schedules)
+                emails = departments[target_dept].setdefault('employee_emails', {})
+                if employee_email:
+                    emails[employee_name] = employee_email
+                    message = f'Rota emails for "{employee_name}" will go to {employee_email}!'
+                else:
+                    emails.pop(employee_name, None)
+                    message = f'Email address removed for "{employee_name}".'
+                save_department_config(departments)
+                success = True
+        
         elif action == 'add_shift':
             target_dept = request.form.get('target_department', user_dept)
             shift_code = request.form.get('shift_code', '').strip()
@@ -1460,6 +2073,14 @@ def debug_settings():
                          departments=departments,
                          can_edit=can_edit)
 
+@app.route('/debug-cache-stats')
+def debug_cache_stats():
+    """Hit/miss counters for the in-process data file cache (admins only)"""
+    from flask import jsonify
+    if not session.get('editor'):
+        abort(403)
+    return jsonify(json_file_cache.stats())
+
 @app.route('/test-edit-features')
 def test_edit_features():
     """Diagnostic page to test if edit features are working"""
@@ -1531,171 +2152,267 @@ def calculate_allowance_period(month: int, year: int) -> Tuple[date, date]:
     """
     Calculate the allowance period from 26th of previous month to 25th of current month
     """
-    if month == 1:
-        start_date = date(year - 1, 12, 26)
-    else:
-        start_date = date(year, month - 1, 26)
-    
-    end_date = date(year, month, 25)
-    return start_date, end_date
+    return allowance_period(year, month)
+
+# Which shifts belong to which night shift allowance
+NIGHT_SHIFT_GROUPS = {
+    'EST': ['APAC', 'Afternoon'],
+    'PST': ['Evening', 'Night'],
+}
 
-def get_dates_in_allowance_period(start_date: date, end_date: date) -> List[date]:
+# (dept, month, year) -> (data token, results); one entry per allowance period
+_allowance_cache: Dict[Tuple[str, int, int], Tuple[Tuple, Dict]] = {}
+_allowance_cache_lock = threading.Lock()
+ALLOWANCE_CACHE_SIZE = 64
+
+def get_allowance_grid(dept_name: str, table) -> RotaGrid:
+    """Saved shifts of the allowance window as a grid over the department roster"""
+    all_saved_data = get_window_saved_data(dept_name, table.dates)
+    dept = get_current_departments().get(dept_name, {})
+    return RotaGrid.from_period(all_saved_data, roster_rows(dept.get('processes', {})),
+                                table.date_strs, dept.get('shifts', {}))
+
+def allowance_window_pks(dept_name: str, table) -> List[str]:
+    """Keys of the saved periods an allowance window reads, oldest first (later ones win)"""
+    months = sorted({(d.year, d.month) for d in table.dates})
+    return [period_key(dept_name, m, y) for y, m in months]
+
+def allowance_data_token(dept_name: str, table) -> Tuple:
+    """Versions of every saved period the allowance window reads, and the department's roster digest"""
+    return (get_rota_backend(),) + tuple(allowance_window_versions(dept_name, allowance_window_pks(dept_name, table)))
+
+def allowance_window_versions(dept_name: str, pks: List[str]) -> List:
+    """Versions of the saved periods pks followed by the roster digest: what materialized totals were computed from"""
+    backend = get_rota_backend()
+    return [backend.get_version(pk) for pk in pks] + [department_config_digest(dept_name)]
+
+def allowance_periods_reading(pk: str) -> List[Tuple[int, int]]:
+    """(month, year) of the allowance periods whose window reads the saved period pk"""
+    _, month, year = split_period_key(pk)
+    return [(month, year), (month + 1, year) if month < 12 else (1, year + 1)]
+
+def window_row_counters(table, saved: Dict[str, str], rows) -> Dict[str, List[int]]:
+    """Allowance counters for just the given (process, employee) rows of a window"""
+    rows = list(rows)
+    grid = RotaGrid(rows, table.date_strs)
+    for process, emp in rows:
+        for date_str in table.date_strs:
+            cell_key = f"{process}|{emp}|{date_str}"
+            if saved.get(cell_key):
+                grid.set(cell_key, saved[cell_key])
+    counters = row_counters(grid, table, NIGHT_SHIFT_GROUPS['EST'], NIGHT_SHIFT_GROUPS['PST'])
+    return {f"{process}|{emp}": counters[grid.row_index[(process, emp)]] for process, emp in rows}
+
+def get_allowance_totals(dept_name: str, month: int, year: int) -> Dict[str, List[int]]:
+    """
+    [EST days, PST days, full weekends, half weekends] by 'process|employee'
+    for one allowance period, from the materialized totals when they are current
+    """
+    table = allowance_window(year, month)
+    key = allowance_key(dept_name, month, year)
+    versions = allowance_window_versions(dept_name, allowance_window_pks(dept_name, table))
+    rows = allowance_totals.get(key, versions)
+    if rows is None:
+        rows = grid_row_totals(get_allowance_grid(dept_name, table), table)
+        allowance_totals.put(key, versions, rows)
+    return rows
+
+def grid_row_totals(grid: RotaGrid, table) -> Dict[str, List[int]]:
+    """Allowance counters by 'process|employee' for every row of an allowance window grid"""
+    counters = row_counters(grid, table, NIGHT_SHIFT_GROUPS['EST'], NIGHT_SHIFT_GROUPS['PST'])
+    return {f"{process}|{emp}": counters[grid.row_index[(process, emp)]] for process, emp in grid.rows}
+
+def allowance_periods_between(first: Tuple[int, int], last: Tuple[int, int]) -> List[Tuple[int, int]]:
+    """(month, year) of every allowance period from first to last, both (month, year) and inclusive"""
+    periods = []
+    month, year = first
+    while (year, month) <= (last[1], last[0]):
+        periods.append((month, year))
+        month, year = (month + 1, year) if month < 12 else (1, year + 1)
+    return periods
+
+def get_allowance_rollup(dept_name: str, periods: List[Tuple[int, int]]) -> Dict[str, List[int]]:
+    """
+    Allowance counters by 'process|employee' summed over several allowance
+    periods. Current materialized totals are used as they are; the periods
+    without them are computed from one batched read of the months they cover.
     """
-    Get all dates in the allowance period
+    backend = get_rota_backend()
+    windows = []
+    for month, year in periods:
+        table = allowance_window(year, month)
+        pks = allowance_window_pks(dept_name, table)
+        # Versions before data: a save landing in between only leaves an outdated entry
+        versions = allowance_window_versions(dept_name, pks)
+        windows.append((allowance_key(dept_name, month, year), table, pks, versions))
+    rows_by_key = {key: allowance_totals.get(key, versions) for key, _, _, versions in windows}
+
+    missing = [window for window in windows if rows_by_key[window[0]] is None]
+    if missing:
+        saved = backend.get_periods(sorted({pk for _, _, pks, _ in missing for pk in pks}))
+        dept = get_current_departments().get(dept_name, {})
+        rows = roster_rows(dept.get('processes', {}))
+        entries = {}
+        for key, table, pks, versions in missing:
+            merged: Dict[str, str] = {}
+            for pk in pks:
+                merged.update(saved[pk])
+            grid = RotaGrid.from_period(merged, rows, table.date_strs, dept.get('shifts', {}))
+            rows_by_key[key] = grid_row_totals(grid, table)
+            entries[key] = {'versions': versions, 'rows': rows_by_key[key]}
+        allowance_totals.put_many(entries)
+
+    totals: Dict[str, List[int]] = {}
+    for key, _, _, _ in windows:
+        for row_key, counters in rows_by_key[key].items():
+            current = totals.get(row_key)
+            totals[row_key] = list(counters) if current is None else [a + b for a, b in zip(current, counters)]
+    return totals
+
+def snapshot_allowance_windows(dept_name: str, pk: str, changes: Dict[str, Optional[str]]) -> List[Tuple]:
     """
-    dates = []
-    current = start_date
-    while current <= end_date:
-        dates.append(current)
-        current += timedelta(days=1)
-    return dates
+    Before a commit: for each materialized allowance period that reads the
+    period pk, the versions and saved data it was computed from
+    """
+    backend = get_rota_backend()
+    snapshots = []
+    for month, year in allowance_periods_reading(pk):
+        key = allowance_key(dept_name, month, year)
+        table = allowance_window(year, month)
+        pks = allowance_window_pks(dept_name, table)
+        if pk not in pks or not allowance_totals.has(key):
+            continue
+        versions = allowance_window_versions(dept_name, pks)
+        snapshots.append((key, table, pks, versions, backend.get_periods(pks)))
+    return snapshots
+
+def update_allowance_totals(dept_name: str, pk: str, changes: Dict[str, Optional[str]], snapshots: List[Tuple]) -> None:
+    """After a commit: adjust the materialized totals by the old and new values of the changed cells"""
+    roster = set(roster_rows(get_current_departments().get(dept_name, {}).get('processes', {})))
+    for key, table, pks, versions, periods in snapshots:
+        new_versions = allowance_window_versions(dept_name, pks)
+        expected = list(versions)
+        expected[pks.index(pk)] += 1
+        if new_versions != expected:
+            # Someone else wrote or the roster changed in between; rebuild on the next read
+            allowance_totals.apply(key, versions, None, {})
+            continue
+        rows = set()
+        for cell_key in changes:
+            try:
+                process, emp, date_str = split_cell_key(cell_key)
+            except ValueError:
+                continue
+            if (process, emp) in roster and date_str in table.date_index:
+                rows.add((process, emp))
+        before: Dict[str, str] = {}
+        after: Dict[str, str] = {}
+        for window_pk in pks:
+            before.update(periods[window_pk])
+            if window_pk == pk:
+                changed = dict(periods[window_pk])
+                apply_changes_to_period(changed, changes)
+                after.update(changed)
+            else:
+                after.update(periods[window_pk])
+        old = window_row_counters(table, before, rows)
+        new = window_row_counters(table, after, rows)
+        deltas = {row: [b - a for a, b in zip(old[row], new[row])] for row in old if old[row] != new[row]}
+        allowance_totals.apply(key, versions, new_versions, deltas)
 
-def calculate_night_shift_allowances(dept_name: str, month: int, year: int, shift_type: str) -> Dict:
+def rebuild_allowance_totals(verify: bool = False) -> Tuple[int, List[str]]:
     """
-    Calculate night shift allowances for EST or PST shifts
+    Recompute the totals of every allowance period with saved rota data.
+    With verify, also return the keys whose current stored totals differed.
+    """
+    windows = set()
+    departments = get_current_departments()
+    for pk, _ in get_rota_backend().iter_periods():
+        dept_name, month, _ = split_period_key(pk)
+        if dept_name in departments and 1 <= month <= 12:
+            windows.update((dept_name, m, y) for m, y in allowance_periods_reading(pk))
+    entries = {}
+    mismatches = []
+    for dept_name, month, year in sorted(windows):
+        table = allowance_window(year, month)
+        key = allowance_key(dept_name, month, year)
+        versions = allowance_window_versions(dept_name, allowance_window_pks(dept_name, table))
+        rows = grid_row_totals(get_allowance_grid(dept_name, table), table)
+        if verify:
+            stored = allowance_totals.get(key, versions)
+            if stored is not None and stored != rows:
+                mismatches.append(key)
+        entries[key] = {'versions': versions, 'rows': rows}
+    allowance_totals.put_many(entries)
+    return len(entries), mismatches
+
+def calculate_all_allowances(dept_name: str, month: int, year: int) -> Dict[str, Dict]:
+    """
+    EST, PST and weekend allowances for one period from a single scan of the
+    window, keyed 'EST', 'PST' and 'Weekend'. Results are cached until the
+    underlying rota data changes and must be treated as read-only.
     """
     start_date, end_date = calculate_allowance_period(month, year)
-    period_dates = get_dates_in_allowance_period(start_date, end_date)
-    
-    # Define which shifts belong to which categories
-    est_shifts = ['APAC', 'Afternoon']
-    pst_shifts = ['Evening', 'Night']
-    
-    target_shifts = est_shifts if shift_type == 'EST' else pst_shifts
-    
-    # Load saved data for all months in the period
-    employee_data = {}
-    
-    # Group dates by month to load the right data
-    months_data = {}
-    for d in period_dates:
-        month_key = (d.year, d.month)
-        if month_key not in months_data:
-            months_data[month_key] = []
-        months_data[month_key].append(d)
-    
-    # Load data for each month in the period
-    all_saved_data = {}
-    for (y, m), dates_in_month in months_data.items():
-        saved = get_saved_period(dept_name, m, y)
-        all_saved_data.update(saved)
-    
-    # Get department employees
-    dept = DEPARTMENTS.get(dept_name, {})
-    processes = dept.get('processes', {})
-    
-    for process, employees in processes.items():
-        for emp in employees:
-            employee_data[emp] = {'dates': [], 'total_days': 0}
-            
-            for d in period_dates:
-                key = f"{process}|{emp}|{d.isoformat()}"
-                shift = all_saved_data.get(key) or default_shift_for(d)
-                
-                if shift in target_shifts:
-                    employee_data[emp]['dates'].append({
-                        'date': d.isoformat(),
-                        'shift': shift,
-                        'weekday': d.strftime('%a')
-                    })
-                    employee_data[emp]['total_days'] += 1
-    
-    # Filter out employees with no qualifying shifts
-    employee_data = {emp: data for emp, data in employee_data.items() if data['total_days'] > 0}
-    
-    return {
-        'shift_type': shift_type,
-        'period_start': start_date.strftime('%Y-%m-%d'),
-        'period_end': end_date.strftime('%Y-%m-%d'),
-        'target_shifts': target_shifts,
-        'employees': employee_data
+    table = allowance_window(year, month)
+    key = (dept_name, month, year)
+    # Versions before data: a save landing in between only costs a recompute
+    token = allowance_data_token(dept_name, table)
+    with _allowance_cache_lock:
+        cached = _allowance_cache.get(key)
+    if cached is not None and cached[0] == token:
+        return cached[1]
+
+    grid = get_allowance_grid(dept_name, table)
+    employees = all_allowance_employees(grid, table, NIGHT_SHIFT_GROUPS['EST'], NIGHT_SHIFT_GROUPS['PST'])
+    period = {'period_start': start_date.strftime('%Y-%m-%d'), 'period_end': end_date.strftime('%Y-%m-%d')}
+    results = {
+        'EST': {'shift_type': 'EST', **period, 'target_shifts': NIGHT_SHIFT_GROUPS['EST'], 'employees': employees['EST']},
+        'PST': {'shift_type': 'PST', **period, 'target_shifts': NIGHT_SHIFT_GROUPS['PST'], 'employees': employees['PST']},
+        'Weekend': {**period, 'employees': employees['Weekend']},
     }
+    with _allowance_cache_lock:
+        _allowance_cache.pop(key, None)
+        _allowance_cache[key] = (token, results)
+        while len(_allowance_cache) > ALLOWANCE_CACHE_SIZE:
+            _allowance_cache.pop(next(iter(_allowance_cache)))
+    return results
+
+def calculate_night_shift_allowances(dept_name: str, month: int, year: int, shift_type: str) -> Dict:
+    """
+    Calculate night shift allowances for EST or PST shifts
+    """
+    # Anything other than EST is reported against the PST shifts
+    result = calculate_all_allowances(dept_name, month, year)['EST' if shift_type == 'EST' else 'PST']
+    return dict(result, shift_type=shift_type)
 
 def calculate_weekend_allowances(dept_name: str, month: int, year: int) -> Dict:
     """
     Calculate weekend allowances (both Saturday and Sunday = 1 shift, single day = 0.5 shift)
     """
+    return calculate_all_allowances(dept_name, month, year)['Weekend']
+
+def allowance_summary(dept_name: str, month: int, year: int, allowance_type: str) -> Dict:
+    """
+    Allowance page data from the materialized totals: the same shape as the
+    calculate_* results, with per-employee totals but no dates or weekends
+    """
     start_date, end_date = calculate_allowance_period(month, year)
-    period_dates = get_dates_in_allowance_period(start_date, end_date)
-    
-    # Load saved data for all months in the period
-    months_data = {}
-    for d in period_dates:
-        month_key = (d.year, d.month)
-        if month_key not in months_data:
-            months_data[month_key] = []
-        months_data[month_key].append(d)
-    
-    all_saved_data = {}
-    for (y, m), dates_in_month in months_data.items():
-        saved = get_saved_period(dept_name, m, y)
-        all_saved_data.update(saved)
-    
-    # Get department employees
-    dept = DEPARTMENTS.get(dept_name, {})
-    processes = dept.get('processes', {})
-    
-    employee_data = {}
-    
-    for process, employees in processes.items():
-        for emp in employees:
-            employee_data[emp] = {'weekends': [], 'total_allowances': 0.0}
-            
-            # Group dates by weekend (Saturday-Sunday pairs)
-            weekends = {}
-            for d in period_dates:
-                if d.weekday() in [5, 6]:  # Saturday=5, Sunday=6
-                    # Find the Saturday of this weekend
-                    if d.weekday() == 5:  # Saturday
-                        weekend_start = d
-                    else:  # Sunday
-                        weekend_start = d - timedelta(days=1)
-                    
-                    weekend_key = weekend_start.isoformat()
-                    if weekend_key not in weekends:
-                        weekends[weekend_key] = {'saturday': None, 'sunday': None, 'worked_days': []}
-                    
-                    key = f"{process}|{emp}|{d.isoformat()}"
-                    shift = all_saved_data.get(key) or default_shift_for(d)
-                    
-                    # Check if actually worked (not WO, PL, AL, Holiday)
-                    non_work_shifts = ['WO', 'PL', 'AL', 'Holiday']
-                    if shift not in non_work_shifts:
-                        if d.weekday() == 5:  # Saturday
-                            weekends[weekend_key]['saturday'] = {'date': d, 'shift': shift}
-                            weekends[weekend_key]['worked_days'].append(d)
-                        else:  # Sunday
-                            weekends[weekend_key]['sunday'] = {'date': d, 'shift': shift}
-                            weekends[weekend_key]['worked_days'].append(d)
-            
-            # Calculate allowances for each weekend
-            for weekend_start, weekend_data in weekends.items():
-                worked_saturday = weekend_data['saturday'] is not None
-                worked_sunday = weekend_data['sunday'] is not None
-                
-                if worked_saturday or worked_sunday:
-                    if worked_saturday and worked_sunday:
-                        allowance = 1.0  # Full weekend
-                    else:
-                        allowance = 0.5  # Half weekend
-                    
-                    employee_data[emp]['weekends'].append({
-                        'weekend_start': weekend_start,
-                        'saturday': weekend_data['saturday'],
-                        'sunday': weekend_data['sunday'],
-                        'allowance': allowance,
-                        'worked_days': len(weekend_data['worked_days'])
-                    })
-                    employee_data[emp]['total_allowances'] += allowance
-    
-    # Filter out employees with no weekend work
-    employee_data = {emp: data for emp, data in employee_data.items() if data['total_allowances'] > 0}
-    
-    return {
-        'period_start': start_date.strftime('%Y-%m-%d'),
-        'period_end': end_date.strftime('%Y-%m-%d'),
-        'employees': employee_data
-    }
+    result: Dict = {'period_start': start_date.strftime('%Y-%m-%d'), 'period_end': end_date.strftime('%Y-%m-%d')}
+    employees: Dict[str, Dict] = {}
+    for row_key, (est_days, pst_days, weekend_full, weekend_half) in get_allowance_totals(dept_name, month, year).items():
+        employee = row_key.split('|', 1)[1]
+        # An employee listed under several processes keeps the last process's result, as the calculators do
+        if allowance_type == 'Weekend':
+            employees[employee] = {'weekends': [], 'total_allowances': weekend_full + 0.5 * weekend_half}
+        else:
+            employees[employee] = {'dates': [], 'total_days': est_days if allowance_type == 'EST' else pst_days}
+    if allowance_type == 'Weekend':
+        result['employees'] = {emp: data for emp, data in employees.items() if data['total_allowances'] > 0}
+    else:
+        group = 'EST' if allowance_type == 'EST' else 'PST'
+        result.update(shift_type=allowance_type, target_shifts=NIGHT_SHIFT_GROUPS[group],
+                      employees={emp: data for emp, data in employees.items() if data['total_days'] > 0})
+    return result
 
 @app.route('/night-shift-allowances')
 def night_shift_allowances():
@@ -1703,6 +2420,8 @@ def night_shift_allowances():
     month = int(request.args.get('month', date.today().month))
     year = int(request.args.get('year', date.today().year))
     shift_type = request.args.get('type', 'EST')
+    # ?summary=1 shows totals only, straight from the materialized counters (no scan of the window)
+    details = request.args.get('summary') != '1'
     
     if dept != 'Service Desk':
         abort(404)
@@ -1710,7 +2429,10 @@ def night_shift_allowances():
     if not can_edit():
         abort(403)
     
-    allowances_data = calculate_night_shift_allowances(dept, month, year, shift_type)
+    if details:
+        allowances_data = calculate_night_shift_allowances(dept, month, year, shift_type)
+    else:
+        allowances_data = allowance_summary(dept, month, year, shift_type)
     
     return render_template('allowances.html', 
                          allowances_data=allowances_data,
@@ -1718,6 +2440,7 @@ def night_shift_allowances():
                          month=month,
                          year=year,
                          allowance_type='night_shift',
+                         details=details,
                          can_edit=can_edit())
 
 @app.route('/weekend-allowances')
@@ -1725,6 +2448,7 @@ def weekend_allowances():
     dept = request.args.get('dept')
     month = int(request.args.get('month', date.today().month))
     year = int(request.args.get('year', date.today().year))
+    details = request.args.get('summary') != '1'
     
     if dept != 'Service Desk':
         abort(404)
@@ -1732,7 +2456,10 @@ def weekend_allowances():
     if not can_edit():
         abort(403)
     
-    allowances_data = calculate_weekend_allowances(dept, month, year)
+    if details:
+        allowances_data = calculate_weekend_allowances(dept, month, year)
+    else:
+        allowances_data = allowance_summary(dept, month, year, 'Weekend')
     
     return render_template('allowances.html', 
                          allowances_data=allowances_data,
@@ -1740,8 +2467,104 @@ def weekend_allowances():
                          month=month,
                          year=year,
                          allowance_type='weekend',
+                         details=details,
                          can_edit=can_edit())
 
+@app.route('/api/allowances/<dept>/<int:year>/<int:month>')
+def api_allowance_totals(dept, year, month):
+    """Per-employee EST/PST day counts and weekend allowances for one period, from the materialized totals"""
+    from flask import jsonify
+
+    if dept != 'Service Desk':
+        abort(404)
+    if not valid_period(month, year):
+        abort(400)
+    if not can_edit():
+        abort(403)
+
+    start_date, end_date = calculate_allowance_period(month, year)
+    return jsonify({
+        'department': dept,
+        'period_start': start_date.isoformat(),
+        'period_end': end_date.isoformat(),
+        'rows': allowance_total_rows(get_allowance_totals(dept, month, year))
+    })
+
+def allowance_total_rows(totals: Dict[str, List[int]]) -> List[Dict]:
+    """JSON rows for allowance counters keyed 'process|employee'"""
+    rows = []
+    for row_key, (est_days, pst_days, weekend_full, weekend_half) in totals.items():
+        process, employee = row_key.split('|', 1)
+        rows.append({
+            'process': process,
+            'employee': employee,
+            'est_days': est_days,
+            'pst_days': pst_days,
+            'weekend_full': weekend_full,
+            'weekend_half': weekend_half,
+            'weekend_allowance': weekend_full + 0.5 * weekend_half
+        })
+    return rows
+
+# Longest span the roll-up endpoint accepts, in allowance periods
+ALLOWANCE_ROLLUP_MAX_PERIODS = 60
+FINANCIAL_YEAR_START_MONTH = 4
+
+def parse_period_arg(value: str) -> Tuple[int, int]:
+    """'YYYY-MM' -> (month, year)"""
+    year, month = (int(part) for part in value.split('-'))
+    if not valid_period(month, year):
+        raise ValueError(value)
+    return month, year
+
+@app.route('/api/allowances/<dept>/rollup')
+def api_allowance_rollup(dept):
+    """
+    Per-employee allowance totals summed over a span of allowance periods.
+    Query: from and to as YYYY-MM (the month each period ends in), or span=ytd
+    (financial year to date) or span=12m (trailing twelve periods) ending at to.
+    to defaults to the current allowance period.
+    """
+    from flask import jsonify
+
+    if dept != 'Service Desk':
+        abort(404)
+    if not can_edit():
+        abort(403)
+
+    today = date.today()
+    current = (today.month, today.year) if today.day <= 25 else \
+        ((today.month + 1, today.year) if today.month < 12 else (1, today.year + 1))
+    span = request.args.get('span')
+    try:
+        last = parse_period_arg(request.args['to']) if request.args.get('to') else current
+        if span == 'ytd':
+            start_year = last[1] if last[0] >= FINANCIAL_YEAR_START_MONTH else last[1] - 1
+            first = (FINANCIAL_YEAR_START_MONTH, start_year)
+        elif span == '12m':
+            first = (last[0] + 1, last[1] - 1) if last[0] < 12 else (1, last[1])
+        elif span is None and request.args.get('from'):
+            first = parse_period_arg(request.args['from'])
+        else:
+            abort(400)
+    except ValueError:
+        abort(400)
+    periods = allowance_periods_between(first, last)
+    if not periods or len(periods) > ALLOWANCE_ROLLUP_MAX_PERIODS:
+        abort(400)
+
+    start_date, _ = calculate_allowance_period(*periods[0])
+    _, end_date = calculate_allowance_period(*periods[-1])
+    return jsonify({
+        'department': dept,
+        'from': f"{periods[0][1]}-{periods[0][0]:02d}",
+        'to': f"{periods[-1][1]}-{periods[-1][0]:02d}",
+        'periods': len(periods),
+        'period_start': start_date.isoformat(),
+        'period_end': end_date.isoformat(),
+        'rows': allowance_total_rows(get_allowance_rollup(dept, periods))
+    })
+
 @app.route('/export-allowances')
 def export_allowances():
     """Export allowances data as CSV"""
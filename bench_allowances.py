@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+"""
+Benchmark for the allowance engine.
+
+Builds a synthetic allowance window for a large roster and times the old
+per-cell loops (key string, dict lookup and default shift for every
+process x employee x date) against allowance_engine, with and without NumPy.
+All implementations must return identical results.
+
+Usage: python bench_allowances.py [employees]
+"""
+import sys
+import os
+import time
+import random
+from datetime import timedelta
+
+# Add the app directory to path so we can import app modules
+sys.path.append(os.path.dirname(__file__))
+
+import allowance_engine
+from allowance_engine import night_shift_employees, weekend_employees
+from rota_calendar import allowance_window
+from rota_grid import RotaGrid, roster_rows
+
+SHIFTS = ['APAC', 'Afternoon', 'Evening', 'Night', 'General', 'WO', 'PL', 'AL', 'Holiday']
+PST_SHIFTS = ['Evening', 'Night']
+
+
+def default_shift_for(d):
+    return 'WO' if d.weekday() in (5, 6) else 'General'
+
+
+def legacy_night(saved, processes, dates, target_shifts):
+    employee_data = {}
+    for process, employees in processes.items():
+        for emp in employees:
+            employee_data[emp] = {'dates': [], 'total_days': 0}
+            for d in dates:
+                shift = saved.get(f"{process}|{emp}|{d.isoformat()}") or default_shift_for(d)
+                if shift in target_shifts:
+                    employee_data[emp]['dates'].append({'date': d.isoformat(), 'shift': shift, 'weekday': d.strftime('%a')})
+                    employee_data[emp]['total_days'] += 1
+    return {emp: data for emp, data in employee_data.items() if data['total_days'] > 0}
+
+
+def legacy_weekend(saved, processes, dates):
+    employee_data = {}
+    for process, employees in processes.items():
+        for emp in employees:
+            employee_data[emp] = {'weekends': [], 'total_allowances': 0.0}
+            weekends = {}
+            for d in dates:
+                if d.weekday() in [5, 6]:
+                    weekend_start = d if d.weekday() == 5 else d - timedelta(days=1)
+                    weekend = weekends.setdefault(weekend_start.isoformat(), {'saturday': None, 'sunday': None, 'worked_days': []})
+                    shift = saved.get(f"{process}|{emp}|{d.isoformat()}") or default_shift_for(d)
+                    if shift not in ['WO', 'PL', 'AL', 'Holiday']:
+                        weekend['saturday' if d.weekday() == 5 else 'sunday'] = {'date': d, 'shift': shift}
+                        weekend['worked_days'].append(d)
+            for weekend_start, weekend in weekends.items():
+                if weekend['saturday'] is not None or weekend['sunday'] is not None:
+                    allowance = 1.0 if weekend['saturday'] is not None and weekend['sunday'] is not None else 0.5
+                    employee_data[emp]['weekends'].append({
+                        'weekend_start': weekend_start,
+                        'saturday': weekend['saturday'],
+                        'sunday': weekend['sunday'],
+                        'allowance': allowance,
+                        'worked_days': len(weekend['worked_days'])
+                    })
+                    employee_data[emp]['total_allowances'] += allowance
+    return {emp: data for emp, data in employee_data.items() if data['total_allowances'] > 0}
+
+
+def timed(label, func):
+    start = time.perf_counter()
+    result = func()
+    print(f"{label:>28}: {(time.perf_counter() - start) * 1000:9.1f} ms")
+    return result
+
+
+def main():
+    employees = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    rng = random.Random(42)
+    processes = {f"Process {p}": [f"Employee {p}-{e}" for e in range(employees // 10)] for p in range(10)}
+    table = allowance_window(2025, 3)
+    saved = {}
+    for process, emps in processes.items():
+        for emp in emps:
+            for date_str in table.date_strs:
+                if rng.random() < 0.4:
+                    saved[f"{process}|{emp}|{date_str}"] = rng.choice(SHIFTS)
+
+    print(f"💰 Allowances for {employees} employees x {len(table)} days")
+    print("=" * 50)
+    grid = timed('load grid', lambda: RotaGrid.from_period(saved, roster_rows(processes), table.date_strs))
+    expected_night = timed('legacy PST loop', lambda: legacy_night(saved, processes, table.dates, PST_SHIFTS))
+    expected_weekend = timed('legacy weekend loop', lambda: legacy_weekend(saved, processes, table.dates))
+
+    numpy_module = allowance_engine.np
+    for label, module in (('numpy', numpy_module), ('pure Python', None)):
+        if label == 'numpy' and module is None:
+            print(f"{'engine (numpy)':>28}: not installed")
+            continue
+        allowance_engine.np = module
+        night = timed(f'engine PST ({label})', lambda: night_shift_employees(grid, table, PST_SHIFTS))
+        weekend = timed(f'engine weekend ({label})', lambda: weekend_employees(grid, table))
+        assert night == expected_night and weekend == expected_weekend, f"{label} engine output differs"
+    allowance_engine.np = numpy_module
+    print("\n✓ Engine output identical to the legacy loops")
+
+
+if __name__ == "__main__":
+    main()
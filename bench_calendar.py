@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+"""
+Benchmark for the precomputed calendar tables.
+
+Compares the per-request date work build_rows used to do (walking days to
+the first Monday, then isoformat/strftime for every date and every cell)
+against reading the cached rota_month() table.
+
+Usage: python bench_calendar.py [employees]
+"""
+import sys
+import os
+import timeit
+from datetime import date, timedelta
+
+# Add the app directory to path so we can import app modules
+sys.path.append(os.path.dirname(__file__))
+
+from rota_calendar import rota_month
+
+
+def legacy_month_dates(year, month):
+    """The day-by-day walk get_month_dates() used before rota_calendar"""
+    current = date(year, month, 1)
+    while current.weekday() != 0:
+        current += timedelta(days=1)
+    dates = []
+    week_start = current
+    while week_start.month == month:
+        for day_offset in range(7):
+            dates.append(week_start + timedelta(days=day_offset))
+        week_start += timedelta(days=7)
+    return dates
+
+
+def legacy_request(year, month, employees):
+    dates = legacy_month_dates(year, month)
+    headers = [{
+        'date_str': d.isoformat(),
+        'weekday': d.strftime('%a'),
+        'day': str(d.day),
+        'month_short': d.strftime('%b')
+    } for d in dates]
+    for emp in range(employees):
+        for d in dates:
+            d.isoformat()
+            'WO' if d.weekday() in (5, 6) else 'General'
+    return headers
+
+
+def table_request(year, month, employees):
+    table = rota_month(year, month)
+    headers = list(table.headers)
+    for emp in range(employees):
+        for date_str, default in zip(table.date_strs, table.default_shifts):
+            pass
+    return headers
+
+
+def main():
+    employees = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    assert legacy_request(2025, 3, 1) == table_request(2025, 3, 1)
+    runs = 200
+    print(f"📅 Date work for one /dept request, {employees} employees ({runs} runs)")
+    print("=" * 50)
+    for label, func in (('legacy', legacy_request), ('rota_calendar', table_request)):
+        seconds = timeit.timeit(lambda: func(2025, 3, employees), number=runs)
+        print(f"{label:>14}: {seconds / runs * 1e6:9.1f} µs per request")
+    seconds = timeit.timeit(lambda: legacy_month_dates(2025, 3), number=10000)
+    print(f"{'month walk':>14}: {seconds / 10000 * 1e6:9.1f} µs (legacy get_month_dates)")
+    seconds = timeit.timeit(lambda: rota_month(2025, 3), number=10000)
+    print(f"{'month lookup':>14}: {seconds / 10000 * 1e6:9.1f} µs (cached rota_month)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+#!/usr/bin/env python
+"""
+Benchmark suite for the request hot paths, for sizing and regression checks.
+
+Runs the app against a fixture directory (see generate_synthetic_data.py)
+and times each hot path twice: as a direct call and through the Flask test
+client as an editor would hit it.
+
+    build_rows        build_rows()                      GET /dept
+    update            commit_period_changes(), 1 cell   POST /update, 1 cell
+    export_csv        rota_csv_text(build_rows())       GET /export
+    night_allowances  calculate_night_shift_allowances  GET /export-allowances?type=EST
+    weekend_allowances calculate_weekend_allowances     GET /export-allowances?type=Weekend
+
+Loading the store is timed on its own first. For every path the first call
+is reported apart from the repeats, since it fills the app's in-memory
+caches. The update path edits one cell back and forth and restores it at the
+end, so the fixture keeps its content (its journal and version file grow).
+Results go to a JSON file; --compare prints the change against an earlier run.
+
+Usage: python bench_hot_paths.py [--data data/synthetic/today] [--dept "Service Desk"]
+           [--month YYYY-MM] [--repeat 5] [--out results.json] [--compare earlier.json]
+"""
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import statistics
+from datetime import date, datetime
+from typing import Callable, Dict, List, Optional
+
+BENCH_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'bench')
+
+
+def measure(func: Callable[[], object], repeat: int) -> Dict:
+    """Milliseconds for the first call and for repeat further calls"""
+    start = time.perf_counter()
+    func()
+    first = (time.perf_counter() - start) * 1000
+    runs: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        runs.append((time.perf_counter() - start) * 1000)
+    return {
+        'first_ms': round(first, 3),
+        'median_ms': round(statistics.median(runs), 3) if runs else None,
+        'min_ms': round(min(runs), 3) if runs else None,
+        'max_ms': round(max(runs), 3) if runs else None,
+        'runs': repeat,
+    }
+
+
+def fetch(client, method: str, url: str, expected: int = 200, **kwargs) -> Callable[[], int]:
+    """A request that fails the benchmark unless it answers with the expected status; returns body size"""
+    def call() -> int:
+        resp = client.open(url, method=method, **kwargs)
+        assert resp.status_code == expected, f"{method} {url}: {resp.status_code}"
+        return len(resp.get_data())
+    return call
+
+
+def run_benchmarks(rota_app, dept: str, month: int, year: int, repeat: int) -> Dict:
+    """{path: {'direct': timings, 'client': timings}} plus the store load time"""
+    results: Dict[str, Dict] = {}
+    results['store_load'] = {'direct': measure(rota_app.load_store, 0)}
+
+    client = rota_app.app.test_client()
+    with client.session_transaction() as sess:
+        sess['user'] = 'admin'
+    query = f"month={month}&year={year}"
+
+    rows, headers, _ = rota_app.build_rows(dept, month, year, [], [])
+    if not rows:
+        raise SystemExit(f"{dept} has no employees in {year}-{month:02d}")
+    results['build_rows'] = {
+        'direct': measure(lambda: rota_app.build_rows(dept, month, year, [], []), repeat),
+        'client': measure(fetch(client, 'GET', f"/dept?name={dept}&{query}"), repeat),
+    }
+
+    # One cell flipped between two shifts. Only that cell is posted: /update leaves cells
+    # it is not sent alone, and a whole large grid is past the form field limit anyway
+    cell = rows[0]['cells'][0]
+    original = rota_app.get_saved_period(dept, month, year).get(cell['key'])
+    values = ['Night', 'General'] if cell['value'] != 'Night' else ['General', 'Night']
+    flips = iter(values * (repeat + 1))
+    form = {'name': dept, 'month': month, 'year': year}
+    field = f"cell[{rows[0]['process']}][{rows[0]['employee']}][{cell['date_str']}]"
+
+    def post_update():
+        form[field] = next(flips)
+        return fetch(client, 'POST', '/update', expected=302, data=form)()
+
+    results['update'] = {
+        'direct': measure(lambda: rota_app.commit_period_changes(dept, month, year, {cell['key']: next(flips)}), repeat),
+        'client': None,
+    }
+    flips = iter(values * (repeat + 1))
+    results['update']['client'] = measure(post_update, repeat)
+    rota_app.commit_period_changes(dept, month, year, {cell['key']: original})
+
+    results['export_csv'] = {
+        'direct': measure(lambda: rota_app.rota_csv_text(*rota_app.build_rows(dept, month, year, [], [])[:2]), repeat),
+        'client': measure(fetch(client, 'GET', f"/export?name={dept}&{query}"), repeat),
+    }
+
+    # The allowance pages and exports only exist for Service Desk
+    allowance_routes = dept == 'Service Desk'
+    results['night_allowances'] = {
+        'direct': measure(lambda: rota_app.calculate_night_shift_allowances(dept, month, year, 'EST'), repeat),
+        'client': measure(fetch(client, 'GET', f"/export-allowances?dept={dept}&{query}&type=EST"), repeat)
+        if allowance_routes else None,
+    }
+    results['weekend_allowances'] = {
+        'direct': measure(lambda: rota_app.calculate_weekend_allowances(dept, month, year), repeat),
+        'client': measure(fetch(client, 'GET', f"/export-allowances?dept={dept}&{query}&type=Weekend"), repeat)
+        if allowance_routes else None,
+    }
+    # Rosters come from the fixture's department config; timings over nobody would mean nothing
+    night = rota_app.calculate_night_shift_allowances(dept, month, year, 'EST')['employees']
+    weekend = rota_app.calculate_weekend_allowances(dept, month, year)['employees']
+    if not night or not weekend:
+        raise SystemExit(f"{dept} has no EST or no weekend allowances in {year}-{month:02d}; "
+                         f"the allowance timings measured an empty calculation")
+    return results
+
+
+def compare(results: Dict, earlier: Dict) -> None:
+    print(f"\nCompared with {earlier['timestamp']} (median ms, earlier -> now):")
+    for path, modes in results['results'].items():
+        for mode, timing in modes.items():
+            before = earlier['results'].get(path, {}).get(mode)
+            key = 'median_ms' if timing and timing['median_ms'] is not None else 'first_ms'
+            if not timing or not before or not before.get(key):
+                continue
+            ratio = timing[key] / before[key]
+            print(f"{path + ' ' + mode:>28}: {before[key]:9.2f} -> {timing[key]:9.2f}  ({ratio:.2f}x)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Time the rota hot paths against a fixture")
+    parser.add_argument('--data', help='Fixture directory (default: the app data directory)')
+    parser.add_argument('--dept', default='Service Desk')
+    parser.add_argument('--month', help="YYYY-MM (default: the fixture's last month, else this month)")
+    parser.add_argument('--repeat', type=int, default=5, help='Timed runs after the first call (default: 5)')
+    parser.add_argument('--out', help='Results file (default: data/bench/hot_paths-<time>.json)')
+    parser.add_argument('--compare', help='Earlier results file to compare against')
+    args = parser.parse_args()
+
+    # The app reads its data directory at import time
+    if args.data:
+        os.environ['ROTA_DATA_DIR'] = os.path.abspath(args.data)
+    # Time the requests alone: no notification workers, token sweeper or journal compactor
+    os.environ.setdefault('ROTA_BACKGROUND_WORKERS', '0')
+    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+    import app as rota_app
+    import allowance_engine
+
+    fixture: Optional[Dict] = None
+    fixture_file = os.path.join(rota_app.DATA_DIR, 'synthetic.json')
+    if os.path.exists(fixture_file):
+        with open(fixture_file, 'r', encoding='utf-8') as f:
+            fixture = json.load(f)
+    if args.month:
+        year, month = (int(part) for part in args.month.split('-'))
+    elif fixture:
+        year, month = (int(part) for part in fixture['last_period'].split('-'))
+    else:
+        year, month = date.today().year, date.today().month
+
+    print(f"⏱️ Hot paths for {args.dept} {year}-{month:02d} in {rota_app.DATA_DIR} "
+          f"({rota_app.STORAGE_CONFIG['backend']} storage)")
+    print("=" * 50)
+    results = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'data_dir': rota_app.DATA_DIR,
+        'fixture': fixture,
+        'dept': args.dept,
+        'month': month,
+        'year': year,
+        'repeat': args.repeat,
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'storage': rota_app.STORAGE_CONFIG['backend'],
+            'numpy': allowance_engine.np is not None,
+        },
+        'results': run_benchmarks(rota_app, args.dept, month, year, args.repeat),
+    }
+    for path, modes in results['results'].items():
+        for mode, timing in modes.items():
+            if timing:
+                median = f"{timing['median_ms']:9.2f}" if timing['median_ms'] is not None else ' ' * 9
+                print(f"{path + ' ' + mode:>28}: first {timing['first_ms']:9.2f} ms, median {median} ms")
+
+    out = args.out or os.path.join(BENCH_DIR, f"hot_paths-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"\n✓ Results written to {out}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
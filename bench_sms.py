@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+"""
+Benchmark for SMS fan-out against a local HTTP stub.
+
+The stub answers every POST like TextLocal after a fixed delay, standing in
+for a gateway's latency. Three ways of reaching N recipients are timed:
+the old loop (new connection and one blocking call per number), pooled
+per-recipient sends on the shared fan-out pool (as Twilio/SNS now send,
+here through a stub client registered in the client pool), and TextLocal's
+batched bulk API.
+
+Usage: python bench_sms.py [recipients] [latency_ms]
+"""
+import sys
+import os
+import json
+import time
+import threading
+import urllib.parse
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add the app directory to path so we can import app modules
+sys.path.append(os.path.dirname(__file__))
+
+import app as rota_app
+
+
+def make_stub(latency):
+    class Stub(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # keep-alive, so pooled sessions can reuse connections
+        disable_nagle_algorithm = True
+        hits = 0
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers['Content-Length']))
+            Stub.hits += 1
+            time.sleep(latency)
+            body = json.dumps({'status': 'success', 'sid': 'SM%d' % Stub.hits}).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Stub)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, Stub
+
+
+class StubTwilioClient:
+    """Twilio-shaped client posting each message to the stub over a pooled session"""
+
+    def __init__(self, url):
+        import requests
+        self.session = requests.Session()
+        self.url = url
+        self.messages = self
+
+    def create(self, body, from_, to):
+        response = self.session.post(self.url, data={'To': to, 'Body': body}, timeout=30)
+        return type('Message', (), {'sid': response.json()['sid']})()
+
+
+def legacy_loop(url, phones, message):
+    for phone in phones:
+        data = urllib.parse.urlencode({'To': phone, 'Body': message}).encode('utf-8')
+        with urllib.request.urlopen(urllib.request.Request(url, data=data), timeout=30) as response:
+            json.loads(response.read())
+
+
+def timed(label, func):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:>32}: {elapsed * 1000:9.1f} ms")
+    return elapsed
+
+
+def main():
+    recipients = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    latency = (float(sys.argv[2]) if len(sys.argv) > 2 else 20) / 1000
+    server, stub = make_stub(latency)
+    url = f'http://127.0.0.1:{server.server_port}/send/'
+    phones = [f'+9198{i:08d}' for i in range(recipients)]
+
+    print(f"📱 SMS to {recipients} recipients, {latency * 1000:.0f} ms gateway latency, "
+          f"{rota_app.SMS_CONFIG['max_concurrency']} concurrent sends")
+    print("=" * 50)
+    legacy = timed('legacy loop (one at a time)', lambda: legacy_loop(url, phones, 'hi'))
+
+    key = ('twilio', rota_app.SMS_CONFIG['twilio_account_sid'], rota_app.SMS_CONFIG['twilio_auth_token'])
+    rota_app.sms_clients.put(key, StubTwilioClient(url))
+    stub.hits = 0
+    pooled = timed('pooled per-recipient fan-out', lambda: rota_app.twilio_send_each(phones, 'hi'))
+    assert stub.hits == recipients
+
+    rota_app.SMS_CONFIG['textlocal_url'] = url
+    stub.hits = 0
+    results = {}
+    batched = timed('TextLocal batched', lambda: results.update(rota_app.textlocal_send_each(phones, 'hi')))
+    assert all(ok for ok, _ in results.values()) and len(results) == recipients
+    print(f"\n✓ Fan-out {legacy / pooled:.1f}x faster, batching {legacy / batched:.1f}x "
+          f"({stub.hits} request(s) of up to {rota_app.SMS_CONFIG['textlocal_batch_size']} numbers)")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+In-process cache for parsed JSON data files, and a cross-process file lock.
+
+Entries are revalidated against the file's mtime and size on every read, so a
+write from another process (or an edit by hand) is picked up on the next call,
+while repeated reads in this process are plain dictionary lookups.
+"""
+import os
+import json
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+Signature = Tuple[Optional[Tuple[int, int]], ...]
+
+
+def file_signature(path: str) -> Optional[Tuple[int, int]]:
+    """Return (mtime_ns, size) for a file, or None if it does not exist"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+@contextmanager
+def file_lock(path: str):
+    """Exclusive cross-process lock held on a small lock file"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'a+b') as f:
+        if os.name == 'nt':
+            import msvcrt
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class JsonFileCache:
+    """Process-wide cache of parsed JSON files keyed by path"""
+
+    def __init__(self):
+        self._entries: Dict[str, Tuple[Signature, Any]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _signature(path: str, extra_paths: Iterable[str]) -> Signature:
+        return (file_signature(path),) + tuple(file_signature(p) for p in extra_paths)
+
+    def load(self, path: str, default: Callable[[], Any],
+             loader: Optional[Callable[[str], Any]] = None, extra_paths: Iterable[str] = ()) -> Any:
+        """
+        Return the parsed contents of path. The returned object is shared
+        between callers and must be treated as read-only unless it is saved
+        back through store().
+
+        loader replaces the plain json.load of path, and extra_paths lists
+        other files the loaded value depends on (they are revalidated too).
+        """
+        extra_paths = tuple(extra_paths)
+        sig = self._signature(path, extra_paths)
+        if all(part is None for part in sig):
+            return default()
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == sig:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        try:
+            if loader is not None:
+                value = loader(path)
+            else:
+                with open(path, 'r', encoding='utf-8') as f:
+                    value = json.load(f)
+        except Exception:
+            return default()
+        with self._lock:
+            self._entries[path] = (sig, value)
+        return value
+
+    def store(self, path: str, value: Any, extra_paths: Iterable[str] = ()) -> None:
+        """Record a value just written to path so the next read is a hit"""
+        sig = self._signature(path, tuple(extra_paths))
+        with self._lock:
+            if all(part is None for part in sig):
+                self._entries.pop(path, None)
+            else:
+                self._entries[path] = (sig, value)
+
+    def invalidate(self, path: Optional[str] = None) -> None:
+        """Drop one cached file, or every cached file when path is None"""
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(path, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / total, 4) if total else 0.0,
+                'cached_files': sorted(self._entries.keys()),
+            }
+
+
+# Shared by app.py and the JSON rota storage engine
+json_file_cache = JsonFileCache()
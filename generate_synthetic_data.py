@@ -0,0 +1,231 @@
+#!/usr/bin/env python
+"""
+Synthetic rota fixtures for sizing and benchmarking.
+
+Writes rota_data.json and department_config.json (the app's own layouts)
+for departments x processes x employees x months into a directory that the
+app can run against with ROTA_DATA_DIR. Every department gets the Service
+Desk shift set, and the first one is named Service Desk, the department with
+allowance pages (their rosters are read from the generated config). Each employee has a home shift, works weekends now and then and
+takes the odd day of leave. Like a save from the rota page, every cell of a
+month is stored, unless --fill asks for fewer (the rest fall back to the
+default shifts). The store is written one period at a time, so memory stays
+flat however large the fixture is; synthetic.json records what was generated.
+
+Presets (departments x employees per department x months):
+    today   10 x 27 x 12     the shipped departments, each staffed like Service Desk
+    medium  20 x 500 x 24
+    large   50 x 2000 x 60   about 210 million cells; use the SQLite engine
+                             (python rota_storage.py migrate ...) to serve it
+
+Usage: python generate_synthetic_data.py [--preset today] [--departments N]
+           [--employees N] [--processes N] [--months N] [--end YYYY-MM]
+           [--fill 1.0] [--seed 42] [--out data/synthetic/<preset>]
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+# Add the app directory to path so we can import app modules
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from rota_calendar import rota_month
+
+SYNTHETIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'synthetic')
+
+PRESETS = {
+    'today': {'departments': 10, 'employees': 27, 'processes': 2, 'months': 12},
+    'medium': {'departments': 20, 'employees': 500, 'processes': 5, 'months': 24},
+    'large': {'departments': 50, 'employees': 2000, 'processes': 10, 'months': 60},
+}
+
+# The shipped departments, in order; further ones are numbered
+DEPARTMENT_NAMES = (
+    'Service Desk', 'App Tools', 'App Development', 'Cloud Ops', 'End User Ops', 'Messaging',
+    'Network Team', 'Technology Operation Centre (TOC)', 'Threat Response Team',
+)
+
+SHIFTS = {
+    "APAC": "5AM to 2PM",
+    "Morning": "7AM to 4PM",
+    "General": "11AM to 8PM",
+    "Afternoon": "3PM to 12AM",
+    "Evening": "6PM to 3AM",
+    "Night": "8PM to 5AM",
+    "Weekend": "7AM to 4PM",
+    "PL": "Planned Leave",
+    "AL": "Adhoc Leave",
+    "Early": "1PM to 10PM",
+    "WO": "Weekly Off",
+    "Holiday": "Holiday",
+    "LWD": "Last Working Day",
+}
+
+# Home shifts and how common they are
+HOME_SHIFTS = ['General', 'General', 'General', 'Morning', 'APAC', 'Afternoon', 'Early', 'Evening', 'Night']
+LEAVE_RATE = 0.03
+HOLIDAY_RATE = 0.005
+WEEKEND_WORK_RATE = 0.2
+
+
+def department_names(count: int) -> List[str]:
+    names = list(DEPARTMENT_NAMES[:count])
+    names.extend(f"Department {i + 1:02d}" for i in range(len(names), count))
+    return names
+
+
+def department_config(departments: int, processes: int, employees: int) -> Dict[str, Dict]:
+    """department_config.json with employees spread evenly over each department's processes"""
+    config = {}
+    for d, name in enumerate(department_names(departments)):
+        process_names = [f"Process {p + 1}" for p in range(processes)]
+        staff: Dict[str, List[str]] = {p: [] for p in process_names}
+        for e in range(employees):
+            staff[process_names[e % processes]].append(f"Employee {d + 1:02d}-{e + 1:04d}")
+        config[name] = {
+            'password': 'service123' if name == 'Service Desk' else f"dept{d + 1:02d}123",
+            'processes': staff,
+            'shifts': dict(SHIFTS),
+            'show_filters': True,
+        }
+    return config
+
+
+def months_ending(end_month: int, end_year: int, count: int) -> List[Tuple[int, int]]:
+    """(month, year) for count months up to and including end_month/end_year, oldest first"""
+    months = []
+    index = end_year * 12 + end_month - 1
+    for i in range(index - count + 1, index + 1):
+        months.append((i % 12 + 1, i // 12))
+    return months
+
+
+def period_cells(dept: Dict, month: int, year: int, home: Dict[str, str], fill: float,
+                 rng: random.Random) -> Dict[str, str]:
+    """{process|employee|date: shift} for one department-month"""
+    table = rota_month(year, month)
+    days = list(zip(table.date_strs, table.weekend))
+    cells = {}
+    for process, employees in dept['processes'].items():
+        for emp in employees:
+            prefix = f"{process}|{emp}|"
+            home_shift = home[emp]
+            for date_str, weekend in days:
+                if fill < 1.0 and rng.random() >= fill:
+                    continue
+                r = rng.random()
+                if weekend:
+                    if r >= WEEKEND_WORK_RATE:
+                        shift = 'WO'
+                    else:
+                        shift = 'Weekend' if r < WEEKEND_WORK_RATE / 2 else home_shift
+                elif r < LEAVE_RATE:
+                    shift = 'PL' if r < LEAVE_RATE / 2 else 'AL'
+                elif r < LEAVE_RATE + HOLIDAY_RATE:
+                    shift = 'Holiday'
+                else:
+                    shift = home_shift
+                cells[prefix + date_str] = shift
+    return cells
+
+
+def generate(out_dir: str, departments: int, employees: int, processes: int, months: int,
+             end: Optional[Tuple[int, int]] = None, fill: float = 1.0, seed: int = 42,
+             progress: bool = False) -> Dict:
+    """Write the fixture files into out_dir and return the summary also saved as synthetic.json"""
+    started = time.perf_counter()
+    rng = random.Random(seed)
+    today = date.today()
+    end_month, end_year = end or (today.month, today.year)
+    config = department_config(departments, processes, employees)
+    periods = months_ending(end_month, end_year, months)
+
+    os.makedirs(out_dir, exist_ok=True)
+    with open(os.path.join(out_dir, 'department_config.json'), 'w', encoding='utf-8') as f:
+        json.dump(config, f, indent=2)
+
+    rota_path = os.path.join(out_dir, 'rota_data.json')
+    # A fresh fixture: drop anything the app or an earlier run left next to the store
+    for leftover in ('rota_data.journal', 'rota_data.versions.json',
+                     'allowance_totals.db', 'allowance_totals.db-wal', 'allowance_totals.db-shm'):
+        if os.path.exists(os.path.join(out_dir, leftover)):
+            os.remove(os.path.join(out_dir, leftover))
+
+    cells = 0
+    tmp = rota_path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write('{')
+        first = True
+        for name, dept in config.items():
+            home = {emp: rng.choice(HOME_SHIFTS) for emps in dept['processes'].values() for emp in emps}
+            for month, year in periods:
+                period = period_cells(dept, month, year, home, fill, rng)
+                cells += len(period)
+                f.write(('' if first else ', ') + json.dumps(f"{name}|{month}|{year}") + ': ' + json.dumps(period))
+                first = False
+            if progress:
+                print(f"  {name}: {len(periods)} months, {cells:,} cells so far")
+        f.write('}')
+    os.replace(tmp, rota_path)
+
+    summary = {
+        'departments': departments,
+        'processes': processes,
+        'employees_per_department': employees,
+        'months': months,
+        'first_period': f"{periods[0][1]}-{periods[0][0]:02d}",
+        'last_period': f"{periods[-1][1]}-{periods[-1][0]:02d}",
+        'fill': fill,
+        'seed': seed,
+        'cells': cells,
+        'rota_bytes': os.path.getsize(rota_path),
+        'seconds': round(time.perf_counter() - started, 2),
+    }
+    with open(os.path.join(out_dir, 'synthetic.json'), 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2)
+    return summary
+
+
+def parse_month(value: str) -> Tuple[int, int]:
+    year, month = value.split('-')
+    if not 1 <= int(month) <= 12:
+        raise argparse.ArgumentTypeError(f"invalid month: {value}")
+    return int(month), int(year)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate synthetic rota fixtures")
+    parser.add_argument('--preset', choices=sorted(PRESETS), default='today')
+    parser.add_argument('--departments', type=int, help='Overrides the preset')
+    parser.add_argument('--employees', type=int, help='Employees per department (overrides the preset)')
+    parser.add_argument('--processes', type=int, help='Processes per department (overrides the preset)')
+    parser.add_argument('--months', type=int, help='Months of data (overrides the preset)')
+    parser.add_argument('--end', type=parse_month, help='Last month, YYYY-MM (default: this month)')
+    parser.add_argument('--fill', type=float, default=1.0, help='Share of cells stored (default: 1.0, every cell)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--out', help='Output directory (default: data/synthetic/<preset>)')
+    args = parser.parse_args()
+
+    sizes = dict(PRESETS[args.preset])
+    for key in sizes:
+        if getattr(args, key) is not None:
+            sizes[key] = getattr(args, key)
+    out_dir = args.out or os.path.join(SYNTHETIC_DIR, args.preset)
+
+    print(f"🧪 Synthetic rota: {sizes['departments']} departments x {sizes['employees']} employees "
+          f"x {sizes['months']} months")
+    print("=" * 50)
+    summary = generate(out_dir, sizes['departments'], sizes['employees'], sizes['processes'], sizes['months'],
+                       args.end, args.fill, args.seed, progress=True)
+    print(f"\n✓ {summary['cells']:,} cells ({summary['rota_bytes'] / 1024 / 1024:.1f} MB) "
+          f"from {summary['first_period']} to {summary['last_period']} in {summary['seconds']:.1f} s")
+    print(f"  Run the app against it with ROTA_DATA_DIR={out_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""
+Durable background queue for outgoing notifications (reset emails, SMS OTPs).
+
+Jobs are rows in a small SQLite database, so a request only has to insert
+one row before it returns, and jobs survive a restart. A pool of worker
+threads claims due jobs and runs the handler registered for the job's kind.
+A handler returns (ok, message) like the send_* functions in app.py; a
+failure or exception is retried with exponential backoff until max_attempts,
+then the job is marked failed. Each job names a provider ('smtp', 'twilio',
+...) and at most provider_limits[provider] jobs of that provider run at once
+in this process, so one slow gateway cannot occupy every worker.
+
+Job states: queued -> running -> sent | failed (running -> queued on retry).
+A job left running by a process that died is queued again once its lease
+has expired. Payloads carry OTP codes and reset links, so a job's payload is
+cleared once it is sent or failed, and finished jobs are deleted after
+retention seconds.
+"""
+import os
+import json
+import time
+import uuid
+import atexit
+import logging
+import sqlite3
+import threading
+from typing import Callable, Dict, Optional, Tuple
+
+Handler = Callable[[Dict], Tuple[bool, str]]
+
+
+class NotificationQueue:
+    """SQLite-backed job queue with a worker thread pool"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            provider TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            status TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt REAL NOT NULL,
+            message TEXT,
+            created REAL NOT NULL,
+            updated REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_jobs_due ON jobs (status, next_attempt);
+    """
+
+    def __init__(self, path: str, workers: int = 4, max_attempts: int = 5, backoff: float = 5.0,
+                 max_backoff: float = 600.0, provider_limits: Optional[Dict[str, int]] = None,
+                 default_limit: int = 1, lease: float = 300.0, retention: float = 7 * 24 * 3600):
+        self.path = path
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.provider_limits = dict(provider_limits or {})
+        self.default_limit = default_limit
+        self.lease = lease
+        self.retention = retention
+        self._pruned = 0.0
+        self._handlers: Dict[str, Handler] = {}
+        # provider -> jobs running in this process
+        self._active: Dict[str, int] = {}
+        self._claim_lock = threading.Lock()
+        self._wake = threading.Condition(self._claim_lock)
+        # Bumped on every enqueue and finish, so workers do not sleep through a wake-up
+        self._signals = 0
+        self._stop = threading.Event()
+        self._threads = []
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(self.SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread; sqlite3 connections must not be shared
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def register(self, kind: str, handler: Handler) -> None:
+        self._handlers[kind] = handler
+
+    # --- producers ---
+    def enqueue(self, kind: str, provider: str, payload: Dict) -> str:
+        """Store a job and wake a worker; returns the job id"""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                'INSERT INTO jobs (id, kind, provider, payload, status, next_attempt, created, updated) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (job_id, kind, provider, json.dumps(payload), 'queued', now, now, now)
+            )
+        with self._wake:
+            self._signals += 1
+            self._wake.notify()
+        return job_id
+
+    def status(self, job_id: str) -> Optional[Dict]:
+        """Public view of a job (no payload), or None if unknown"""
+        row = self._connect().execute(
+            'SELECT kind, provider, status, attempts, next_attempt, message, created, updated FROM jobs WHERE id = ?',
+            (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        kind, provider, status, attempts, next_attempt, message, created, updated = row
+        return {
+            'id': job_id,
+            'kind': kind,
+            'provider': provider,
+            'status': status,
+            'attempts': attempts,
+            'next_attempt': next_attempt if status == 'queued' else None,
+            'message': message,
+            'created': created,
+            'updated': updated,
+        }
+
+    def wait(self, job_id: str, timeout: float = 10.0) -> Optional[Dict]:
+        """Poll until the job is sent or failed, or timeout passes; returns its last status"""
+        deadline = time.time() + timeout
+        while True:
+            status = self.status(job_id)
+            if status is None or status['status'] in ('sent', 'failed') or time.time() >= deadline:
+                return status
+            time.sleep(0.02)
+
+    def prune(self) -> int:
+        """Delete jobs that were sent or failed more than retention seconds ago; returns how many"""
+        conn = self._connect()
+        with conn:
+            # Finished jobs have next_attempt set to their finish time, which the due index covers
+            cursor = conn.execute("DELETE FROM jobs WHERE status IN ('sent', 'failed') AND next_attempt < ?",
+                                  (time.time() - self.retention,))
+        self._pruned = time.time()
+        return cursor.rowcount
+
+    # --- workers ---
+    def _limit(self, provider: str) -> int:
+        return self.provider_limits.get(provider, self.default_limit)
+
+    def _claim(self) -> Optional[Tuple[str, str, str, Dict, int]]:
+        """Mark the oldest due job of a provider with a free slot as running"""
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            # Jobs whose worker died mid-send go back on the queue
+            conn.execute("UPDATE jobs SET status = 'queued' WHERE status = 'running' AND updated < ?",
+                         (now - self.lease,))
+            busy = [p for p, n in self._active.items() if n >= self._limit(p)]
+            query = "SELECT id, kind, provider, payload, attempts FROM jobs WHERE status = 'queued' AND next_attempt <= ?"
+            if busy:
+                query += f" AND provider NOT IN ({', '.join('?' * len(busy))})"
+            query += ' ORDER BY next_attempt LIMIT 1'
+            row = conn.execute(query, [now] + busy).fetchone()
+            if row is None:
+                return None
+            job_id, kind, provider, payload, attempts = row
+            conn.execute("UPDATE jobs SET status = 'running', attempts = ?, updated = ? WHERE id = ?",
+                         (attempts + 1, now, job_id))
+        self._active[provider] = self._active.get(provider, 0) + 1
+        return job_id, kind, provider, json.loads(payload), attempts + 1
+
+    def _next_due(self) -> Optional[float]:
+        row = self._connect().execute("SELECT MIN(next_attempt) FROM jobs WHERE status = 'queued'").fetchone()
+        return row[0]
+
+    def _finish(self, job_id: str, provider: str, attempts: int, ok: bool, message: str) -> None:
+        now = time.time()
+        if ok:
+            status, next_attempt = 'sent', now
+        elif attempts >= self.max_attempts:
+            status, next_attempt = 'failed', now
+        else:
+            status = 'queued'
+            next_attempt = now + min(self.backoff * 2 ** (attempts - 1), self.max_backoff)
+        conn = self._connect()
+        with conn:
+            if status == 'queued':
+                conn.execute('UPDATE jobs SET status = ?, next_attempt = ?, message = ?, updated = ? WHERE id = ?',
+                             (status, next_attempt, message, now, job_id))
+            else:
+                # The payload is only needed to send; drop the OTP or reset link it carries
+                conn.execute("UPDATE jobs SET status = ?, next_attempt = ?, message = ?, updated = ?, payload = '{}' "
+                             "WHERE id = ?", (status, next_attempt, message, now, job_id))
+        if now - self._pruned >= min(self.retention, 3600):
+            self.prune()
+        with self._wake:
+            self._active[provider] -= 1
+            self._signals += 1
+            # A provider slot or a retry time may have opened up for the others
+            self._wake.notify_all()
+
+    def run_one(self) -> bool:
+        """Claim and run one due job in the calling thread; False if none was due"""
+        with self._claim_lock:
+            job = self._claim()
+        if job is None:
+            return False
+        job_id, kind, provider, payload, attempts = job
+        handler = self._handlers.get(kind)
+        try:
+            if handler is None:
+                ok, message = False, f"No handler for {kind}"
+            else:
+                ok, message = handler(payload)
+        except Exception as e:
+            logging.exception("Notification job %s failed", job_id)
+            ok, message = False, str(e)
+        self._finish(job_id, provider, attempts, ok, message)
+        return True
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            with self._wake:
+                seen = self._signals
+            try:
+                if self.run_one():
+                    continue
+                next_due = self._next_due()
+            except Exception:
+                logging.exception("Notification worker error")
+                next_due = None
+            with self._wake:
+                if self._stop.is_set():
+                    break
+                # Skip the wait if a job was added or finished since we looked
+                if self._signals == seen:
+                    now = time.time()
+                    # A due job we could not claim waits for its provider's slot (signalled on finish)
+                    timeout = 1.0 if next_due is None or next_due <= now else min(next_due - now, 1.0)
+                    self._wake.wait(timeout)
+
+    def start(self) -> None:
+        """Start the worker threads (idempotent)"""
+        if self._threads:
+            return
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f'notify-worker-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        atexit.register(self.stop)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        with self._wake:
+            self._wake.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        self._stop.clear()
@@ -0,0 +1,71 @@
+"""
+Precomputed calendar tables for rota periods and allowance windows.
+
+A rota period covers the full Mon-Sun weeks whose Monday falls in the month,
+and an allowance window runs from the 26th of the previous month to the 25th.
+Both are fixed for a given year and month, so the dates, their ISO strings,
+labels and weekend flags are computed once and shared. Tables are read-only.
+"""
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+
+class DateTable:
+    """Dates of a period plus everything the views derive from each date"""
+
+    def __init__(self, dates: List[date]):
+        self.dates: Tuple[date, ...] = tuple(dates)
+        self.date_strs: Tuple[str, ...] = tuple(d.isoformat() for d in dates)
+        self.date_index: Dict[str, int] = {s: i for i, s in enumerate(self.date_strs)}
+        self.weekdays: Tuple[int, ...] = tuple(d.weekday() for d in dates)
+        self.weekday_labels: Tuple[str, ...] = tuple(d.strftime('%a') for d in dates)
+        self.month_labels: Tuple[str, ...] = tuple(d.strftime('%b') for d in dates)
+        # Saturday=5, Sunday=6
+        self.weekend: Tuple[bool, ...] = tuple(wd >= 5 for wd in self.weekdays)
+        self.default_shifts: Tuple[str, ...] = tuple('WO' if w else 'General' for w in self.weekend)
+        # Column headers in the shape build_rows hands to the templates
+        self.headers: Tuple[Dict[str, str], ...] = tuple(
+            {'date_str': s, 'weekday': wd, 'day': str(d.day), 'month_short': m}
+            for d, s, wd, m in zip(self.dates, self.date_strs, self.weekday_labels, self.month_labels)
+        )
+        # (Saturday ISO date, Saturday column, Sunday column) per weekend, None where outside the table
+        pairs: Dict[str, List[Optional[int]]] = {}
+        for i, d in enumerate(self.dates):
+            if self.weekdays[i] == 5:
+                pairs.setdefault(self.date_strs[i], [None, None])[0] = i
+            elif self.weekdays[i] == 6:
+                saturday = self.date_strs[i - 1] if i else (d - timedelta(days=1)).isoformat()
+                pairs.setdefault(saturday, [None, None])[1] = i
+        self.weekend_pairs: Tuple[Tuple[str, Optional[int], Optional[int]], ...] = tuple(
+            (key, sat, sun) for key, (sat, sun) in pairs.items()
+        )
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+
+@lru_cache(maxsize=256)
+def rota_month(year: int, month: int) -> DateTable:
+    """Full weeks (Mon-Sun) whose Monday falls in the given month"""
+    first_day = date(year, month, 1)
+    monday = first_day + timedelta(days=(7 - first_day.weekday()) % 7)
+    dates: List[date] = []
+    while monday.month == month:
+        dates.extend(monday + timedelta(days=i) for i in range(7))
+        monday += timedelta(days=7)
+    return DateTable(dates)
+
+
+def allowance_period(year: int, month: int) -> Tuple[date, date]:
+    """26th of the previous month to the 25th of this one"""
+    if month == 1:
+        return date(year - 1, 12, 26), date(year, month, 25)
+    return date(year, month - 1, 26), date(year, month, 25)
+
+
+@lru_cache(maxsize=256)
+def allowance_window(year: int, month: int) -> DateTable:
+    """Every date of the allowance period ending on the 25th of the month"""
+    start, end = allowance_period(year, month)
+    return DateTable([start + timedelta(days=i) for i in range((end - start).days + 1)])
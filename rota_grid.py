@@ -0,0 +1,124 @@
+"""
+Dense in-memory representation of a rota period.
+
+A saved period is a dict of 'process|employee|YYYY-MM-DD' -> shift code, so
+process and employee names are repeated in every key. RotaGrid keeps the
+same information as a row index, a date index and one byte per cell holding
+an interned shift code; code 0 means "no override, use the default shift".
+"""
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from rota_storage import split_cell_key
+
+Row = Tuple[str, str]  # (process, employee)
+
+# Code 0 is reserved for "no override", so at most 255 distinct shift codes fit
+MAX_SHIFT_CODES = 255
+
+
+def roster_rows(processes: Dict[str, List[str]]) -> List[Row]:
+    """Flatten a department's processes map into (process, employee) rows"""
+    rows: List[Row] = []
+    for process, employees in processes.items():
+        for emp in employees:
+            rows.append((process, emp))
+    return rows
+
+
+class RotaGrid:
+    """Rows x dates matrix of uint8 shift codes for one period or window"""
+
+    def __init__(self, rows: Sequence[Row], dates: Sequence[str], shift_codes: Iterable[str] = ()):
+        self.rows: List[Row] = list(rows)
+        self.dates: List[str] = list(dates)
+        self.row_index: Dict[Row, int] = {row: i for i, row in enumerate(self.rows)}
+        self.date_index: Dict[str, int] = {d: i for i, d in enumerate(self.dates)}
+        # Index 0 stands for "no override"
+        self.shift_table: List[Optional[str]] = [None]
+        self.code_of: Dict[str, int] = {}
+        for shift in shift_codes:
+            self.intern(shift)
+        self.width = len(self.dates)
+        self.codes = array('B', bytes(len(self.rows) * self.width))
+        # Overrides with no place in the matrix (row or date outside the grid,
+        # empty values, or more than 255 distinct codes), kept for lossless round-trips
+        self.extras: Dict[str, str] = {}
+
+    def copy(self) -> 'RotaGrid':
+        """Independent copy of the cells; the row and date indexes are shared"""
+        other = RotaGrid.__new__(RotaGrid)
+        other.rows, other.dates = self.rows, self.dates
+        other.row_index, other.date_index = self.row_index, self.date_index
+        other.width = self.width
+        other.shift_table = list(self.shift_table)
+        other.code_of = dict(self.code_of)
+        other.codes = array('B', self.codes)
+        other.extras = dict(self.extras)
+        return other
+
+    def intern(self, shift: str) -> Optional[int]:
+        """Return the code for a shift, adding it to the table if needed"""
+        code = self.code_of.get(shift)
+        if code is None and shift and len(self.shift_table) <= MAX_SHIFT_CODES:
+            code = len(self.shift_table)
+            self.shift_table.append(shift)
+            self.code_of[shift] = code
+        return code
+
+    @classmethod
+    def from_period(cls, period: Dict[str, str], rows: Sequence[Row], dates: Sequence[str],
+                    shift_codes: Iterable[str] = ()) -> 'RotaGrid':
+        """Build a grid from the dict form of a saved period"""
+        grid = cls(rows, dates, shift_codes)
+        for cell_key, value in period.items():
+            if not grid._store(cell_key, value):
+                grid.extras[cell_key] = value
+        return grid
+
+    def _store(self, cell_key: str, value: Optional[str]) -> bool:
+        try:
+            process, employee, date_str = split_cell_key(cell_key)
+        except ValueError:
+            return False
+        r = self.row_index.get((process, employee))
+        c = self.date_index.get(date_str)
+        if r is None or c is None:
+            return False
+        if not value:
+            self.codes[r * self.width + c] = 0
+            return value is None
+        code = self.intern(value)
+        if code is None:
+            return False
+        self.codes[r * self.width + c] = code
+        return True
+
+    def to_period(self) -> Dict[str, str]:
+        """Convert back to the dict form used by the storage engines"""
+        period: Dict[str, str] = {}
+        table = self.shift_table
+        for r, (process, employee) in enumerate(self.rows):
+            base = r * self.width
+            for c, date_str in enumerate(self.dates):
+                code = self.codes[base + c]
+                if code:
+                    period[f"{process}|{employee}|{date_str}"] = table[code]
+        period.update(self.extras)
+        return period
+
+    def get(self, r: int, c: int) -> Optional[str]:
+        """Saved shift at row r, date column c (None if not overridden)"""
+        return self.shift_table[self.codes[r * self.width + c]]
+
+    def set(self, cell_key: str, value: Optional[str]) -> None:
+        """Set or clear (value=None) one cell given its storage key"""
+        self.extras.pop(cell_key, None)
+        if not self._store(cell_key, value) and value is not None:
+            self.extras[cell_key] = value
+
+    def row_values(self, r: int) -> List[Optional[str]]:
+        """Saved shifts for a whole row (None where not overridden)"""
+        table = self.shift_table
+        base = r * self.width
+        return [table[code] for code in self.codes[base:base + self.width]]
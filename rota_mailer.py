@@ -0,0 +1,289 @@
+"""
+Bulk email over a small pool of persistent SMTP connections.
+
+Used to publish a finalised rota: every employee gets their own schedule.
+Each pool connection is opened, upgraded with STARTTLS and authenticated
+once, then carries message after message (smtplib has no command
+pipelining, so messages are streamed back to back on open connections
+instead of paying a connect/TLS/login round trip each). A connection that
+drops is reopened once before the message counts as failed. A shared
+throttle keeps the total send rate under the relay's limit, and a
+PublishProgress object reports how far a run has got. PublicationStore
+keeps that progress in SQLite, so any server process can answer a poll for
+a run another one is sending, and finished runs outlive a restart.
+"""
+import os
+import json
+import time
+import sqlite3
+import smtplib
+import threading
+from email.mime.text import MIMEText
+from queue import Empty, Queue
+from typing import Dict, List, Optional
+
+
+class SmtpPool:
+    """Up to size authenticated SMTP connections, opened on demand and reused"""
+
+    def __init__(self, host: str, port: int, username: str = '', password: str = '',
+                 use_tls: bool = True, size: int = 3, timeout: float = 30.0):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.size = size
+        self.timeout = timeout
+        self._idle: 'Queue[smtplib.SMTP]' = Queue()
+        self._slots = threading.BoundedSemaphore(size)
+        self.opened = 0
+
+    def _open(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.use_tls:
+            server.starttls()
+        if self.password:
+            server.login(self.username, self.password)
+        self.opened += 1
+        return server
+
+    def acquire(self) -> smtplib.SMTP:
+        """An idle connection, or a new one if fewer than size are open (blocks otherwise)"""
+        self._slots.acquire()
+        try:
+            return self._idle.get_nowait()
+        except Empty:
+            try:
+                return self._open()
+            except Exception:
+                self._slots.release()
+                raise
+
+    def release(self, server: Optional[smtplib.SMTP]) -> None:
+        """Return a connection to the pool; pass None for one that was closed"""
+        if server is not None:
+            self._idle.put(server)
+        self._slots.release()
+
+    def send(self, msg: MIMEText) -> None:
+        """Send on a pooled connection, reconnecting once if the server dropped it"""
+        server = self.acquire()
+        try:
+            try:
+                server.send_message(msg)
+            except smtplib.SMTPServerDisconnected:
+                server = self._open()
+                server.send_message(msg)
+        except Exception:
+            self._discard(server)
+            self.release(None)
+            raise
+        self.release(server)
+
+    @staticmethod
+    def _discard(server: Optional[smtplib.SMTP]) -> None:
+        try:
+            if server is not None:
+                server.quit()
+        except Exception:
+            pass
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except Empty:
+                return
+
+
+class Throttle:
+    """Spaces calls at least 1/rate seconds apart across threads (rate <= 0: no limit)"""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class PublishProgress:
+    """Counters for one publication run, safe to read while it is sending"""
+
+    def __init__(self, total: int, skipped: List[str]):
+        self.total = total
+        self.skipped = list(skipped)
+        self.sent = 0
+        self.failed: Dict[str, str] = {}
+        self.started = time.time()
+        self.finished: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def record(self, recipient: str, error: Optional[str] = None) -> None:
+        with self._lock:
+            if error is None:
+                self.sent += 1
+            else:
+                self.failed[recipient] = error
+
+    def finish(self) -> None:
+        self.finished = time.time()
+
+    def as_dict(self) -> Dict:
+        with self._lock:
+            return progress_dict(self.total, self.sent, self.failed, self.skipped, self.started, self.finished)
+
+
+def progress_dict(total: int, sent: int, failed: Dict[str, str], skipped: List[str],
+                  started: float, finished: Optional[float]) -> Dict:
+    """Public view of a publication run"""
+    done = sent + len(failed)
+    return {
+        'status': 'finished' if finished else 'sending',
+        'total': total,
+        'sent': sent,
+        'failed': dict(failed),
+        'skipped': list(skipped),
+        'percent': round(100.0 * done / total, 1) if total else 100.0,
+        'seconds': round((finished or time.time()) - started, 2),
+    }
+
+
+class StoredProgress(PublishProgress):
+    """PublishProgress that writes every change through to a PublicationStore row"""
+
+    def __init__(self, store: 'PublicationStore', job_id: str, total: int, skipped: List[str]):
+        super().__init__(total, skipped)
+        self.store = store
+        self.job_id = job_id
+        # Snapshots are taken and written one at a time, so a later one is never overwritten by an earlier one
+        self._save_lock = threading.Lock()
+
+    def _save(self) -> None:
+        with self._save_lock:
+            with self._lock:
+                failed = dict(self.failed)
+                sent, finished = self.sent, self.finished
+            self.store.save(self.job_id, sent, failed, finished)
+
+    def record(self, recipient: str, error: Optional[str] = None) -> None:
+        super().record(recipient, error)
+        self._save()
+
+    def finish(self) -> None:
+        super().finish()
+        self._save()
+
+
+class PublicationStore:
+    """
+    Publication runs by job id in SQLite, shared by every server process.
+    Runs that finished, or stopped updating (their process died), more than
+    retention seconds ago are dropped.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS publications (
+            id TEXT PRIMARY KEY,
+            total INTEGER NOT NULL,
+            sent INTEGER NOT NULL DEFAULT 0,
+            failed TEXT NOT NULL DEFAULT '{}',
+            skipped TEXT NOT NULL,
+            started REAL NOT NULL,
+            finished REAL,
+            updated REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_publications_updated ON publications (updated);
+    """
+
+    def __init__(self, path: str, retention: float = 3600):
+        self.path = path
+        self.retention = retention
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread; the table is created on first use, not at import
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(self.SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def create(self, job_id: str, total: int, skipped: List[str]) -> StoredProgress:
+        """Store a new run and return the progress object its sender records into"""
+        progress = StoredProgress(self, job_id, total, skipped)
+        conn = self._connect()
+        with conn:
+            conn.execute('INSERT INTO publications (id, total, skipped, started, updated) VALUES (?, ?, ?, ?, ?)',
+                         (job_id, total, json.dumps(progress.skipped), progress.started, progress.started))
+        return progress
+
+    def save(self, job_id: str, sent: int, failed: Dict[str, str], finished: Optional[float]) -> None:
+        conn = self._connect()
+        with conn:
+            conn.execute('UPDATE publications SET sent = ?, failed = ?, finished = ?, updated = ? WHERE id = ?',
+                         (sent, json.dumps(failed), finished, time.time(), job_id))
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Public view of a run, or None if unknown or past retention"""
+        row = self._connect().execute(
+            'SELECT total, sent, failed, skipped, started, finished FROM publications WHERE id = ? AND updated >= ?',
+            (job_id, time.time() - self.retention)
+        ).fetchone()
+        if row is None:
+            return None
+        total, sent, failed, skipped, started, finished = row
+        return progress_dict(total, sent, json.loads(failed), json.loads(skipped), started, finished)
+
+    def prune(self) -> int:
+        """Delete runs last updated more than retention seconds ago; returns how many"""
+        conn = self._connect()
+        with conn:
+            # A finished run is last updated when it finishes
+            cursor = conn.execute('DELETE FROM publications WHERE updated < ?', (time.time() - self.retention,))
+        return cursor.rowcount
+
+
+def send_all(messages: List[MIMEText], pool: SmtpPool, progress: PublishProgress,
+             throttle: Optional[Throttle] = None) -> PublishProgress:
+    """Send messages with one worker per pool connection, recording each result in progress"""
+    pending: 'Queue[MIMEText]' = Queue()
+    for msg in messages:
+        pending.put(msg)
+
+    def worker():
+        while True:
+            try:
+                msg = pending.get_nowait()
+            except Empty:
+                return
+            if throttle is not None:
+                throttle.wait()
+            try:
+                pool.send(msg)
+                progress.record(msg['To'])
+            except Exception as e:
+                progress.record(msg['To'], str(e))
+
+    threads = [threading.Thread(target=worker, name=f'publish-{i}', daemon=True)
+               for i in range(min(pool.size, len(messages)))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    pool.close()
+    progress.finish()
+    return progress
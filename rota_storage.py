@@ -0,0 +1,661 @@
+#!/usr/bin/env python
+"""
+Storage engines for shift rota data.
+
+The rota is kept as a mapping of period keys (``dept|month|year``) to cell
+overrides (``process|employee|YYYY-MM-DD`` -> shift code). Each engine below
+serves that same shape so app.py can switch between them with ROTA_STORAGE.
+
+Usage (one-shot migration of the JSON file into SQLite or per-period shards):
+    python rota_storage.py migrate data/rota_data.json data/rota_data.db
+    python rota_storage.py shard data/rota_data.json data/rota_shards
+"""
+import os
+import re
+import json
+import hashlib
+import logging
+import sqlite3
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from file_cache import JsonFileCache, file_lock, json_file_cache
+
+Period = Dict[str, str]
+Store = Dict[str, Period]
+# Cell key -> new shift code, or None to drop the override
+Changes = Dict[str, Optional[str]]
+
+
+def split_period_key(pk: str) -> Tuple[str, int, int]:
+    """Split 'dept|month|year' into its parts"""
+    dept, month, year = pk.rsplit('|', 2)
+    return dept, int(month), int(year)
+
+
+def split_cell_key(cell_key: str) -> Tuple[str, str, str]:
+    """Split 'process|employee|YYYY-MM-DD' into its parts"""
+    process, rest = cell_key.split('|', 1)
+    employee, date_str = rest.rsplit('|', 1)
+    return process, employee, date_str
+
+
+def apply_changes_to_period(period: Period, changes: Changes) -> None:
+    """Apply a change set to a period dict in place"""
+    for cell_key, value in changes.items():
+        if value:
+            period[cell_key] = value
+        else:
+            period.pop(cell_key, None)
+
+
+def diff_periods(old: Period, new: Period) -> Changes:
+    """Return the change set that turns old into new"""
+    changes: Changes = {}
+    for cell_key, value in new.items():
+        if old.get(cell_key) != value:
+            changes[cell_key] = value
+    for cell_key in old:
+        if cell_key not in new:
+            changes[cell_key] = None
+    return changes
+
+
+# How many versions per period keep their changed cell keys for conflict reports
+VERSION_HISTORY_LIMIT = 20
+
+
+class VersionConflict(Exception):
+    """Raised by commit() when a period moved past the version the caller read"""
+
+    def __init__(self, pk: str, expected_version: int, current_version: int, changed_cells: Dict[str, Optional[str]]):
+        super().__init__(f"{pk} is at version {current_version}, not {expected_version}")
+        self.pk = pk
+        self.expected_version = expected_version
+        self.current_version = current_version
+        # Cell key -> current saved value (None when the override was removed)
+        self.changed_cells = changed_cells
+
+
+def record_version(info: Dict, version: int, cell_keys: Iterable[str]) -> None:
+    """
+    Record that version changed cell_keys in a period's version info
+    ({'version': n, 'history': [[version, [cell keys]], ...]}). Versions at
+    or below the current one are ignored, so journal replays are harmless.
+    """
+    if version <= info.get('version', 0):
+        return
+    info['version'] = version
+    history = info.setdefault('history', [])
+    history.append([version, sorted(cell_keys)])
+    del history[:-VERSION_HISTORY_LIMIT]
+
+
+def changed_since(info: Dict, period: Period, since: int) -> Dict[str, Optional[str]]:
+    """Cells changed after version since, with their current values"""
+    current = info.get('version', 0)
+    known = {version: keys for version, keys in info.get('history', [])}
+    wanted = range(since + 1, current + 1)
+    if 0 <= since <= current and all(v in known for v in wanted):
+        keys = set()
+        for v in wanted:
+            keys.update(known[v])
+    else:
+        # History no longer reaches back that far: report every saved cell
+        keys = set(period)
+    return {cell_key: period.get(cell_key) for cell_key in sorted(keys)}
+
+
+def copy_version_info(info: Dict) -> Dict:
+    return {'version': info.get('version', 0), 'history': [list(h) for h in info.get('history', [])]}
+
+
+class JsonRotaStore:
+    """
+    JSON snapshot (the original data/rota_data.json layout) plus an
+    append-only change journal.
+
+    Cell edits are appended to rota_data.journal as one JSON line per batch
+    and fsync'd, instead of rewriting the whole snapshot. Reads replay the
+    journal on top of the snapshot. The journal is folded back into the
+    snapshot once it grows past journal_compact_bytes, by compact(), or by
+    the background compactor. Period versions travel in the journal lines and
+    are folded into rota_data.versions.json alongside the snapshot.
+
+    The replayed store is held in the shared mtime-validated cache, so reads
+    only touch the disk after either file changes. Writes replace the cached
+    store rather than mutating it; load_all() returns the cached store itself
+    and period getters hand out copies.
+    """
+
+    def __init__(self, path: str, cache: Optional[JsonFileCache] = None,
+                 journal_compact_bytes: int = 256 * 1024):
+        self.path = path
+        base = os.path.splitext(path)[0]
+        self.journal_path = base + '.journal'
+        self.versions_path = base + '.versions.json'
+        self.lock_path = base + '.lock'
+        self.cache = cache or json_file_cache
+        self.journal_compact_bytes = journal_compact_bytes
+        self._lock = threading.RLock()
+        self._compactor: Optional[threading.Thread] = None
+        self._stop_compactor = threading.Event()
+
+    def _read(self, _path: str) -> Tuple[Store, Dict[str, Dict]]:
+        store: Store = {}
+        versions: Dict[str, Dict] = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    store = json.load(f)
+            except Exception:
+                store = {}
+        if os.path.exists(self.versions_path):
+            try:
+                with open(self.versions_path, 'r', encoding='utf-8') as f:
+                    versions = json.load(f)
+            except Exception:
+                versions = {}
+        for entry in self._read_journal():
+            pk, changes = entry['period'], entry['changes']
+            apply_changes_to_period(store.setdefault(pk, {}), changes)
+            if 'version' in entry:
+                record_version(versions.setdefault(pk, {}), entry['version'], changes)
+        return store, versions
+
+    def _read_journal(self) -> Iterator[Dict]:
+        if not os.path.exists(self.journal_path):
+            return
+        with open(self.journal_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A torn final line from an interrupted append
+                    continue
+                yield entry
+
+    def _state(self) -> Tuple[Store, Dict[str, Dict]]:
+        return self.cache.load(self.path, lambda: ({}, {}), loader=self._read,
+                               extra_paths=(self.journal_path, self.versions_path))
+
+    def _remember(self, store: Store, versions: Dict[str, Dict]) -> None:
+        self.cache.store(self.path, (store, versions), extra_paths=(self.journal_path, self.versions_path))
+
+    def _write_snapshot(self, store: Store, versions: Dict[str, Dict]) -> None:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        for path, value in ((self.versions_path, versions), (self.path, store)):
+            tmp = path + '.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(value, f, ensure_ascii=False, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, path)
+        # Replaying the journal over the new snapshot is harmless, so a crash
+        # before this point loses nothing
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+
+    def load_all(self) -> Store:
+        return self._state()[0]
+
+    def save_all(self, store: Store) -> None:
+        with self._lock, file_lock(self.lock_path):
+            old_store, old_versions = self._state()
+            # Copy so the caller's dicts are not aliased by later writes
+            new_store = {pk: dict(period) for pk, period in store.items()}
+            versions = {pk: copy_version_info(info) for pk, info in old_versions.items()}
+            for pk in set(old_store) | set(new_store):
+                diff = diff_periods(old_store.get(pk, {}), new_store.get(pk, {}))
+                if diff:
+                    info = versions.setdefault(pk, {})
+                    record_version(info, info.get('version', 0) + 1, diff)
+            try:
+                self._write_snapshot(new_store, versions)
+            except Exception:
+                self.cache.invalidate(self.path)
+                raise
+            self._remember(new_store, versions)
+
+    def iter_periods(self) -> Iterator[Tuple[str, Period]]:
+        yield from self.load_all().items()
+
+    def get_period(self, pk: str) -> Period:
+        return dict(self.load_all().get(pk, {}))
+
+    def get_periods(self, pks: Iterable[str]) -> Store:
+        store = self.load_all()
+        return {pk: dict(store.get(pk, {})) for pk in pks}
+
+    def get_version(self, pk: str) -> int:
+        return self._state()[1].get(pk, {}).get('version', 0)
+
+    def set_period(self, pk: str, data: Period) -> None:
+        self.apply_changes(pk, diff_periods(self.get_period(pk), data))
+
+    def apply_changes(self, pk: str, changes: Changes) -> None:
+        self.commit(pk, changes)
+
+    def commit(self, pk: str, changes: Changes, expected_version: Optional[int] = None) -> int:
+        """
+        Apply changes as the next version of a period and return that version.
+        With expected_version, raise VersionConflict instead if the period has
+        moved on since the caller read it.
+        """
+        with self._lock, file_lock(self.lock_path):
+            store, versions = self._state()
+            info = versions.get(pk, {})
+            current = info.get('version', 0)
+            if not changes:
+                return current
+            if expected_version is not None and expected_version != current:
+                raise VersionConflict(pk, expected_version, current,
+                                      changed_since(info, store.get(pk, {}), expected_version))
+            new_version = current + 1
+            line = json.dumps({'period': pk, 'version': new_version, 'changes': changes}, ensure_ascii=False) + '\n'
+            try:
+                with open(self.journal_path, 'a', encoding='utf-8') as f:
+                    f.write(line)
+                    f.flush()
+                    os.fsync(f.fileno())
+            except Exception:
+                self.cache.invalidate(self.path)
+                raise
+            # Copy-on-write: readers holding the previous store never see it change
+            period = dict(store.get(pk, {}))
+            apply_changes_to_period(period, changes)
+            store = dict(store)
+            store[pk] = period
+            new_info = copy_version_info(info)
+            record_version(new_info, new_version, changes)
+            versions = dict(versions)
+            versions[pk] = new_info
+            self._remember(store, versions)
+            if os.path.getsize(self.journal_path) >= self.journal_compact_bytes:
+                self._write_snapshot(store, versions)
+                self._remember(store, versions)
+            return new_version
+
+    def compact(self) -> bool:
+        """Fold the journal into the snapshot, return True if there was anything to fold"""
+        with self._lock, file_lock(self.lock_path):
+            if not os.path.exists(self.journal_path):
+                return False
+            store, versions = self._state()
+            self._write_snapshot(store, versions)
+            self._remember(store, versions)
+            return True
+
+    def start_compactor(self, interval: float) -> None:
+        """Compact the journal every interval seconds on a daemon thread"""
+        if self._compactor is not None:
+            return
+
+        def run():
+            while not self._stop_compactor.wait(interval):
+                try:
+                    self.compact()
+                except Exception:
+                    logging.exception("Rota journal compaction failed")
+
+        self._compactor = threading.Thread(target=run, name='rota-journal-compactor', daemon=True)
+        self._compactor.start()
+
+    def stop_compactor(self) -> None:
+        if self._compactor is not None:
+            self._stop_compactor.set()
+            self._compactor.join()
+            self._compactor = None
+            self._stop_compactor.clear()
+
+
+class SqliteRotaStore:
+    """
+    SQLite storage with one row per overridden cell.
+
+    Rows are keyed by (dept, year, month, process, employee, date), so a period
+    read or write is a primary-key range scan, and a second index serves
+    per-employee lookups across periods. Commits run in a BEGIN IMMEDIATE
+    transaction, which SQLite serialises across processes.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS rota_cells (
+            dept TEXT NOT NULL,
+            month INTEGER NOT NULL,
+            year INTEGER NOT NULL,
+            process TEXT NOT NULL,
+            employee TEXT NOT NULL,
+            date TEXT NOT NULL,
+            shift TEXT NOT NULL,
+            PRIMARY KEY (dept, year, month, process, employee, date)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_rota_cells_employee
+            ON rota_cells (dept, employee, date);
+        CREATE TABLE IF NOT EXISTS period_versions (
+            dept TEXT NOT NULL,
+            month INTEGER NOT NULL,
+            year INTEGER NOT NULL,
+            version INTEGER NOT NULL,
+            PRIMARY KEY (dept, year, month)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS period_changes (
+            dept TEXT NOT NULL,
+            month INTEGER NOT NULL,
+            year INTEGER NOT NULL,
+            version INTEGER NOT NULL,
+            cell_key TEXT NOT NULL,
+            PRIMARY KEY (dept, year, month, version, cell_key)
+        ) WITHOUT ROWID;
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(self.SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread; sqlite3 connections must not be shared
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def close(self) -> None:
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def load_all(self) -> Store:
+        store: Store = {}
+        for pk, period in self.iter_periods():
+            store[pk] = period
+        return store
+
+    def save_all(self, store: Store) -> None:
+        for pk, _ in list(self.iter_periods()):
+            if pk not in store:
+                self.set_period(pk, {})
+        for pk, period in store.items():
+            self.set_period(pk, period)
+
+    def iter_periods(self) -> Iterator[Tuple[str, Period]]:
+        cursor = self._connect().execute(
+            'SELECT dept, month, year, process, employee, date, shift FROM rota_cells '
+            'ORDER BY dept, year, month'
+        )
+        current_pk = None
+        period: Period = {}
+        for dept, month, year, process, employee, date_str, shift in cursor:
+            pk = f"{dept}|{month}|{year}"
+            if pk != current_pk:
+                if current_pk is not None:
+                    yield current_pk, period
+                current_pk, period = pk, {}
+            period[f"{process}|{employee}|{date_str}"] = shift
+        if current_pk is not None:
+            yield current_pk, period
+
+    def get_period(self, pk: str) -> Period:
+        dept, month, year = split_period_key(pk)
+        cursor = self._connect().execute(
+            'SELECT process, employee, date, shift FROM rota_cells '
+            'WHERE dept = ? AND year = ? AND month = ?',
+            (dept, year, month)
+        )
+        return {f"{p}|{e}|{d}": s for p, e, d, s in cursor}
+
+    def get_periods(self, pks: Iterable[str]) -> Store:
+        return {pk: self.get_period(pk) for pk in pks}
+
+    def get_version(self, pk: str) -> int:
+        dept, month, year = split_period_key(pk)
+        return self._version(self._connect(), dept, month, year)
+
+    @staticmethod
+    def _version(conn: sqlite3.Connection, dept: str, month: int, year: int) -> int:
+        row = conn.execute(
+            'SELECT version FROM period_versions WHERE dept = ? AND year = ? AND month = ?',
+            (dept, year, month)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def set_period(self, pk: str, data: Period) -> None:
+        self.apply_changes(pk, diff_periods(self.get_period(pk), data))
+
+    def apply_changes(self, pk: str, changes: Changes) -> None:
+        self.commit(pk, changes)
+
+    def commit(self, pk: str, changes: Changes, expected_version: Optional[int] = None) -> int:
+        """
+        Apply changes as the next version of a period and return that version.
+        With expected_version, raise VersionConflict instead if the period has
+        moved on since the caller read it.
+        """
+        dept, month, year = split_period_key(pk)
+        conn = self._connect()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            current = self._version(conn, dept, month, year)
+            if not changes:
+                return current
+            if expected_version is not None and expected_version != current:
+                history: Dict[int, List[str]] = {}
+                for version, cell_key in conn.execute(
+                    'SELECT version, cell_key FROM period_changes '
+                    'WHERE dept = ? AND year = ? AND month = ? AND version > ?',
+                    (dept, year, month, expected_version)
+                ):
+                    history.setdefault(version, []).append(cell_key)
+                info = {'version': current, 'history': sorted(history.items())}
+                raise VersionConflict(pk, expected_version, current,
+                                      changed_since(info, self.get_period(pk), expected_version))
+
+            upserts = []
+            deletes = []
+            for cell_key, value in changes.items():
+                process, employee, date_str = split_cell_key(cell_key)
+                if value:
+                    upserts.append((dept, month, year, process, employee, date_str, value))
+                else:
+                    deletes.append((dept, year, month, process, employee, date_str))
+            if upserts:
+                conn.executemany(
+                    'INSERT OR REPLACE INTO rota_cells '
+                    '(dept, month, year, process, employee, date, shift) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    upserts
+                )
+            if deletes:
+                conn.executemany(
+                    'DELETE FROM rota_cells WHERE dept = ? AND year = ? AND month = ? '
+                    'AND process = ? AND employee = ? AND date = ?',
+                    deletes
+                )
+
+            new_version = current + 1
+            conn.execute(
+                'INSERT OR REPLACE INTO period_versions (dept, month, year, version) VALUES (?, ?, ?, ?)',
+                (dept, month, year, new_version)
+            )
+            conn.executemany(
+                'INSERT OR IGNORE INTO period_changes (dept, month, year, version, cell_key) VALUES (?, ?, ?, ?, ?)',
+                [(dept, month, year, new_version, cell_key) for cell_key in changes]
+            )
+            conn.execute(
+                'DELETE FROM period_changes WHERE dept = ? AND year = ? AND month = ? AND version <= ?',
+                (dept, year, month, new_version - VERSION_HISTORY_LIMIT)
+            )
+            return new_version
+
+    def get_employee_shifts(self, dept: str, employee: str, start: str, end: str) -> List[Dict[str, str]]:
+        """Return an employee's overrides between two ISO dates (inclusive)"""
+        cursor = self._connect().execute(
+            'SELECT process, date, shift FROM rota_cells '
+            'WHERE dept = ? AND employee = ? AND date BETWEEN ? AND ? ORDER BY date',
+            (dept, employee, start, end)
+        )
+        return [{'process': p, 'date': d, 'shift': s} for p, d, s in cursor]
+
+
+class ShardedRotaStore:
+    """
+    One JSON shard file per period under a directory, plus a manifest.
+
+    manifest.json maps each period key to its shard file name. Reads and
+    writes open only the shards they need and each shard has its own lock,
+    so saves to different departments or months never contend. A shard holds
+    {"version": n, "history": [...], "cells": {...}}; shards written before
+    versioning (a bare cells dict) read as version 0.
+    """
+
+    MANIFEST = 'manifest.json'
+
+    def __init__(self, directory: str, cache: Optional[JsonFileCache] = None):
+        self.directory = directory
+        self.manifest_path = os.path.join(directory, self.MANIFEST)
+        self.cache = cache or json_file_cache
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def shard_name(pk: str) -> str:
+        """File name for a period, e.g. service-desk-1a2b3c4d_2025-10.json"""
+        dept, month, year = split_period_key(pk)
+        slug = re.sub(r'[^a-z0-9]+', '-', dept.lower()).strip('-') or 'dept'
+        digest = hashlib.sha1(dept.encode('utf-8')).hexdigest()[:8]
+        return f"{slug}-{digest}_{year}-{month:02d}.json"
+
+    def _manifest(self) -> Dict[str, str]:
+        return self.cache.load(self.manifest_path, dict)
+
+    def _shard_path(self, pk: str) -> str:
+        return os.path.join(self.directory, self._manifest().get(pk) or self.shard_name(pk))
+
+    def _write_json(self, path: str, value) -> None:
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(value, f, ensure_ascii=False, indent=2)
+            os.replace(tmp, path)
+        except Exception:
+            self.cache.invalidate(path)
+            raise
+        self.cache.store(path, value)
+
+    def _register(self, pk: str) -> str:
+        """Make sure pk is in the manifest, return its shard path"""
+        name = self._manifest().get(pk)
+        if name is None:
+            os.makedirs(self.directory, exist_ok=True)
+            with file_lock(self.manifest_path + '.lock'):
+                manifest = dict(self._manifest())
+                name = manifest.setdefault(pk, self.shard_name(pk))
+                self._write_json(self.manifest_path, manifest)
+        return os.path.join(self.directory, name)
+
+    def load_all(self) -> Store:
+        return dict(self.iter_periods())
+
+    def save_all(self, store: Store) -> None:
+        with self._lock:
+            for pk, period in store.items():
+                self.set_period(pk, period)
+            for pk in list(self._manifest()):
+                if pk not in store:
+                    self.set_period(pk, {})
+
+    def iter_periods(self) -> Iterator[Tuple[str, Period]]:
+        for pk in sorted(self._manifest()):
+            yield pk, self.get_period(pk)
+
+    @staticmethod
+    def _unpack(raw: Dict) -> Tuple[Period, Dict]:
+        # Cell keys always contain '|', so they can never clash with these names
+        if 'cells' in raw and 'version' in raw:
+            return raw['cells'], raw
+        return raw, {}
+
+    def _read_shard(self, path: str) -> Tuple[Period, Dict]:
+        return self._unpack(self.cache.load(path, dict))
+
+    def get_period(self, pk: str) -> Period:
+        return dict(self._read_shard(self._shard_path(pk))[0])
+
+    def get_periods(self, pks: Iterable[str]) -> Store:
+        return {pk: self.get_period(pk) for pk in pks}
+
+    def get_version(self, pk: str) -> int:
+        return self._read_shard(self._shard_path(pk))[1].get('version', 0)
+
+    def set_period(self, pk: str, data: Period) -> None:
+        self.commit(pk, diff_periods(self.get_period(pk), data))
+
+    def apply_changes(self, pk: str, changes: Changes) -> None:
+        self.commit(pk, changes)
+
+    def commit(self, pk: str, changes: Changes, expected_version: Optional[int] = None) -> int:
+        """
+        Apply changes as the next version of a period and return that version.
+        With expected_version, raise VersionConflict instead if the period has
+        moved on since the caller read it.
+        """
+        path = self._register(pk)
+        with self._lock, file_lock(path[:-len('.json')] + '.lock'):
+            cells, info = self._read_shard(path)
+            current = info.get('version', 0)
+            if not changes:
+                return current
+            if expected_version is not None and expected_version != current:
+                raise VersionConflict(pk, expected_version, current,
+                                      changed_since(info, cells, expected_version))
+            cells = dict(cells)
+            apply_changes_to_period(cells, changes)
+            new_info = copy_version_info(info)
+            record_version(new_info, current + 1, changes)
+            new_info['cells'] = cells
+            self._write_json(path, new_info)
+            return current + 1
+
+
+def migrate_json_to_shards(json_path: str, directory: str) -> int:
+    """Split the JSON layout into one shard per period, return the shard count"""
+    source = JsonRotaStore(json_path).load_all()
+    ShardedRotaStore(directory).save_all(source)
+    return len(source)
+
+
+def migrate_json_to_sqlite(json_path: str, db_path: str) -> int:
+    """Copy every period from the JSON layout into SQLite, return the cell count"""
+    source = JsonRotaStore(json_path).load_all()
+    target = SqliteRotaStore(db_path)
+    target.save_all(source)
+    target.close()
+    return sum(len(period) for period in source.values())
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Shift rota storage tools")
+    sub = parser.add_subparsers(dest='command', required=True)
+    migrate = sub.add_parser('migrate', help='Copy rota_data.json into a SQLite database')
+    migrate.add_argument('json_path')
+    migrate.add_argument('db_path')
+    shard = sub.add_parser('shard', help='Split rota_data.json into one file per period')
+    shard.add_argument('json_path')
+    shard.add_argument('directory')
+    args = parser.parse_args()
+
+    if args.command == 'migrate':
+        count = migrate_json_to_sqlite(args.json_path, args.db_path)
+        print(f"Migrated {count} cells from {args.json_path} to {args.db_path}")
+        print("Set ROTA_STORAGE=sqlite to serve the rota from the database.")
+    elif args.command == 'shard':
+        count = migrate_json_to_shards(args.json_path, args.directory)
+        print(f"Wrote {count} period shards to {args.directory}")
+        print("Set ROTA_STORAGE=sharded to serve the rota from the shards.")
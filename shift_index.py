@@ -0,0 +1,116 @@
+"""
+Inverted shift index per rota period.
+
+For each department-month, PeriodIndex keeps the period's RotaGrid and, for
+every effective shift (saved value or the default for that date), the rows
+holding it and on how many days. Shift-filtered views then look up matching
+rows instead of scanning every cell. The app carries the index forward on
+each committed change set, and it is rebuilt from the store when the
+period's version or the department's roster moves on some other way (another
+worker process, bulk saves).
+"""
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Iterable, Optional, Set
+
+from rota_grid import RotaGrid
+from rota_storage import split_cell_key
+
+
+class PeriodIndex:
+    """A period's grid plus shift -> {row index: number of days}; read-only once shared"""
+
+    def __init__(self, grid: RotaGrid, default_shifts: Iterable[str]):
+        self.grid = grid
+        self.default_shifts = tuple(default_shifts)
+        self.rows_by_shift: Dict[str, Dict[int, int]] = {}
+        for r in range(len(grid.rows)):
+            for c, saved in enumerate(grid.row_values(r)):
+                self._count(saved or self.default_shifts[c], r, 1)
+
+    def _count(self, shift: str, r: int, delta: int) -> None:
+        rows = self.rows_by_shift.setdefault(shift, {})
+        days = rows.get(r, 0) + delta
+        if days:
+            rows[r] = days
+        else:
+            rows.pop(r, None)
+            if not rows:
+                del self.rows_by_shift[shift]
+
+    def copy(self) -> 'PeriodIndex':
+        other = PeriodIndex.__new__(PeriodIndex)
+        other.grid = self.grid.copy()
+        other.default_shifts = self.default_shifts
+        other.rows_by_shift = {shift: dict(rows) for shift, rows in self.rows_by_shift.items()}
+        return other
+
+    def rows_with(self, shifts: Iterable[str]) -> Set[int]:
+        """Indexes of the grid rows holding any of the shifts on at least one day"""
+        matching: Set[int] = set()
+        for shift in shifts:
+            matching.update(self.rows_by_shift.get(shift, ()))
+        return matching
+
+    def apply(self, changes: Dict[str, Optional[str]]) -> None:
+        """Apply a change set (None clears the override) to the grid and the counts"""
+        grid = self.grid
+        for cell_key, value in changes.items():
+            try:
+                process, employee, date_str = split_cell_key(cell_key)
+            except ValueError:
+                process = employee = date_str = None
+            r = grid.row_index.get((process, employee))
+            c = grid.date_index.get(date_str)
+            if r is not None and c is not None:
+                default = self.default_shifts[c]
+                self._count(grid.get(r, c) or default, r, -1)
+                self._count(value or default, r, 1)
+            grid.set(cell_key, value or None)
+
+
+class ShiftIndex:
+    """Bounded, thread-safe cache of PeriodIndex objects keyed by period"""
+
+    def __init__(self, max_periods: int = 256):
+        self.max_periods = max_periods
+        # period key -> (token, index); the token says which data the index reflects
+        self._entries: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, pk: str, token: Hashable, build: Callable[[], PeriodIndex]) -> PeriodIndex:
+        """Index for pk at token, building it with build() if missing or stale"""
+        with self._lock:
+            entry = self._entries.get(pk)
+            if entry is not None and entry[0] == token:
+                self._entries.move_to_end(pk)
+                return entry[1]
+        index = build()
+        with self._lock:
+            self._entries[pk] = (token, index)
+            self._entries.move_to_end(pk)
+            while len(self._entries) > self.max_periods:
+                self._entries.popitem(last=False)
+        return index
+
+    def apply(self, pk: str, old_token: Hashable, new_token: Hashable,
+              changes: Dict[str, Optional[str]]) -> None:
+        """Move an index from old_token to new_token by applying changes; drop it if it was not at old_token"""
+        with self._lock:
+            entry = self._entries.get(pk)
+            if entry is None:
+                return
+            if entry[0] != old_token:
+                del self._entries[pk]
+                return
+            # Readers may still hold the current index, so update a copy
+            index = entry[1].copy()
+            index.apply(changes)
+            self._entries[pk] = (new_token, index)
+
+    def invalidate(self, pk: Optional[str] = None) -> None:
+        with self._lock:
+            if pk is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(pk, None)
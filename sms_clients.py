@@ -0,0 +1,96 @@
+"""
+Shared SMS provider clients and recipient fan-out.
+
+Provider clients (Twilio, boto3 SNS, an HTTP session for TextLocal) are
+built once per set of credentials and reused, so connection pools and TLS
+sessions survive between messages. Per-recipient sends run on one bounded
+thread pool shared by every sender, which caps concurrent gateway calls for
+the whole process; each recipient gets its own (ok, detail) result.
+Providers with a bulk API are sent in batches instead (see batches()).
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Iterable, Iterator, List, Sequence, Tuple
+
+Result = Tuple[bool, str]
+
+
+class ClientPool:
+    """Provider clients keyed by (provider, credentials), built on first use"""
+
+    def __init__(self):
+        self._clients: Dict[Hashable, Any] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = self._clients[key] = factory()
+            return client
+
+    def put(self, key: Hashable, client: Any) -> None:
+        with self._lock:
+            self._clients[key] = client
+
+    def clear(self) -> None:
+        with self._lock:
+            self._clients.clear()
+
+
+class FanOut:
+    """Runs one call per recipient on a shared, bounded thread pool"""
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='sms-send')
+            return self._executor
+
+    def run(self, recipients: Sequence[str], send_one: Callable[[str], Any]) -> Dict[str, Result]:
+        """{recipient: (ok, detail)}; detail is the send's return value as text, or the error"""
+        def attempt(recipient: str) -> Result:
+            try:
+                outcome = send_one(recipient)
+                return True, '' if outcome is None else str(outcome)
+            except Exception as e:
+                return False, str(e)
+
+        if len(recipients) <= 1:
+            return {recipient: attempt(recipient) for recipient in recipients}
+        futures = [(recipient, self._pool().submit(attempt, recipient)) for recipient in recipients]
+        return {recipient: future.result() for recipient, future in futures}
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+
+def batches(items: Iterable[str], size: int) -> Iterator[List[str]]:
+    """Consecutive lists of at most size items"""
+    batch: List[str] = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def summarize(results: Dict[str, Result], what: str = 'OTP') -> Result:
+    """(ok, message) for the senders' callers: ok if any recipient got the message, failures listed"""
+    sent = sum(1 for ok, _ in results.values() if ok)
+    message = f"{what} sent to {sent} of {len(results)} administrator(s)" if sent < len(results) \
+        else f"{what} sent to {sent} administrator(s)"
+    failed = [f"{recipient}: {detail}" for recipient, (ok, detail) in results.items() if not ok]
+    if failed:
+        message += "; failed: " + "; ".join(failed)
+    return sent > 0, message
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+"""
+Test script for the financial-year allowance batch job
+"""
+import sys
+import os
+import json
+import tempfile
+
+# Add the app directory to path so we can import app modules
+sys.path.append(os.path.dirname(__file__))
+
+from testing_env import isolate_app_data
+isolate_app_data()
+import app as rota_app
+from allowance_batch import financial_year_months, run_batch
+from generate_synthetic_data import generate
+from notification_queue import NotificationQueue
+
+DEPT = 'Service Desk'
+
+def test_financial_year_months():
+    """Test that the financial year runs April to March"""
+    print("\n📅 Testing financial year months...")
+    months = financial_year_months(2025)
+    assert months[0] == (4, 2025) and months[-1] == (3, 2026) and len(months) == 12
+    assert financial_year_months(2025, start_month=1) == [(m, 2025) for m in range(1, 13)]
+    print("✓ Financial year spans April to March")
+
+def test_batch_matches_in_process():
+    """Test that worker-written reports equal the in-process calculation"""
+    print("\n🏭 Testing allowance batch job...")
+    with tempfile.TemporaryDirectory() as tmp:
+        summary = run_batch(2025, [DEPT], workers=2, reports_dir=tmp)
+        assert summary['tasks'] == 36 and len(summary['files']) == 72
+        assert all(os.path.exists(path) for path in summary['files'])
+        dept_dir = os.path.join(tmp, 'FY2025-26', DEPT)
+        with open(os.path.join(dept_dir, f"{DEPT}_PST_Allowances_2026-01.json"), encoding='utf-8') as f:
+            assert json.load(f) == rota_app.calculate_night_shift_allowances(DEPT, 1, 2026, 'PST')
+        with open(os.path.join(dept_dir, f"{DEPT}_Weekend_Allowances_2025-04.json"), encoding='utf-8') as f:
+            expected = json.loads(json.dumps(rota_app.calculate_weekend_allowances(DEPT, 4, 2025),
+                                             default=lambda value: value.isoformat()))
+            assert json.load(f) == expected
+        with open(os.path.join(dept_dir, f"{DEPT}_EST_Allowances_2025-06.csv"), encoding='utf-8') as f:
+            assert f.read() == rota_app.generate_night_shift_csv(
+                rota_app.calculate_night_shift_allowances(DEPT, 6, 2025, 'EST'), 'EST')
+    print("✓ Batch reports match the in-process calculation")
+
+def test_batch_reads_config_and_starts_nothing():
+    """Test that workers report the configured roster and leave queued notifications and tokens alone"""
+    print("\n🧾 Testing allowance batch against a data directory...")
+    data_dir = os.environ.get('ROTA_DATA_DIR')
+    with tempfile.TemporaryDirectory() as tmp:
+        generate(tmp, departments=6, employees=4, processes=2, months=12, end=(3, 2026))
+        queue = NotificationQueue(os.path.join(tmp, 'notifications.db'))
+        job_id = queue.enqueue('reset_email', 'smtp', {'department': 'Messaging', 'token': 't', 'reset_url': 'u'})
+        os.environ['ROTA_DATA_DIR'] = tmp
+        try:
+            summary = run_batch(2025, ['Messaging'], types=['Weekend'], workers=1, reports_dir=os.path.join(tmp, 'reports'))
+        finally:
+            if data_dir is None:
+                del os.environ['ROTA_DATA_DIR']
+            else:
+                os.environ['ROTA_DATA_DIR'] = data_dir
+        employees = set()
+        for path in summary['files']:
+            if path.endswith('.json'):
+                with open(path, encoding='utf-8') as f:
+                    employees.update(json.load(f)['employees'])
+        assert employees and all(emp.startswith('Employee 06-') for emp in employees), employees
+        assert queue.status(job_id)['status'] == 'queued', "Workers do not run the notification queue"
+        assert not os.path.exists(os.path.join(tmp, 'password_reset_tokens.json'))
+    print(f"✓ {len(employees)} employees from the configured roster, nothing sent")
+
+if __name__ == "__main__":
+    print("🧪 Allowance Batch Tests")
+    print("=" * 50)
+    test_financial_year_months()
+    test_batch_matches_in_process()
+    test_batch_reads_config_and_starts_nothing()
+    print("\n🎉 All allowance batch tests passed!")
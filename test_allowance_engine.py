@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+"""
+Test script for the allowance engine (NumPy and pure-Python paths)
+"""
+import sys
+import os
+
+# Add the app directory to path so we can import app modules
+sys.path.append(os.path.dirname(__file__))
+
+import allowance_engine
+from allowance_engine import night_shift_employees, weekend_employees
+from rota_calendar import allowance_window
+from rota_grid import RotaGrid
+
+ROWS = [('L1', 'Asha'), ('L1', 'Ben'), ('L2', 'Chen')]
+
+def engine_paths():
+    """Yield once per available implementation, restoring NumPy afterwards"""
+    numpy_module = allowance_engine.np
+    try:
+        for module in ([numpy_module] if numpy_module is not None else []) + [None]:
+            allowance_engine.np = module
+            yield 'numpy' if module is not None else 'pure Python'
+    finally:
+        allowance_engine.np = numpy_module
+
+def test_night_shift_days():
+    """Test EST/PST day lists and totals"""
+    print("\n🌙 Testing night shift days...")
+    table = allowance_window(2025, 3)  # 2025-02-26 .. 2025-03-25
+    grid = RotaGrid.from_period({
+        'L1|Asha|2025-02-26': 'Night',
+        'L1|Asha|2025-03-01': 'Evening',
+        'L1|Asha|2025-03-26': 'Night',  # outside the window
+        'L2|Chen|2025-03-03': 'APAC',
+    }, ROWS, table.date_strs)
+    for path in engine_paths():
+        result = night_shift_employees(grid, table, ['Evening', 'Night'])
+        assert result == {'Asha': {'dates': [
+            {'date': '2025-02-26', 'shift': 'Night', 'weekday': 'Wed'},
+            {'date': '2025-03-01', 'shift': 'Evening', 'weekday': 'Sat'},
+        ], 'total_days': 2}}, path
+        assert list(night_shift_employees(grid, table, ['APAC', 'Afternoon'])) == ['Chen'], path
+        assert night_shift_employees(grid, table, ['General'])['Ben']['total_days'] == 20, path
+    print("✓ Night shift days counted on every path")
+
+def test_weekend_units():
+    """Test full and half weekends, including a window opening on a Sunday"""
+    print("\n📆 Testing weekend allowances...")
+    table = allowance_window(2025, 11)  # opens on Sunday 2025-10-26
+    assert table.weekend_pairs[0] == ('2025-10-25', None, 0)
+    grid = RotaGrid.from_period({
+        'L1|Asha|2025-10-26': 'General',
+        'L1|Asha|2025-11-01': 'Night',
+        'L1|Asha|2025-11-02': 'APAC',
+        'L1|Ben|2025-11-08': 'PL',
+        'L1|Ben|2025-11-09': 'General',
+    }, ROWS, table.date_strs)
+    for path in engine_paths():
+        result = weekend_employees(grid, table)
+        assert set(result) == {'Asha', 'Ben'}, path
+        asha = result['Asha']
+        assert asha['total_allowances'] == 1.5, path
+        assert [w['weekend_start'] for w in asha['weekends']] == ['2025-10-25', '2025-11-01'], path
+        assert asha['weekends'][0]['saturday'] is None and asha['weekends'][0]['worked_days'] == 1, path
+        assert asha['weekends'][1]['sunday'] == {'date': table.dates[7], 'shift': 'APAC'}, path
+        assert result['Ben']['weekends'][0]['allowance'] == 0.5, path
+    print("✓ Weekend allowances match on every path")
+
+if __name__ == "__main__":
+    print("🧪 Allowance Engine Tests")
+    print("=" * 50)
+    test_night_shift_days()
+    test_weekend_units()
+    print("\n🎉 All allowance engine tests passed!")
@@ -0,0 +1,251 @@
+#!/usr/bin/env python
+"""
+Test script for the materialized allowance totals
+"""
+import sys
+import os
+import copy
+import random
+import tempfile
+
+# Add the app directory to path so we can import app modules
+sys.path.append(os.path.dirname(__file__))
+
+from testing_env import isolate_app_data
+isolate_app_data()
+import app as rota_app
+from allowance_totals import AllowanceTotals, allowance_key
+from rota_calendar import allowance_window, rota_month
+from rota_storage import JsonRotaStore
+
+DEPT = 'Service Desk'
+SHIFTS = ['APAC', 'Afternoon', 'Evening', 'Night', 'General', 'WO', 'PL', 'AL', 'Holiday', None]
+
+def use_temp_data(tmp):
+    rota_app._rota_backend = JsonRotaStore(os.path.join(tmp, 'rota_data.json'))
+    rota_app.allowance_totals = AllowanceTotals(os.path.join(tmp, 'allowance_totals.db'))
+
+def fresh_totals(month, year):
+    """Totals computed from scratch, bypassing the stored entry"""
+    rota_app.allowance_totals.put(allowance_key(DEPT, month, year), [-1], {})
+    return rota_app.get_allowance_totals(DEPT, month, year)
+
+def test_incremental_matches_rebuild():
+    """Test that totals adjusted on each commit equal totals recomputed from scratch"""
+    print("\n🧮 Testing incremental allowance totals...")
+    backend, totals = rota_app._rota_backend, rota_app.allowance_totals
+    rng = random.Random(11)
+    rows = rota_app.roster_rows(rota_app.DEPARTMENTS[DEPT]['processes'])
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            use_temp_data(tmp)
+            windows = [(2, 2025), (3, 2025), (4, 2025)]
+            for month, year in windows:
+                rota_app.get_allowance_totals(DEPT, month, year)
+            for _ in range(60):
+                month = rng.choice([2, 3])
+                dates = rota_month(2025, month).date_strs
+                changes = {}
+                for _ in range(rng.randint(1, 6)):
+                    process, emp = rng.choice(rows)
+                    changes[f'{process}|{emp}|{rng.choice(dates)}'] = rng.choice(SHIFTS)
+                rota_app.commit_period_changes(DEPT, month, 2025, changes)
+                for w_month, w_year in windows:
+                    key = allowance_key(DEPT, w_month, w_year)
+                    versions = rota_app.allowance_window_versions(DEPT, rota_app.allowance_window_pks(DEPT, allowance_window(w_year, w_month)))
+                    stored = rota_app.allowance_totals.get(key, versions)
+                    assert stored is not None and rota_app.get_allowance_totals(DEPT, w_month, w_year) == stored, "Stored totals stay current"
+            for month, year in windows:
+                stored = rota_app.get_allowance_totals(DEPT, month, year)
+                assert stored == fresh_totals(month, year), f"Totals for {month}/{year} drifted"
+            assert any(c[1] for c in stored.values()), "Random data should include PST days"
+    finally:
+        rota_app._rota_backend, rota_app.allowance_totals = backend, totals
+    print("✓ 60 commits applied to the totals without drift")
+
+def test_stale_entry_and_rebuild():
+    """Test that writes the totals cannot follow drop the entry, and rebuild repairs totals"""
+    print("\n🔧 Testing stale totals and rebuild...")
+    backend, totals = rota_app._rota_backend, rota_app.allowance_totals
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            use_temp_data(tmp)
+            process, emp = rota_app.roster_rows(rota_app.DEPARTMENTS[DEPT]['processes'])[0]
+            rota_app.get_allowance_totals(DEPT, 3, 2025)
+            # A write that bypasses commit_period_changes (e.g. another tool)
+            rota_app._rota_backend.commit(f'{DEPT}|3|2025', {f'{process}|{emp}|2025-03-05': 'Night'})
+            totals_now = rota_app.get_allowance_totals(DEPT, 3, 2025)
+            assert totals_now[f'{process}|{emp}'][1] == 1, "Outdated entry is recomputed"
+
+            # Corrupt a current entry, then verify/repair
+            key = allowance_key(DEPT, 3, 2025)
+            versions = rota_app.allowance_window_versions(DEPT, rota_app.allowance_window_pks(DEPT, allowance_window(2025, 3)))
+            entry = rota_app.allowance_totals.get(key, versions)
+            rota_app.allowance_totals.put(key, versions, dict(entry, **{f'{process}|{emp}': [9, 9, 9, 9]}))
+            periods, mismatches = rota_app.rebuild_allowance_totals(verify=True)
+            assert mismatches == [key] and periods == 2
+            assert rota_app.get_allowance_totals(DEPT, 3, 2025)[f'{process}|{emp}'] == [0, 1, 0, 0]
+            assert rota_app.rebuild_allowance_totals(verify=True)[1] == []
+    finally:
+        rota_app._rota_backend, rota_app.allowance_totals = backend, totals
+    print("✓ Stale totals rebuilt and mismatches reported")
+
+def test_totals_api():
+    """Test the allowance totals endpoint"""
+    print("\n📊 Testing allowance totals API...")
+    backend, totals = rota_app._rota_backend, rota_app.allowance_totals
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            use_temp_data(tmp)
+            process, emp = rota_app.roster_rows(rota_app.DEPARTMENTS[DEPT]['processes'])[0]
+            rota_app.commit_period_changes(DEPT, 3, 2025, {
+                f'{process}|{emp}|2025-03-08': 'Night',
+                f'{process}|{emp}|2025-03-09': 'APAC',
+                f'{process}|{emp}|2025-03-15': 'General',
+            })
+            client = rota_app.app.test_client()
+            assert client.get(f'/api/allowances/{DEPT}/2025/3').status_code == 403
+            with client.session_transaction() as sess:
+                sess['user'] = 'admin'
+            body = client.get(f'/api/allowances/{DEPT}/2025/3').get_json()
+            assert body['period_start'] == '2025-02-26' and body['period_end'] == '2025-03-25'
+            row = next(r for r in body['rows'] if (r['process'], r['employee']) == (process, emp))
+            assert row == {'process': process, 'employee': emp, 'est_days': 1, 'pst_days': 1,
+                           'weekend_full': 1, 'weekend_half': 1, 'weekend_allowance': 1.5}
+            assert client.get('/api/allowances/Nope/2025/3').status_code == 404
+            assert client.get(f'/api/allowances/{DEPT}/1/1').status_code == 400
+    finally:
+        rota_app._rota_backend, rota_app.allowance_totals = backend, totals
+    print("✓ Totals served per employee")
+
+def test_pages_read_totals():
+    """Test that the allowance pages list dates by default, show stored totals with summary=1, and an empty save keeps them"""
+    print("\n📄 Testing allowance pages from totals...")
+    backend, totals = rota_app._rota_backend, rota_app.allowance_totals
+    compute = rota_app.all_allowance_employees
+    calls = []
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            use_temp_data(tmp)
+            process, emp = rota_app.roster_rows(rota_app.DEPARTMENTS[DEPT]['processes'])[0]
+            rota_app.commit_period_changes(DEPT, 3, 2025, {
+                f'{process}|{emp}|2025-03-04': 'Night',
+                f'{process}|{emp}|2025-03-05': 'Evening',
+                f'{process}|{emp}|2025-03-08': 'APAC',
+            })
+            key = allowance_key(DEPT, 3, 2025)
+            rota_app.get_allowance_totals(DEPT, 3, 2025)
+            rota_app.commit_period_changes(DEPT, 3, 2025, {})
+            assert rota_app.allowance_totals.has(key), "A save without changes keeps the totals"
+
+            for kind in ('EST', 'PST', 'Weekend'):
+                summary = rota_app.allowance_summary(DEPT, 3, 2025, kind)
+                full = rota_app.calculate_weekend_allowances(DEPT, 3, 2025) if kind == 'Weekend' \
+                    else rota_app.calculate_night_shift_allowances(DEPT, 3, 2025, kind)
+                total = 'total_allowances' if kind == 'Weekend' else 'total_days'
+                assert {e: d[total] for e, d in summary['employees'].items()} == \
+                       {e: d[total] for e, d in full['employees'].items()}, kind
+
+            rota_app.all_allowance_employees = lambda *args: calls.append(args) or compute(*args)
+            rota_app._allowance_cache.clear()
+            client = rota_app.app.test_client()
+            with client.session_transaction() as sess:
+                sess['user'] = 'admin'
+            query = f'dept={DEPT}&month=3&year=2025'
+            html = client.get(f'/night-shift-allowances?{query}&type=PST&summary=1').get_data(as_text=True)
+            assert emp in html and 'Show dates' in html and 'class="shift-entry"' not in html
+            assert client.get(f'/weekend-allowances?{query}&summary=1').status_code == 200
+            assert not calls, "Summary pages read the stored totals"
+            html = client.get(f'/night-shift-allowances?{query}&type=PST').get_data(as_text=True)
+            assert '2025-03-04' in html and 'Totals only' in html and len(calls) == 1, "Dates are listed by default"
+            html = client.get(f'/weekend-allowances?{query}').get_data(as_text=True)
+            assert 'class="weekend-entry"' in html and len(calls) == 1
+    finally:
+        rota_app._rota_backend, rota_app.allowance_totals = backend, totals
+        rota_app.all_allowance_employees = compute
+    print("✓ Pages served from totals, dates on request")
+
+def test_roster_from_config():
+    """Test that totals follow the saved department configuration, and a roster edit replaces them"""
+    print("\n👥 Testing totals against the configured roster...")
+    backend, totals = rota_app._rota_backend, rota_app.allowance_totals
+    get_departments = rota_app.get_current_departments
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            use_temp_data(tmp)
+            departments = copy.deepcopy(get_departments())
+            process = next(iter(departments[DEPT]['processes']))
+            rota_app.get_current_departments = lambda: departments
+            rota_app.commit_period_changes(DEPT, 3, 2025, {f'{process}|New Starter|2025-03-05': 'Night'})
+            assert f'{process}|New Starter' not in rota_app.get_allowance_totals(DEPT, 3, 2025)
+
+            departments = copy.deepcopy(departments)
+            departments[DEPT]['processes'][process].append('New Starter')
+            assert rota_app.get_allowance_totals(DEPT, 3, 2025)[f'{process}|New Starter'] == [0, 1, 0, 0]
+            rota_app.commit_period_changes(DEPT, 3, 2025, {f'{process}|New Starter|2025-03-06': 'Night'})
+            assert rota_app.get_allowance_totals(DEPT, 3, 2025)[f'{process}|New Starter'] == [0, 2, 0, 0]
+            assert rota_app.calculate_night_shift_allowances(DEPT, 3, 2025, 'PST')['employees']['New Starter']['total_days'] == 2
+    finally:
+        rota_app._rota_backend, rota_app.allowance_totals = backend, totals
+        rota_app.get_current_departments = get_departments
+    print("✓ Roster edits picked up by totals and reports")
+
+def test_rollup():
+    """Test that roll-ups equal the per-period totals summed, cold and warm"""
+    print("\n📈 Testing allowance roll-up...")
+    backend, totals = rota_app._rota_backend, rota_app.allowance_totals
+    rng = random.Random(5)
+    rows = rota_app.roster_rows(rota_app.DEPARTMENTS[DEPT]['processes'])
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            use_temp_data(tmp)
+            for month in range(1, 7):
+                dates = rota_month(2025, month).date_strs
+                changes = {}
+                for _ in range(40):
+                    process, emp = rng.choice(rows)
+                    changes[f'{process}|{emp}|{rng.choice(dates)}'] = rng.choice(SHIFTS[:-1])
+                rota_app.commit_period_changes(DEPT, month, 2025, changes)
+            periods = rota_app.allowance_periods_between((11, 2024), (3, 2025))
+            assert periods == [(11, 2024), (12, 2024), (1, 2025), (2, 2025), (3, 2025)]
+            expected = {}
+            for month, year in periods:
+                for row_key, counters in fresh_totals(month, year).items():
+                    expected[row_key] = [a + b for a, b in zip(expected.get(row_key, [0, 0, 0, 0]), counters)]
+
+            # Cold: no materialized entries, everything from one batched read
+            rota_app.allowance_totals = AllowanceTotals(os.path.join(tmp, 'cold_totals.db'))
+            assert rota_app.get_allowance_rollup(DEPT, periods) == expected
+            assert all(rota_app.allowance_totals.has(allowance_key(DEPT, m, y)) for m, y in periods)
+            # Warm: served from the stored entries
+            assert rota_app.get_allowance_rollup(DEPT, periods) == expected
+
+            client = rota_app.app.test_client()
+            with client.session_transaction() as sess:
+                sess['user'] = 'admin'
+            body = client.get(f'/api/allowances/{DEPT}/rollup?from=2024-11&to=2025-03').get_json()
+            assert body['periods'] == 5 and body['period_start'] == '2024-10-26' and body['period_end'] == '2025-03-25'
+            served = {f"{r['process']}|{r['employee']}": [r['est_days'], r['pst_days'], r['weekend_full'], r['weekend_half']]
+                      for r in body['rows']}
+            assert served == expected
+            ytd = client.get(f'/api/allowances/{DEPT}/rollup?span=ytd&to=2025-06').get_json()
+            assert (ytd['from'], ytd['periods']) == ('2025-04', 3)
+            trailing = client.get(f'/api/allowances/{DEPT}/rollup?span=12m&to=2025-03').get_json()
+            assert (trailing['from'], trailing['to'], trailing['periods']) == ('2024-04', '2025-03', 12)
+            assert client.get(f'/api/allowances/{DEPT}/rollup?from=2025-13&to=2025-03').status_code == 400
+            assert client.get(f'/api/allowances/{DEPT}/rollup?from=0-01&to=0-03').status_code == 400
+            assert client.get(f'/api/allowances/{DEPT}/rollup?from=2025-04&to=2025-03').status_code == 400
+    finally:
+        rota_app._rota_backend, rota_app.allowance_totals = backend, totals
+    print("✓ Roll-ups match the summed period totals")
+
+if __name__ == "__main__":
+    print("🧪 Allowance Totals Tests")
+    print("=" * 50)
+    test_incremental_matches_rebuild()
+    test_stale_entry_and_rebuild()
+    test_totals_api()
+    test_pages_read_totals()
+    test_roster_from_config()
+    test_rollup()
+    print("\n🎉 All allowance totals tests passed!")
@@ -0,0 +1,246 @@
+#!/usr/bin/env python
+"""
+Test script for the background notification queue (local SMTP stand-in and mock SMS)
+"""
+import sys
+import os
+import time
+import socket
+import sqlite3
+import tempfile
+import threading
+
+# Add the app directory to path so we can import app modules
+sys.path.append(os.path.dirname(__file__))
+
+from testing_env import isolate_app_data
+isolate_app_data()
+import app as rota_app
+from notification_queue import NotificationQueue
+from token_store import TokenStore
+from rota_storage import JsonRotaStore
+
+class SmtpStandIn:
+    """Minimal SMTP server on localhost that records each message it accepts and accepts any login"""
+
+    def __init__(self):
+        self.messages = []
+        self.connections = 0
+        self.logins = 0
+        self.sock = socket.socket()
+        self.sock.bind(('127.0.0.1', 0))
+        self.sock.listen()
+        self.port = self.sock.getsockname()[1]
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _serve(self):
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._session, args=(conn,), daemon=True).start()
+
+    def _session(self, conn):
+        self.connections += 1
+        f = conn.makefile('rwb')
+        def reply(line):
+            f.write(line.encode() + b'\r\n')
+            f.flush()
+        reply('220 localhost stand-in')
+        data = None
+        for raw in f:
+            line = raw.decode().rstrip('\r\n')
+            if data is not None:
+                if line == '.':
+                    self.messages.append('\n'.join(data))
+                    data = None
+                    reply('250 OK')
+                else:
+                    data.append(line)
+                continue
+            command = line[:4].upper()
+            if command == 'EHLO':
+                reply('250-localhost')
+                reply('250 AUTH PLAIN LOGIN')
+            elif command == 'AUTH':
+                self.logins += 1
+                reply('235 Authentication successful')
+            elif command == 'DATA':
+                data = []
+                reply('354 End data with <CR><LF>.<CR><LF>')
+            elif command == 'QUIT':
+                reply('221 Bye')
+                break
+            else:
+                reply('250 OK')
+        conn.close()
+
+    def close(self):
+        self.sock.close()
+
+def test_retry_backoff_and_failure():
+    """Test that failing jobs are retried with backoff and end as failed after max_attempts"""
+    print("\n🔁 Testing retries...")
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = NotificationQueue(os.path.join(tmp, 'jobs.db'), workers=2, max_attempts=3, backoff=0.05)
+        calls = []
+        def flaky(job):
+            calls.append(time.time())
+            if len(calls) < 3:
+                raise RuntimeError('gateway timeout')
+            return True, 'delivered'
+        queue.register('flaky', flaky)
+        queue.register('broken', lambda job: (False, 'rejected'))
+        queue.start()
+        try:
+            ok_job = queue.enqueue('flaky', 'smtp', {})
+            status = queue.wait(ok_job)
+            assert (status['status'], status['attempts'], status['message']) == ('sent', 3, 'delivered')
+            assert calls[2] - calls[1] >= 0.09, "Second retry waits twice the backoff"
+            bad_job = queue.enqueue('broken', 'smtp', {})
+            status = queue.wait(bad_job)
+            assert (status['status'], status['attempts'], status['message']) == ('failed', 3, 'rejected')
+            assert queue.status('nope') is None
+        finally:
+            queue.stop()
+    print("✓ Retried with backoff, then failed")
+
+def test_finished_jobs_pruned():
+    """Test that finished jobs lose their payload and are deleted after the retention period"""
+    print("\n🧹 Testing payload clearing and retention...")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'jobs.db')
+        queue = NotificationQueue(path, max_attempts=1, retention=0.2)
+        queue.register('send', lambda job: (job['code'] == '123456', 'done'))
+        sent = queue.enqueue('send', 'smtp', {'code': '123456'})
+        failed = queue.enqueue('send', 'smtp', {'code': '000000'})
+        while queue.run_one():
+            pass
+        waiting = queue.enqueue('send', 'smtp', {'code': '654321'})
+        payloads = dict(sqlite3.connect(path).execute('SELECT id, payload FROM jobs').fetchall())
+        assert payloads[sent] == payloads[failed] == '{}' and '654321' in payloads[waiting]
+        time.sleep(0.25)
+        assert queue.prune() == 2
+        assert queue.status(sent) is None and queue.status(failed) is None
+        assert queue.status(waiting)['status'] == 'queued', "Jobs still to send are kept"
+    print("✓ Payloads cleared on finish, finished jobs pruned")
+
+def test_provider_limits():
+    """Test that a slow provider never runs more jobs than its limit while others proceed"""
+    print("\n🚦 Testing per-provider limits...")
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = NotificationQueue(os.path.join(tmp, 'jobs.db'), workers=4, provider_limits={'slow': 1, 'fast': 4})
+        running = {'slow': 0, 'fast': 0}
+        peak = {'slow': 0, 'fast': 0}
+        lock = threading.Lock()
+        def handler(job):
+            with lock:
+                running[job['provider']] += 1
+                peak[job['provider']] = max(peak[job['provider']], running[job['provider']])
+            time.sleep(0.2 if job['provider'] == 'slow' else 0.01)
+            with lock:
+                running[job['provider']] -= 1
+            return True, 'ok'
+        queue.register('send', handler)
+        slow = [queue.enqueue('send', 'slow', {'provider': 'slow'}) for _ in range(4)]
+        fast = [queue.enqueue('send', 'fast', {'provider': 'fast'}) for _ in range(8)]
+        started = time.time()
+        queue.start()
+        try:
+            for job in fast:
+                assert queue.wait(job)['status'] == 'sent'
+            assert time.time() - started < 0.5, "Fast jobs are not held up behind the slow provider"
+            for job in slow:
+                assert queue.wait(job)['status'] == 'sent'
+            assert peak['slow'] == 1 and peak['fast'] > 1, peak
+        finally:
+            queue.stop()
+    print(f"✓ Peak concurrency {peak}")
+
+def test_forgot_password_queues():
+    """Test that reset emails and OTPs are queued by the request and delivered in the background"""
+    print("\n📮 Testing queued reset email and OTP...")
+    queue, email_config, provider = rota_app.notification_queue, dict(rota_app.EMAIL_CONFIG), rota_app.SMS_CONFIG['provider']
+    token_store = rota_app.token_store
+    smtp = SmtpStandIn()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            rota_app.notification_queue = NotificationQueue(os.path.join(tmp, 'jobs.db'), backoff=0.05)
+            rota_app.token_store = TokenStore(os.path.join(tmp, 'password_reset_tokens.json'))
+            rota_app.notification_queue.register('reset_email', queue._handlers['reset_email'])
+            rota_app.notification_queue.register('otp_sms', queue._handlers['otp_sms'])
+            rota_app.EMAIL_CONFIG.update(smtp_server='127.0.0.1', smtp_port=smtp.port, use_tls=False, sender_password='')
+            rota_app.SMS_CONFIG['provider'] = 'mock'
+            client = rota_app.app.test_client()
+
+            dept = 'Service Desk'
+            resp = client.post('/forgot-password', data={'action': 'send_reset_email', 'department': dept})
+            html = resp.get_data(as_text=True)
+            assert 'Password reset email queued' in html and 'id="notification-status"' in html
+            job_id = html.split('/api/notifications/', 1)[1].split('"', 1)[0]
+            assert client.get(f'/api/notifications/{job_id}').get_json()['status'] == 'queued'
+            assert not smtp.messages, "Nothing is sent inside the request"
+
+            rota_app.notification_queue.start()
+            status = rota_app.notification_queue.wait(job_id)
+            assert status['status'] == 'sent', status
+            stored = sqlite3.connect(os.path.join(tmp, 'jobs.db')).execute(
+                'SELECT payload FROM jobs WHERE id = ?', (job_id,)).fetchone()[0]
+            assert stored == '{}', "The reset link is not kept once sent"
+            assert client.get(f'/api/notifications/{job_id}').get_json()['status'] == 'sent'
+            assert len(smtp.messages) == 1 and '/reset-password/' in smtp.messages[0]
+
+            if dept in rota_app.DEPARTMENT_ADMIN_PHONES:
+                html = client.post('/forgot-password', data={'action': 'send_sms_otp', 'department': dept}).get_data(as_text=True)
+                assert 'OTP sent via SMS' in html
+                job_id = html.split('/api/notifications/', 1)[1].split('"', 1)[0]
+                status = rota_app.notification_queue.wait(job_id)
+                assert status['status'] == 'sent' and status['provider'] == 'mock' and 'DEV MODE' in status['message']
+            assert client.get('/api/notifications/unknown').status_code == 404
+    finally:
+        rota_app.notification_queue.stop()
+        rota_app.notification_queue = queue
+        rota_app.token_store = token_store
+        rota_app.EMAIL_CONFIG.clear()
+        rota_app.EMAIL_CONFIG.update(email_config)
+        rota_app.SMS_CONFIG['provider'] = provider
+        smtp.close()
+    print("✓ Request returned before delivery; workers sent both")
+
+def test_workers_start_with_first_request():
+    """Test that importing the app starts no threads and the first request starts them once"""
+    print("\n🧵 Testing background worker start-up...")
+    assert not rota_app.notification_queue._threads, "Importing the app starts no workers"
+    saved = (rota_app.notification_queue, rota_app.token_store, rota_app._rota_backend, rota_app.BACKGROUND_WORKERS)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            rota_app.notification_queue = NotificationQueue(os.path.join(tmp, 'jobs.db'), workers=2)
+            rota_app.token_store = TokenStore(os.path.join(tmp, 'password_reset_tokens.json'))
+            rota_app._rota_backend = JsonRotaStore(os.path.join(tmp, 'rota_data.json'))
+            rota_app.BACKGROUND_WORKERS = True
+            client = rota_app.app.test_client()
+            assert not rota_app.notification_queue._threads
+            client.get('/login')
+            assert len(rota_app.notification_queue._threads) == 2
+            assert rota_app.token_store._sweeper is not None and rota_app._rota_backend._compactor is not None
+            threads = list(rota_app.notification_queue._threads)
+            client.get('/login')
+            assert rota_app.notification_queue._threads == threads, "Later requests start nothing more"
+            rota_app.notification_queue.stop()
+            rota_app.token_store.stop_sweeper()
+            rota_app._rota_backend.stop_compactor()
+    finally:
+        rota_app.notification_queue, rota_app.token_store, rota_app._rota_backend, rota_app.BACKGROUND_WORKERS = saved
+        rota_app._background_started = False
+    print("✓ Workers started by the first request only")
+
+if __name__ == "__main__":
+    print("🧪 Notification Queue Tests")
+    print("=" * 50)
+    test_retry_backoff_and_failure()
+    test_finished_jobs_pruned()
+    test_provider_limits()
+    test_forgot_password_queues()
+    test_workers_start_with_first_request()
+    print("\n🎉 All notification queue tests passed!")
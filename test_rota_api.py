@@ -0,0 +1,321 @@
+#!/usr/bin/env python
+"""
+Test script for the JSON rota API, the CSV/ZIP exports and the allowance views
+"""
+import sys
+import os
+import json
+import tempfile
+from contextlib import contextmanager
+
+# Add the app directory to path so we can import app modules
+sys.path.append(os.path.dirname(__file__))
+
+from testing_env import isolate_app_data
+isolate_app_data()
+import app as rota_app
+from rota_storage import JsonRotaStore
+from allowance_totals import AllowanceTotals
+from fragment_cache import FragmentCache
+
+@contextmanager
+def temp_client():
+    """Test client logged in as admin, writing to a throwaway rota store and allowance totals"""
+    backend, totals = rota_app._rota_backend, rota_app.allowance_totals
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            rota_app._rota_backend = JsonRotaStore(os.path.join(tmp, 'rota_data.json'))
+            rota_app.allowance_totals = AllowanceTotals(os.path.join(tmp, 'allowance_totals.db'))
+            client = rota_app.app.test_client()
+            with client.session_transaction() as sess:
+                sess['user'] = 'admin'
+            yield client
+    finally:
+        rota_app._rota_backend, rota_app.allowance_totals = backend, totals
+
+def first_cell():
+    dept = next(iter(rota_app.get_current_departments()))
+    processes = rota_app.get_current_departments()[dept]['processes']
+    process = next(p for p, emps in processes.items() if emps)
+    return dept, process, processes[process][0]
+
+def test_patch_changed_cells():
+    """Test that PATCH applies only the sent cells and bumps the version"""
+    print("\n✏️ Testing delta cell updates...")
+    with temp_client() as client:
+        dept, process, emp = first_cell()
+        url = f'/api/rota/{dept}/2025/3'
+
+        resp = client.patch(url, json={'version': 0, 'changes': [
+            {'process': process, 'employee': emp, 'date': '2025-03-03', 'value': 'Night'},
+            {'process': process, 'employee': emp, 'date': '2025-03-04', 'value': 'EST'},
+        ]})
+        assert resp.status_code == 200, resp.get_json()
+        assert resp.get_json()['version'] == 1
+        saved = rota_app.get_saved_period(dept, 3, 2025)
+        assert saved == {f'{process}|{emp}|2025-03-03': 'Night', f'{process}|{emp}|2025-03-04': 'EST'}
+
+        # Clearing a cell removes its override and leaves the other one alone
+        resp = client.patch(url, json={'version': 1, 'changes': [
+            {'process': process, 'employee': emp, 'date': '2025-03-04', 'value': ''},
+        ]})
+        assert resp.status_code == 200
+        assert rota_app.get_saved_period(dept, 3, 2025) == {f'{process}|{emp}|2025-03-03': 'Night'}
+    print("✓ Only changed cells were written")
+
+def test_patch_conflict_and_validation():
+    """Test stale versions get 409 with the changed cells, bad bodies get 400"""
+    print("\n⚠️ Testing conflicts and validation...")
+    with temp_client() as client:
+        dept, process, emp = first_cell()
+        url = f'/api/rota/{dept}/2025/3'
+        change = {'process': process, 'employee': emp, 'date': '2025-03-05', 'value': 'PST'}
+
+        assert client.patch(url, json={'version': 0, 'changes': [change]}).status_code == 200
+        resp = client.patch(url, json={'version': 0, 'changes': [dict(change, value='Night')]})
+        assert resp.status_code == 409
+        body = resp.get_json()
+        assert body['version'] == 1
+        assert body['changed_cells'] == [change]
+        assert rota_app.get_saved_period(dept, 3, 2025)[f'{process}|{emp}|2025-03-05'] == 'PST'
+
+        assert client.patch(url, json={'changes': 'nope'}).status_code == 400
+        assert client.patch(url, json={'changes': [dict(change, date='2025-13-01')]}).status_code == 400
+        assert client.patch(f'/api/rota/{dept}/2025/13', json={'changes': []}).status_code == 400
+        assert client.patch(f'/api/rota/{dept}/0/1', json={'changes': [dict(change, date='0001-01-01')]}).status_code == 400
+        assert client.patch('/api/rota/NoSuchDept/2025/3', json={'changes': []}).status_code == 404
+
+        with client.session_transaction() as sess:
+            sess.clear()
+        assert client.patch(url, json={'changes': [change]}).status_code == 403
+    print("✓ Conflicts and invalid requests rejected")
+
+def test_get_rota_etag():
+    """Test the JSON read API and 304 revalidation with If-None-Match"""
+    print("\n📥 Testing rota read API...")
+    build_rows = rota_app.build_rows
+    try:
+        with temp_client() as client:
+            dept, process, emp = first_cell()
+            url = f'/api/rota/{dept}/2025/3'
+
+            resp = client.get(url)
+            assert resp.status_code == 200
+            body = resp.get_json()
+            etag = resp.headers['ETag']
+            assert body['version'] == 0
+            assert body['dates'][0] == '2025-03-03' and len(body['dates']) == 35
+            row = next(r for r in body['rows'] if (r['process'], r['employee']) == (process, emp))
+            assert row['shifts'][:7] == ['General'] * 5 + ['WO'] * 2
+
+            # Revalidation must not rebuild the rota
+            calls = []
+            rota_app.build_rows = lambda *args, **kwargs: calls.append(args) or build_rows(*args, **kwargs)
+            resp = client.get(url, headers={'If-None-Match': etag})
+            assert resp.status_code == 304 and not resp.data and not calls
+            assert resp.headers['ETag'] == etag
+
+            client.patch(url, json={'version': 0, 'changes': [
+                {'process': process, 'employee': emp, 'date': '2025-03-03', 'value': 'Night'},
+            ]})
+            resp = client.get(url, headers={'If-None-Match': etag})
+            assert resp.status_code == 200 and len(calls) == 1
+            assert resp.headers['ETag'] != etag
+            row = next(r for r in resp.get_json()['rows'] if (r['process'], r['employee']) == (process, emp))
+            assert row['shifts'][0] == 'Night'
+
+            # Shift filter is answered from the index carried forward by the PATCH
+            rows = client.get(url + '?shift=Night').get_json()['rows']
+            assert [(r['process'], r['employee']) for r in rows] == [(process, emp)]
+            assert client.get(url + '?shift=NoSuchShift').get_json()['rows'] == []
+
+            assert client.get('/api/rota/NoSuchDept/2025/3').status_code == 404
+            for year, month in ((2025, 13), (0, 1), (9999, 12), (10000, 1)):
+                assert client.get(f'/api/rota/{dept}/{year}/{month}').status_code == 400, (year, month)
+    finally:
+        rota_app.build_rows = build_rows
+    print("✓ Unchanged rota revalidated with 304")
+
+def test_paged_rows():
+    """Test row blocks from the read API and the paged /dept grid"""
+    print("\n📑 Testing paged rota rows...")
+    page_size = rota_app.GRID_CONFIG['page_size']
+    try:
+        with temp_client() as client:
+            dept, process, emp = first_cell()
+            url = f'/api/rota/{dept}/2025/3'
+            everything = client.get(url).get_json()['rows']
+            total = len(everything)
+            assert total > 10
+
+            blocks = []
+            for offset in range(0, total, 10):
+                body = client.get(f'{url}?offset={offset}&limit=10').get_json()
+                assert body['total'] == total and body['offset'] == offset
+                blocks.extend(body['rows'])
+            assert blocks == everything
+            assert client.get(f'{url}?offset={total}&limit=10').get_json()['rows'] == []
+            for bad in ('limit=0', 'limit=100000', 'offset=-1', 'offset=x'):
+                assert client.get(f'{url}?{bad}').status_code == 400, bad
+            by_process = client.get(f'{url}?process={process}&limit=1').get_json()
+            assert by_process['rows'][0]['employee'] == emp and by_process['total'] < total
+
+            rota_app.GRID_CONFIG['page_size'] = 10
+            html = client.get(f'/dept?name={dept}&month=3&year=2025&grid=paged').get_data(as_text=True)
+            assert html.count('class="employee-row"') == 10 and '<tr class="rows-loader">' in html
+            assert f'data-total="{total}"' in html and f'{total} employees' in html
+            html = client.get(f'/dept?name={dept}&month=3&year=2025').get_data(as_text=True)
+            assert html.count('class="employee-row"') == total and '<tr class="rows-loader">' not in html
+    finally:
+        rota_app.GRID_CONFIG['page_size'] = page_size
+    print("✓ Rows served in blocks")
+
+def test_compact_grid():
+    """Test that the compact grid ships the rows as JSON instead of a select per cell"""
+    print("\n🗜️ Testing compact rota grid...")
+    with temp_client() as client:
+        dept, _, _ = first_cell()
+        page = f'/dept?name={dept}&month=3&year=2025'
+        full = client.get(page).get_data(as_text=True)
+        compact = client.get(page + '&cells=compact').get_data(as_text=True)
+        assert '<select name="cell[' in full and '<select name="cell[' not in compact
+        data = json.loads(compact.split('<script type="application/json" id="rota-rows">', 1)[1].split('</script>', 1)[0])
+        api = client.get(f'/api/rota/{dept}/2025/3').get_json()
+        assert data['rows'] == api['rows'] and data['dates'] == api['dates'] and data['shifts'] == api['shifts']
+        assert len(compact) * 5 < len(full), (len(compact), len(full))
+        assert 'data-cells="compact"' in compact and 'data-cells="select"' in full
+    print("✓ Compact grid is a fraction of the full page")
+
+def test_row_fragment_cache():
+    """Test that rendered rows are reused and a save re-renders only the edited row"""
+    print("\n🧩 Testing row fragment cache...")
+    fragments = rota_app.row_fragments
+    try:
+        with temp_client() as client:
+            rota_app.row_fragments = FragmentCache(fragments.max_bytes)
+            dept, process, emp = first_cell()
+            page = f'/dept?name={dept}&month=3&year=2025'
+            first = client.get(page).get_data(as_text=True)
+            rows = rota_app.row_fragments.stats()['misses']
+            assert client.get(page).get_data(as_text=True) == first
+            assert rota_app.row_fragments.stats()['hits'] == rows
+
+            client.patch(f'/api/rota/{dept}/2025/3', json={'version': 0, 'changes': [
+                {'process': process, 'employee': emp, 'date': '2025-03-03', 'value': 'Night'},
+            ]})
+            assert rota_app.row_fragments.stats()['entries'] == rows - 1
+            html = client.get(page).get_data(as_text=True)
+            assert '<option value="Night" selected>' in html
+            stats = rota_app.row_fragments.stats()
+            assert (stats['misses'], stats['hits']) == (rows + 1, 2 * rows - 1)
+
+            # Byte budget: the least recently used fragment goes first
+            cache = FragmentCache(10)
+            cache.put('a', 1, 'aaaa')
+            cache.put('b', 1, 'bbbb')
+            assert cache.get('a', 1) == 'aaaa' and cache.get('a', 2) is None
+            cache.put('c', 1, 'cccc')
+            assert cache.get('b', 1) is None and cache.stats()['bytes'] == 8
+    finally:
+        rota_app.row_fragments = fragments
+    print("✓ Unchanged rows served from the cache")
+
+def test_export_range():
+    """Test the streaming CSV export across months and departments"""
+    print("\n📄 Testing range export...")
+    import csv
+    import io
+    with temp_client() as client:
+        dept, process, emp = first_cell()
+        # March 1-2 2025 belong to February's rota, March 31 starts a week of March's
+        rota_app.set_saved_period(dept, 2, 2025, {f'{process}|{emp}|2025-03-01': 'Night'})
+        rota_app.set_saved_period(dept, 3, 2025, {f'{process}|{emp}|2025-03-31': 'PST'})
+
+        resp = client.get(f'/export-range?start=2025-03-01&end=2025-03-31&dept={dept}')
+        assert resp.status_code == 200 and resp.is_streamed
+        rows = list(csv.reader(io.StringIO(resp.get_data(as_text=True))))
+        assert rows[0] == ['Department', 'Process', 'Employee', 'Date', 'Day', 'Shift']
+        employees = sum(len(emps) for emps in rota_app.get_current_departments()[dept]['processes'].values())
+        assert len(rows) == 1 + employees * 31
+        mine = {r[3]: r[5] for r in rows[1:] if (r[1], r[2]) == (process, emp)}
+        assert len(mine) == 31
+        assert mine['2025-03-01'] == 'Night' and mine['2025-03-02'] == 'WO'
+        assert mine['2025-03-03'] == 'General' and mine['2025-03-31'] == 'PST'
+
+        resp = client.get('/export-range?start=2025-01-01&end=2025-01-07')
+        depts = {r[0] for r in csv.reader(io.StringIO(resp.get_data(as_text=True)))}
+        staffed = {name for name, d in rota_app.get_current_departments().items() if any(d.get('processes', {}).values())}
+        assert staffed <= depts
+        assert client.get('/export-range?start=2025-03-31&end=2025-03-01').status_code == 400
+        assert client.get('/export-range?dept=NoSuchDept').status_code == 404
+    print("✓ Range export streamed every day exactly once")
+
+def test_export_bundle():
+    """Test the yearly ZIP bundle matches the single-month exports"""
+    print("\n🗜️ Testing export bundle...")
+    import io
+    import zipfile
+    with temp_client() as client:
+        dept, process, emp = first_cell()
+        rota_app.set_saved_period(dept, 3, 2025, {f'{process}|{emp}|2025-03-05': 'Night'})
+        rota_app.set_saved_period(dept, 3, 2024, {f'{process}|{emp}|2024-03-05': 'PST'})
+
+        resp = client.get('/export-bundle?year=2025')
+        assert resp.status_code == 200 and resp.is_streamed
+        archive = zipfile.ZipFile(io.BytesIO(resp.get_data()))
+        assert archive.testzip() is None
+        names = archive.namelist()
+        assert len(names) == len(set(names)) == 12 * len(rota_app.get_current_departments())
+
+        for month in (2, 3):
+            name = f'{dept}/{dept}_ShiftRota_2025-{month:02d}.csv'
+            single = client.get(f'/export?name={dept}&month={month}&year=2025').get_data()
+            assert archive.read(name) == single, name
+        assert b'"Night"' in archive.read(f'{dept}/{dept}_ShiftRota_2025-03.csv')
+
+        assert client.get('/export-bundle?year=abc').status_code == 400
+    print("✓ Bundle holds one CSV per department-month")
+
+def test_allowances_computed_once():
+    """Test that allowance pages and CSVs share one computation per data version"""
+    print("\n💰 Testing allowance memoization...")
+    compute = rota_app.all_allowance_employees
+    calls = []
+    try:
+        with temp_client() as client:
+            rota_app.all_allowance_employees = lambda *args: calls.append(args) or compute(*args)
+            dept = 'Service Desk'
+            process = next(iter(rota_app.DEPARTMENTS[dept]['processes']))
+            emp = rota_app.DEPARTMENTS[dept]['processes'][process][0]
+            query = f'dept={dept}&month=3&year=2031'
+
+            assert client.get(f'/night-shift-allowances?{query}&type=EST').status_code == 200
+            assert client.get(f'/night-shift-allowances?{query}&type=PST').status_code == 200
+            assert client.get(f'/weekend-allowances?{query}').status_code == 200
+            for kind in ('EST', 'PST', 'Weekend'):
+                assert client.get(f'/export-allowances?{query}&type={kind}').status_code == 200
+            assert len(calls) == 1, "Every view of one period reuses a single scan"
+
+            # A save in the window (February holds 2031-02-26..28) invalidates the result
+            client.patch(f'/api/rota/{dept}/2031/2', json={'changes': [
+                {'process': process, 'employee': emp, 'date': '2031-02-27', 'value': 'Night'},
+            ]})
+            resp = client.get(f'/export-allowances?{query}&type=PST')
+            assert len(calls) == 2 and '2031-02-27 (Thu): Night' in resp.get_data(as_text=True)
+    finally:
+        rota_app.all_allowance_employees = compute
+    print("✓ Allowances recomputed only after the data changed")
+
+if __name__ == "__main__":
+    print("🧪 Rota API Tests")
+    print("=" * 50)
+    test_patch_changed_cells()
+    test_patch_conflict_and_validation()
+    test_get_rota_etag()
+    test_paged_rows()
+    test_compact_grid()
+    test_row_fragment_cache()
+    test_export_range()
+    test_export_bundle()
+    test_allowances_computed_once()
+    print("\n🎉 All rota API tests passed!")
@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+"""
+Test script for the precomputed rota calendar tables
+"""
+import sys
+import os
+from datetime import date, timedelta
+
+# Add the app directory to path so we can import app modules
+sys.path.append(os.path.dirname(__file__))
+
+from rota_calendar import rota_month, allowance_window
+
+def test_rota_month_weeks():
+    """Test that rota months are the full weeks whose Monday is in the month"""
+    print("\n📅 Testing rota month tables...")
+    for year in (2024, 2025, 2026):
+        for month in range(1, 13):
+            table = rota_month(year, month)
+            mondays = [d for d in table.dates if d.weekday() == 0]
+            assert mondays and all(d.month == month for d in mondays)
+            assert len(table) == 7 * len(mondays)
+            assert table.dates[0].day <= 7
+            # Consecutive months tile the calendar with no gaps or overlaps
+            following = rota_month(year + (month == 12), month % 12 + 1)
+            assert table.dates[-1] + timedelta(days=1) == following.dates[0]
+
+    table = rota_month(2025, 3)
+    assert table.date_strs[0] == '2025-03-03' and len(table) == 35
+    assert table.headers[0] == {'date_str': '2025-03-03', 'weekday': 'Mon', 'day': '3', 'month_short': 'Mar'}
+    assert table.default_shifts[:7] == ('General',) * 5 + ('WO',) * 2
+    assert rota_month(2025, 3) is table, "Tables are computed once per month"
+    print("✓ Rota month tables match the weekly layout")
+
+def test_allowance_window():
+    """Test the 26th-to-25th allowance windows"""
+    print("\n💰 Testing allowance windows...")
+    table = allowance_window(2025, 1)
+    assert table.dates[0] == date(2024, 12, 26) and table.dates[-1] == date(2025, 1, 25)
+    assert len(table) == 31
+    table = allowance_window(2024, 3)
+    assert table.dates[0] == date(2024, 2, 26) and len(table) == 29
+    assert table.weekend == tuple(d.weekday() >= 5 for d in table.dates)
+    print("✓ Allowance windows span the 26th to the 25th")
+
+if __name__ == "__main__":
+    print("🧪 Rota Calendar Tests")
+    print("=" * 50)
+    test_rota_month_weeks()
+    test_allowance_window()
+    print("\n🎉 All rota calendar tests passed!")
@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+"""
+Test script for the dense rota grid
+"""
+import sys
+import os
+
+# Add the app directory to path so we can import app modules
+sys.path.append(os.path.dirname(__file__))
+
+from rota_grid import RotaGrid, roster_rows
+
+PROCESSES = {
+    "INDIA AND APAC": ["Adithya K G", "Bandhavi V"],
+    "EMEA AND AMEC": ["Ramya J"],
+}
+SHIFTS = {"General": "11AM to 8PM", "Night": "8PM to 5AM", "WO": "Weekly Off"}
+DATES = ["2025-10-06", "2025-10-07", "2025-10-11"]
+
+PERIOD = {
+    "INDIA AND APAC|Adithya K G|2025-10-06": "Night",
+    "INDIA AND APAC|Bandhavi V|2025-10-11": "WO",
+    "EMEA AND AMEC|Ramya J|2025-10-07": "Custom",       # not in the shift table
+    "EMEA AND AMEC|Former Employee|2025-10-07": "Night",  # not on the roster
+    "INDIA AND APAC|Adithya K G|2025-11-03": "General",   # outside the dates
+}
+
+def test_round_trip():
+    """Test lossless conversion to and from the dict form"""
+    print("\n🔁 Testing grid round-trip...")
+    grid = RotaGrid.from_period(PERIOD, roster_rows(PROCESSES), DATES, SHIFTS)
+    assert grid.to_period() == PERIOD, "Grid should convert back to the same dict"
+    assert len(grid.codes) == 3 * 3, "One byte per cell"
+    assert set(grid.extras) == {
+        "EMEA AND AMEC|Former Employee|2025-10-07",
+        "INDIA AND APAC|Adithya K G|2025-11-03",
+    }
+    print("✓ Grid round-trips losslessly")
+
+def test_reads_and_writes():
+    """Test row reads and cell updates"""
+    print("\n✏️ Testing grid reads and writes...")
+    grid = RotaGrid.from_period(PERIOD, roster_rows(PROCESSES), DATES, SHIFTS)
+    r = grid.row_index[("INDIA AND APAC", "Adithya K G")]
+    assert grid.row_values(r) == ["Night", None, None]
+    assert grid.shift_table[1:4] == ["General", "Night", "WO"], "Codes follow the department shift table"
+
+    grid.set("INDIA AND APAC|Adithya K G|2025-10-07", "General")
+    grid.set("INDIA AND APAC|Adithya K G|2025-10-06", None)
+    grid.set("EMEA AND AMEC|Former Employee|2025-10-07", None)
+    assert grid.row_values(r) == [None, "General", None]
+    assert "EMEA AND AMEC|Former Employee|2025-10-07" not in grid.to_period()
+    print("✓ Grid reads rows and applies cell changes")
+
+if __name__ == "__main__":
+    print("🧪 Rota Grid Tests")
+    print("=" * 50)
+    test_round_trip()
+    test_reads_and_writes()
+    print("\n🎉 All rota grid tests passed!")
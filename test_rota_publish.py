@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+"""
+Test script for rota publication emails (pooled SMTP connections against a local stand-in)
+"""
+import sys
+import os
+import copy
+import time
+import socket
+import tempfile
+from email.mime.text import MIMEText
+
+# Add the app directory to path so we can import app modules
+sys.path.append(os.path.dirname(__file__))
+
+from testing_env import isolate_app_data
+isolate_app_data()
+import app as rota_app
+from rota_mailer import SmtpPool, Throttle, PublicationStore, PublishProgress, send_all
+from test_notification_queue import SmtpStandIn
+from test_rota_api import temp_client
+
+def test_pool_reuses_connections():
+    """Test that many messages go over at most size authenticated connections, at the throttled rate"""
+    print("\n📨 Testing pooled SMTP sends...")
+    smtp = SmtpStandIn()
+    try:
+        pool = SmtpPool('127.0.0.1', smtp.port, 'rota@example.com', 'secret', use_tls=False, size=2)
+        messages = []
+        for i in range(8):
+            msg = MIMEText(f"schedule {i}")
+            msg['To'] = f"emp{i}@example.com"
+            messages.append(msg)
+        progress = PublishProgress(len(messages), ['No Email'])
+        started = time.time()
+        send_all(messages, pool, progress, Throttle(50))
+        elapsed = time.time() - started
+
+        assert len(smtp.messages) == 8
+        assert smtp.connections <= 2 and pool.opened == smtp.connections, (smtp.connections, pool.opened)
+        assert smtp.logins == smtp.connections, "Each connection logs in once"
+        assert elapsed >= 7 / 50 - 0.01, "Throttle spaces sends 1/rate apart"
+        result = progress.as_dict()
+        assert (result['status'], result['sent'], result['failed'], result['percent']) == ('finished', 8, {}, 100.0)
+        assert result['skipped'] == ['No Email']
+    finally:
+        smtp.close()
+
+    # Nothing listening: every message is reported as failed, none raise
+    unused = socket.socket()
+    unused.bind(('127.0.0.1', 0))
+    port = unused.getsockname()[1]
+    unused.close()
+    pool = SmtpPool('127.0.0.1', port, use_tls=False, size=2, timeout=2)
+    progress = send_all(messages[:3], pool, PublishProgress(3, []))
+    assert progress.sent == 0 and len(progress.failed) == 3
+    print(f"✓ 8 messages over {smtp.connections} connection(s) in {elapsed:.2f} s")
+
+def test_publish_route():
+    """Test that publishing emails each employee with an address their own schedule"""
+    print("\n📣 Testing rota publication...")
+    get_departments, email_config = rota_app.get_current_departments, dict(rota_app.EMAIL_CONFIG)
+    smtp = SmtpStandIn()
+    try:
+        with temp_client() as client:
+            departments = copy.deepcopy(get_departments())
+            dept = next(name for name, d in departments.items() if any(d.get('processes', {}).values()))
+            employees = sorted({emp for emps in departments[dept]['processes'].values() for emp in emps})
+            without_email = employees[0]
+            departments[dept]['employee_emails'] = {emp: f"{emp.replace(' ', '.')}@example.com"
+                                                    for emp in employees[1:]}
+            rota_app.get_current_departments = lambda: departments
+            rota_app.EMAIL_CONFIG.update(smtp_server='127.0.0.1', smtp_port=smtp.port, use_tls=False,
+                                         publish_connections=2, publish_rate=0)
+
+            rows, headers, _ = rota_app.build_rows(dept, 3, 2025, [], [])
+            resp = client.post('/publish-rota', data={'name': dept, 'month': 3, 'year': 2025})
+            assert resp.status_code == 202
+            job_id = resp.get_json()['job_id']
+            deadline = time.time() + 10
+            while True:
+                progress = client.get(f'/api/publish/{job_id}').get_json()
+                if progress['status'] == 'finished' or time.time() > deadline:
+                    break
+                time.sleep(0.02)
+
+            assert progress['status'] == 'finished', progress
+            assert (progress['total'], progress['sent'], progress['failed']) == (len(employees) - 1, len(employees) - 1, {})
+            assert progress['skipped'] == [without_email]
+            assert len(smtp.messages) == len(employees) - 1 and smtp.connections <= 2
+            row = next(r for r in rows if r['employee'] == employees[1])
+            message = next(m for m in smtp.messages if f"Hello {employees[1]}," in m)
+            first = headers[0]
+            assert f"{first['weekday']} {first['day']} {first['month_short']}: {row['cells'][0]['value']}" in message
+            assert all(f"Hello {without_email}," not in m for m in smtp.messages)
+
+            assert client.get('/api/publish/unknown').status_code == 404
+            assert client.post('/publish-rota', data={'name': dept, 'month': 13, 'year': 2025}).status_code == 400
+            assert client.post('/publish-rota', data={'name': dept, 'month': 3, 'year': 0}).status_code == 400
+            assert client.post('/publish-rota', data={'name': 'NoSuchDept', 'month': 3, 'year': 2025}).status_code == 404
+            with client.session_transaction() as sess:
+                sess.clear()
+            assert client.post('/publish-rota', data={'name': dept, 'month': 3, 'year': 2025}).status_code == 403
+    finally:
+        rota_app.get_current_departments = get_departments
+        rota_app.EMAIL_CONFIG.clear()
+        rota_app.EMAIL_CONFIG.update(email_config)
+        smtp.close()
+    print(f"✓ {progress['sent']} schedules sent, {without_email} skipped (no address)")
+
+def test_publications_expire():
+    """Test that runs are shared through the store and forgotten once finished or stalled past the retention"""
+    print("\n🧹 Testing publication run expiry...")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'notifications.db')
+        store = PublicationStore(path, retention=60)
+        old, recent, running, stalled = (store.create(job_id, 1, ['No Email'])
+                                         for job_id in ('old', 'recent', 'running', 'stalled'))
+        for progress in (old, recent):
+            progress.record('a@example.com')
+            progress.finish()
+        running.record('b@example.com', 'refused')
+        # Another process (e.g. a second gunicorn worker) reads the same runs
+        other = PublicationStore(path, retention=60)
+        shared, local = other.get('recent'), recent.as_dict()
+        assert shared.pop('seconds') == local.pop('seconds') and shared == local
+        assert (shared['status'], shared['sent'], shared['skipped']) == ('finished', 1, ['No Email'])
+        assert other.get('running')['failed'] == {'b@example.com': 'refused'}
+        assert other.get('running')['status'] == 'sending'
+
+        conn = store._connect()
+        with conn:
+            conn.execute("UPDATE publications SET started = started - 120, updated = updated - 120 WHERE id IN ('old', 'stalled')")
+            conn.execute("UPDATE publications SET started = started - 120 WHERE id = 'running'")
+        assert other.get('old') is None, "Expired runs are not served before they are pruned"
+        assert store.prune() == 2
+        assert {job_id for job_id in ('old', 'recent', 'running', 'stalled') if other.get(job_id)} == {'recent', 'running'}
+    print("✓ Runs shared between stores; only long-finished and stalled runs dropped")
+
+def test_employee_email_setting():
+    """Test that publication addresses are set and cleared from the department settings page"""
+    print("\n✉️ Testing employee email setting...")
+    config_file = rota_app.DEPT_CONFIG_FILE
+    try:
+        with temp_client() as client, tempfile.TemporaryDirectory() as tmp:
+            rota_app.DEPT_CONFIG_FILE = os.path.join(tmp, 'department_config.json')
+            dept = next(name for name, d in rota_app.get_current_departments().items() if any(d.get('processes', {}).values()))
+            emp = sorted(e for emps in rota_app.get_current_departments()[dept]['processes'].values() for e in emps)[0]
+            with client.session_transaction() as sess:
+                sess['department_user'] = dept
+            form = {'action': 'set_employee_email', 'employee_name': emp, 'employee_email': 'rota@example.com'}
+
+            html = client.post('/department-settings', data=form).get_data(as_text=True)
+            assert rota_app.get_current_departments()[dept]['employee_emails'] == {emp: 'rota@example.com'}
+            assert f'{emp} (rota@example.com)' in html
+            html = client.post('/department-settings', data=dict(form, employee_email='not an address')).get_data(as_text=True)
+            assert 'valid email' in html
+            html = client.post('/department-settings', data=dict(form, employee_name='Nobody')).get_data(as_text=True)
+            assert 'Employee not found' in html
+            assert rota_app.get_current_departments()[dept]['employee_emails'] == {emp: 'rota@example.com'}
+            other = next(name for name in rota_app.get_current_departments() if name != dept)
+            assert client.post('/department-settings', data=dict(form, target_department=other)).status_code == 403
+
+            client.post('/department-settings', data=dict(form, employee_email=''))
+            assert rota_app.get_current_departments()[dept]['employee_emails'] == {}
+    finally:
+        rota_app.DEPT_CONFIG_FILE = config_file
+    print(f"✓ Address for {emp} set and cleared")
+
+if __name__ == "__main__":
+    print("🧪 Rota Publication Tests")
+    print("=" * 50)
+    test_pool_reuses_connections()
+    test_publish_route()
+    test_publications_expire()
+    test_employee_email_setting()
+    print("\n🎉 All rota publication tests passed!")
@@ -0,0 +1,219 @@
+#!/usr/bin/env python
+"""
+Test script for the rota storage engines
+"""
+import sys
+import os
+import json
+import tempfile
+
+# Add the app directory to path so we can import app modules
+sys.path.append(os.path.dirname(__file__))
+
+from rota_storage import (
+    JsonRotaStore, SqliteRotaStore, ShardedRotaStore, VersionConflict,
+    migrate_json_to_sqlite, migrate_json_to_shards
+)
+from file_cache import JsonFileCache
+
+SAMPLE_STORE = {
+    "Service Desk|10|2025": {
+        "INDIA AND APAC|Adithya K G|2025-10-06": "General",
+        "INDIA AND APAC|Adithya K G|2025-10-07": "Night",
+        "EMEA AND AMEC|Ramya J|2025-10-11": "Weekend",
+    },
+    "Service Desk|11|2025": {
+        "INDIA AND APAC|Adithya K G|2025-11-03": "APAC",
+    },
+    "Cloud Ops|10|2025": {},
+}
+
+def check_engine(engine):
+    """Round-trip a store and apply targeted changes"""
+    engine.save_all(SAMPLE_STORE)
+    loaded = engine.load_all()
+    for pk, period in SAMPLE_STORE.items():
+        if period:
+            assert loaded[pk] == period, f"Period {pk} did not round-trip"
+
+    pk = "Service Desk|10|2025"
+    engine.apply_changes(pk, {
+        "INDIA AND APAC|Adithya K G|2025-10-07": "Evening",
+        "EMEA AND AMEC|Ramya J|2025-10-11": None,
+        "EMEA AND AMEC|Ramya J|2025-10-12": "Weekend",
+    })
+    period = engine.get_period(pk)
+    assert period["INDIA AND APAC|Adithya K G|2025-10-07"] == "Evening"
+    assert "EMEA AND AMEC|Ramya J|2025-10-11" not in period
+    assert period["EMEA AND AMEC|Ramya J|2025-10-12"] == "Weekend"
+
+    # Other periods are untouched by a targeted write
+    assert engine.get_period("Service Desk|11|2025") == SAMPLE_STORE["Service Desk|11|2025"]
+
+    engine.set_period(pk, {"INDIA AND APAC|Adithya K G|2025-10-06": "PL"})
+    assert engine.get_period(pk) == {"INDIA AND APAC|Adithya K G|2025-10-06": "PL"}
+
+    periods = engine.get_periods([pk, "Service Desk|12|2025"])
+    assert periods["Service Desk|12|2025"] == {}
+
+    check_versions(engine)
+
+def check_versions(engine):
+    """Optimistic concurrency: stale commits are rejected with the changed cells"""
+    pk = "Cloud Ops|3|2026"
+    assert engine.get_version(pk) == 0
+    v1 = engine.commit(pk, {"Ops|Asha|2026-03-02": "Night"}, expected_version=0)
+    assert v1 == 1 and engine.get_version(pk) == 1
+
+    # Two editors load version 1; the first save wins
+    v2 = engine.commit(pk, {"Ops|Asha|2026-03-03": "PL", "Ops|Ben|2026-03-02": "AL"}, expected_version=1)
+    assert v2 == 2
+    try:
+        engine.commit(pk, {"Ops|Asha|2026-03-02": "General"}, expected_version=1)
+        raise AssertionError("Stale commit should conflict")
+    except VersionConflict as conflict:
+        assert conflict.current_version == 2
+        assert conflict.changed_cells == {"Ops|Asha|2026-03-03": "PL", "Ops|Ben|2026-03-02": "AL"}
+    assert engine.get_period(pk)["Ops|Asha|2026-03-02"] == "Night", "Rejected commit must not write"
+
+    # A commit with nothing to change is not a conflict, and unconditional writes still bump
+    assert engine.commit(pk, {}, expected_version=1) == 2
+    engine.apply_changes(pk, {"Ops|Ben|2026-03-02": None})
+    assert engine.get_version(pk) == 3
+
+def test_json_engine():
+    """Test the JSON file engine"""
+    print("\n📄 Testing JSON storage engine...")
+    with tempfile.TemporaryDirectory() as tmp:
+        check_engine(JsonRotaStore(os.path.join(tmp, 'rota_data.json')))
+    print("✓ JSON engine round-trips and applies changes")
+
+def test_sqlite_engine():
+    """Test the SQLite engine"""
+    print("\n🗄️ Testing SQLite storage engine...")
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = SqliteRotaStore(os.path.join(tmp, 'rota_data.db'))
+        check_engine(engine)
+        shifts = engine.get_employee_shifts("Service Desk", "Adithya K G", "2025-10-01", "2025-11-30")
+        assert [s['date'] for s in shifts] == ["2025-10-06", "2025-11-03"]
+        engine.close()
+    print("✓ SQLite engine round-trips and serves employee lookups")
+
+def test_sharded_engine():
+    """Test the per-period shard engine"""
+    print("\n🧩 Testing sharded storage engine...")
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = os.path.join(tmp, 'rota_shards')
+        engine = ShardedRotaStore(directory, cache=JsonFileCache())
+        check_engine(engine)
+
+        with open(os.path.join(directory, 'manifest.json'), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        assert set(SAMPLE_STORE) <= set(manifest)
+
+        # A write to one period leaves every other shard file alone
+        other = os.path.join(directory, manifest["Service Desk|11|2025"])
+        before = os.stat(other).st_mtime_ns
+        engine.apply_changes("Service Desk|10|2025", {"INDIA AND APAC|Adithya K G|2025-10-09": "AL"})
+        assert os.stat(other).st_mtime_ns == before
+
+        json_path = os.path.join(tmp, 'rota_data.json')
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(SAMPLE_STORE, f)
+        assert migrate_json_to_shards(json_path, os.path.join(tmp, 'migrated')) == 3
+        migrated = ShardedRotaStore(os.path.join(tmp, 'migrated'), cache=JsonFileCache())
+        assert migrated.get_period("Service Desk|11|2025") == SAMPLE_STORE["Service Desk|11|2025"]
+    print("✓ Sharded engine round-trips and isolates periods")
+
+def test_migration():
+    """Test the one-shot JSON to SQLite migrator"""
+    print("\n🚚 Testing JSON to SQLite migration...")
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, 'rota_data.json')
+        db_path = os.path.join(tmp, 'rota_data.db')
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(SAMPLE_STORE, f)
+        count = migrate_json_to_sqlite(json_path, db_path)
+        assert count == 4, f"Expected 4 migrated cells, got {count}"
+        engine = SqliteRotaStore(db_path)
+        assert engine.get_period("Service Desk|10|2025") == SAMPLE_STORE["Service Desk|10|2025"]
+        engine.close()
+    print(f"✓ Migrated {count} cells")
+
+def test_file_cache():
+    """Test mtime/size revalidation of the JSON file cache"""
+    print("\n⚡ Testing JSON file cache...")
+    cache = JsonFileCache()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'config.json')
+        assert cache.load(path, dict) == {}, "Missing file should fall back to default"
+
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"a": 1}, f)
+        assert cache.load(path, dict) == {"a": 1}
+        assert cache.load(path, dict) == {"a": 1}
+        assert (cache.hits, cache.misses) == (1, 1)
+
+        # An external write that changes the size is picked up
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"a": 1, "b": 2}, f)
+        assert cache.load(path, dict) == {"a": 1, "b": 2}
+        assert cache.misses == 2
+
+        # Writes through the store engine refresh the entry without a re-parse
+        engine = JsonRotaStore(os.path.join(tmp, 'rota_data.json'), cache=cache)
+        engine.save_all({"Cloud Ops|1|2025": {"P|E|2025-01-06": "Night"}})
+        misses = cache.misses
+        assert engine.get_period("Cloud Ops|1|2025") == {"P|E|2025-01-06": "Night"}
+        assert cache.misses == misses, "Read after save should be a cache hit"
+    print(f"✓ Cache stats: {cache.stats()['hits']} hits, {cache.stats()['misses']} misses")
+
+def test_change_journal():
+    """Test that cell edits are journaled and replayed"""
+    print("\n📝 Testing change journal...")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'rota_data.json')
+        engine = JsonRotaStore(path, cache=JsonFileCache())
+        engine.save_all(SAMPLE_STORE)
+        snapshot_mtime = os.stat(path).st_mtime_ns
+
+        pk = "Service Desk|10|2025"
+        engine.apply_changes(pk, {"INDIA AND APAC|Adithya K G|2025-10-07": "PL"})
+        engine.apply_changes(pk, {"EMEA AND AMEC|Ramya J|2025-10-11": None})
+        assert os.stat(path).st_mtime_ns == snapshot_mtime, "Edits should not rewrite the snapshot"
+        with open(engine.journal_path, 'r', encoding='utf-8') as f:
+            assert len(f.readlines()) == 2
+
+        # A fresh engine (as on startup) replays snapshot + journal, ignoring a torn tail
+        with open(engine.journal_path, 'a', encoding='utf-8') as f:
+            f.write('{"period": "Service Desk|10|2025", "chan')
+        fresh = JsonRotaStore(path, cache=JsonFileCache())
+        replayed = fresh.get_period(pk)
+        assert fresh.get_version(pk) == engine.get_version(pk)
+        assert replayed["INDIA AND APAC|Adithya K G|2025-10-07"] == "PL"
+        assert "EMEA AND AMEC|Ramya J|2025-10-11" not in replayed
+
+        version = engine.get_version(pk)
+        assert engine.compact()
+        assert not os.path.exists(engine.journal_path)
+        assert JsonRotaStore(path, cache=JsonFileCache()).get_version(pk) == version
+        with open(path, 'r', encoding='utf-8') as f:
+            assert json.load(f)[pk] == replayed
+
+        # Crossing the size threshold compacts inline
+        small = JsonRotaStore(path, cache=JsonFileCache(), journal_compact_bytes=1)
+        small.apply_changes(pk, {"INDIA AND APAC|Adithya K G|2025-10-08": "AL"})
+        assert not os.path.exists(small.journal_path)
+        assert small.get_period(pk)["INDIA AND APAC|Adithya K G|2025-10-08"] == "AL"
+    print("✓ Journal appends, replays and compacts")
+
+if __name__ == "__main__":
+    print("🧪 Rota Storage Engine Tests")
+    print("=" * 50)
+    test_json_engine()
+    test_sqlite_engine()
+    test_sharded_engine()
+    test_migration()
+    test_file_cache()
+    test_change_journal()
+    print("\n🎉 All storage engine tests passed!")
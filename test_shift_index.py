@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+"""
+Test script for the per-period inverted shift index
+"""
+import sys
+import os
+import random
+
+# Add the app directory to path so we can import app modules
+sys.path.append(os.path.dirname(__file__))
+
+from rota_calendar import rota_month
+from rota_grid import RotaGrid
+from shift_index import PeriodIndex, ShiftIndex
+
+ROWS = [('L1', 'Asha'), ('L1', 'Ben'), ('L2', 'Chen'), ('L2', 'Dana')]
+SHIFTS = ['APAC', 'Afternoon', 'Evening', 'Night', 'PL', 'WO', 'General']
+
+def make_index(period):
+    table = rota_month(2025, 3)
+    return PeriodIndex(RotaGrid.from_period(period, ROWS, table.date_strs), table.default_shifts)
+
+def test_rows_with_defaults():
+    """Test that the index counts saved shifts and default shifts"""
+    print("\n🔎 Testing shift lookups...")
+    index = make_index({'L1|Ben|2025-03-04': 'Night', 'L2|Dana|2025-03-08': 'General'})
+    assert index.rows_with(['Night']) == {1}
+    assert index.rows_with(['Night', 'APAC']) == {1}
+    assert index.rows_with(['WO']) == {0, 1, 2, 3}
+    assert index.rows_by_shift['General'][3] == 26  # 25 weekdays plus one worked Saturday
+    assert index.rows_with(['Missing']) == set()
+    print("✓ Saved and default shifts indexed")
+
+def test_apply_matches_rebuild():
+    """Test that incrementally applied changes equal a rebuilt index"""
+    print("\n🔁 Testing incremental updates...")
+    rng = random.Random(7)
+    dates = rota_month(2025, 3).date_strs
+    period = {}
+    index = make_index(period)
+    for _ in range(200):
+        changes = {}
+        for _ in range(rng.randint(1, 5)):
+            process, emp = rng.choice(ROWS + [('Gone', 'Nobody')])
+            value = rng.choice(SHIFTS + [None, ''])
+            changes[f'{process}|{emp}|{rng.choice(dates)}'] = value
+        index = index.copy()
+        index.apply(changes)
+        for key, value in changes.items():
+            if value:
+                period[key] = value
+            else:
+                period.pop(key, None)
+        assert index.rows_by_shift == make_index(period).rows_by_shift
+        assert index.grid.to_period() == period
+    print("✓ 200 change sets applied incrementally")
+
+def test_cache_tokens():
+    """Test that the cache rebuilds on a token it was not moved to"""
+    print("\n🏷️ Testing index cache tokens...")
+    cache = ShiftIndex(max_periods=2)
+    builds = []
+
+    def build():
+        builds.append(1)
+        return make_index({})
+
+    first = cache.get('SD|3|2025', 1, build)
+    assert cache.get('SD|3|2025', 1, build) is first and len(builds) == 1
+    cache.apply('SD|3|2025', 1, 2, {'L1|Asha|2025-03-03': 'Night'})
+    second = cache.get('SD|3|2025', 2, build)
+    assert len(builds) == 1 and second.rows_with(['Night']) == {0}
+    assert first.rows_with(['Night']) == set(), "Shared index must not change under readers"
+
+    cache.apply('SD|3|2025', 5, 6, {'L1|Asha|2025-03-03': 'PL'})
+    cache.get('SD|3|2025', 6, build)
+    assert len(builds) == 2, "Out-of-order change drops the entry"
+
+    cache.get('SD|4|2025', 1, build)
+    cache.get('SD|5|2025', 1, build)
+    cache.get('SD|3|2025', 6, build)
+    assert len(builds) == 5, "Least recently used period evicted"
+    print("✓ Cache follows period versions")
+
+if __name__ == "__main__":
+    print("🧪 Shift Index Tests")
+    print("=" * 50)
+    test_rows_with_defaults()
+    test_apply_matches_rebuild()
+    test_cache_tokens()
+    print("\n🎉 All shift index tests passed!")
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+"""
+Test script for pooled SMS clients, recipient fan-out and TextLocal batching
+"""
+import sys
+import os
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+# Add the app directory to path so we can import app modules
+sys.path.append(os.path.dirname(__file__))
+
+from testing_env import isolate_app_data
+isolate_app_data()
+import app as rota_app
+from sms_clients import ClientPool, FanOut, batches
+
+class StubHandler(BaseHTTPRequestHandler):
+    """TextLocal-style endpoint: records each request, fails batches containing 'bad'"""
+    requests = []
+
+    def do_POST(self):
+        form = parse_qs(self.rfile.read(int(self.headers['Content-Length'])).decode())
+        StubHandler.requests.append(form)
+        status = 'failure' if 'bad' in form['numbers'][0] else 'success'
+        body = json.dumps({'status': status, 'errors': [{'message': 'Invalid number'}]}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def test_textlocal_batches():
+    """Test that TextLocal numbers are batched and each recipient gets its batch's result"""
+    print("\n📦 Testing TextLocal batching...")
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    config = dict(rota_app.SMS_CONFIG)
+    try:
+        rota_app.SMS_CONFIG.update(textlocal_url=f'http://127.0.0.1:{server.server_port}/send/', textlocal_batch_size=2)
+        StubHandler.requests = []
+        phones = ['+911', '+912', '+913', '+914', '+915']
+        results = rota_app.textlocal_send_each(phones, 'hello')
+        assert sorted(r['numbers'][0] for r in StubHandler.requests) == ['+911,+912', '+913,+914', '+915']
+        assert list(results) == phones and all(ok for ok, _ in results.values())
+        assert rota_app.send_textlocal_sms(phones, 'hello') == (True, 'OTP sent to 5 administrator(s)')
+
+        ok, message = rota_app.send_textlocal_sms(['+911', 'bad', '+913'], 'hello')
+        assert ok and message == 'OTP sent to 1 of 3 administrator(s); failed: +911: Invalid number; bad: Invalid number'
+    finally:
+        rota_app.SMS_CONFIG.clear()
+        rota_app.SMS_CONFIG.update(config)
+        server.shutdown()
+    print("✓ 5 numbers sent in 3 requests")
+
+def test_pooled_client_fan_out():
+    """Test that the Twilio client is built once and recipients are sent concurrently within the bound"""
+    print("\n🧵 Testing pooled client fan-out...")
+    built = []
+    running, peak = [0], [0]
+    lock = threading.Lock()
+
+    class Messages:
+        def create(self, body, from_, to):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.05)
+            with lock:
+                running[0] -= 1
+            if to == 'bad':
+                raise RuntimeError('unreachable')
+            return type('Message', (), {'sid': 'SM' + to})()
+
+    class FakeClient:
+        def __init__(self):
+            built.append(self)
+            self.messages = Messages()
+
+    clients, fan_out = rota_app.sms_clients, rota_app.sms_fan_out
+    try:
+        rota_app.sms_clients = ClientPool()
+        rota_app.sms_fan_out = FanOut(3)
+        key = ('twilio', rota_app.SMS_CONFIG['twilio_account_sid'], rota_app.SMS_CONFIG['twilio_auth_token'])
+        rota_app.sms_clients.get(key, FakeClient)
+        phones = [f'+91{i}' for i in range(6)] + ['bad']
+        started = time.time()
+        results = rota_app.twilio_send_each(phones, 'hi')
+        assert time.time() - started < 0.3, "Seven 50 ms sends on three threads"
+        assert results['+910'] == (True, 'SM+910') and results['bad'] == (False, 'unreachable')
+        assert peak[0] == 3
+        ok, message = rota_app.send_twilio_sms(['+911'], 'hi')
+        assert ok and message == 'OTP sent to 1 administrator(s)'
+        assert len(built) == 1
+    finally:
+        rota_app.sms_fan_out.shutdown()
+        rota_app.sms_clients, rota_app.sms_fan_out = clients, fan_out
+    assert list(batches('abcde', 2)) == [['a', 'b'], ['c', 'd'], ['e']]
+    print("✓ One client, at most 3 sends at once")
+
+if __name__ == "__main__":
+    print("🧪 SMS Client Tests")
+    print("=" * 50)
+    test_textlocal_batches()
+    test_pooled_client_fan_out()
+    print("\n🎉 All SMS client tests passed!")
@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+"""
+Test script for the synthetic fixture generator and the hot path benchmark
+"""
+import sys
+import os
+import json
+import tempfile
+import subprocess
+
+# Add the app directory to path so we can import app modules
+sys.path.append(os.path.dirname(__file__))
+
+from generate_synthetic_data import generate
+from rota_calendar import rota_month
+from rota_storage import JsonRotaStore
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def test_generate_fixture():
+    """Test that the generator writes a complete store and config in the app's layouts"""
+    print("\n🧪 Testing synthetic fixture...")
+    with tempfile.TemporaryDirectory() as tmp:
+        summary = generate(tmp, departments=12, employees=7, processes=3, months=14, end=(2, 2026))
+        with open(os.path.join(tmp, 'department_config.json'), encoding='utf-8') as f:
+            config = json.load(f)
+        names = list(config)
+        assert len(names) == 12 and names[0] == 'Service Desk' and names[-1] == 'Department 12'
+        employees = [emp for emps in config['Service Desk']['processes'].values() for emp in emps]
+        assert len(config['Service Desk']['processes']) == 3 and len(set(employees)) == 7
+
+        store = JsonRotaStore(os.path.join(tmp, 'rota_data.json')).load_all()
+        assert len(store) == 12 * 14
+        assert 'Service Desk|1|2025' in store and 'Service Desk|2|2026' in store and 'Service Desk|12|2024' not in store
+        days = len(rota_month(2026, 2))
+        assert len(store['Service Desk|2|2026']) == 7 * days, "Every cell of a month is stored"
+        assert summary['cells'] == sum(len(period) for period in store.values())
+        assert set(store['Messaging|6|2025'].values()) <= set(config['Messaging']['shifts'])
+
+        again = generate(tmp, departments=12, employees=7, processes=3, months=14, end=(2, 2026))
+        assert again['cells'] == summary['cells'] and JsonRotaStore(os.path.join(tmp, 'rota_data.json')).load_all() == store
+        sparse = generate(tmp, departments=2, employees=7, processes=3, months=1, end=(2, 2026), fill=0.5)
+        assert 0 < sparse['cells'] < 2 * 7 * days
+    print(f"✓ {summary['cells']} cells, reproducible from the seed")
+
+def test_bench_hot_paths():
+    """Test that the benchmark times every hot path against a fixture and leaves its data as it was"""
+    print("\n⏱️ Testing hot path benchmark...")
+    with tempfile.TemporaryDirectory() as tmp:
+        generate(tmp, departments=2, employees=5, processes=2, months=2, end=(3, 2026))
+        before = JsonRotaStore(os.path.join(tmp, 'rota_data.json')).load_all()
+        out = os.path.join(tmp, 'results.json')
+        command = [sys.executable, os.path.join(HERE, 'bench_hot_paths.py'), '--data', tmp, '--repeat', '2']
+        subprocess.run(command + ['--out', out], check=True, capture_output=True, cwd=HERE)
+        with open(out, encoding='utf-8') as f:
+            results = json.load(f)
+        assert (results['dept'], results['month'], results['year']) == ('Service Desk', 3, 2026)
+        assert results['fixture']['cells'] == sum(len(period) for period in before.values())
+        for path in ('build_rows', 'update', 'export_csv', 'night_allowances', 'weekend_allowances'):
+            for mode in ('direct', 'client'):
+                timing = results['results'][path][mode]
+                assert timing['runs'] == 2 and timing['first_ms'] > 0 and timing['median_ms'] > 0, (path, mode)
+        assert JsonRotaStore(os.path.join(tmp, 'rota_data.json')).load_all() == before
+
+        compared = subprocess.run(command + ['--out', os.path.join(tmp, 'again.json'), '--compare', out],
+                                  check=True, capture_output=True, text=True, cwd=HERE)
+        assert 'export_csv client' in compared.stdout.split('Compared with', 1)[1]
+    print("✓ Every path timed directly and through the client")
+
+if __name__ == "__main__":
+    print("🧪 Synthetic Data Tests")
+    print("=" * 50)
+    test_generate_fixture()
+    test_bench_hot_paths()
+    print("\n🎉 All synthetic data tests passed!")
@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+"""
+Test script for the in-memory reset token / OTP store
+"""
+import sys
+import os
+import json
+import tempfile
+import threading
+from datetime import datetime, timedelta
+
+# Add the app directory to path so we can import app modules
+sys.path.append(os.path.dirname(__file__))
+
+from token_store import TokenStore
+
+def token_data(minutes, **extra):
+    data = {'department': 'Service Desk', 'expiry': (datetime.now() + timedelta(minutes=minutes)).isoformat()}
+    data.update(extra)
+    return data
+
+def test_expiry_heap():
+    """Test that expire() drops only tokens past their expiry"""
+    print("\n⏰ Testing token expiry...")
+    with tempfile.TemporaryDirectory() as tmp:
+        store = TokenStore(os.path.join(tmp, 'tokens.json'))
+        store.add('old', token_data(-5))
+        store.add('older', token_data(-10))
+        store.add('fresh', token_data(30))
+        store.add('readded', token_data(-1))
+        store.add('readded', token_data(30))  # stale heap entry must be ignored
+        store.remove('older')
+
+        assert store.expire() == 1
+        assert store.get('old') is None
+        assert store.get('fresh') is not None
+        assert store.get('readded') is not None
+        assert len(store) == 2
+    print("✓ Expired tokens removed, live tokens kept")
+
+def test_atomic_attempts():
+    """Test concurrent attempt counting"""
+    print("\n🔢 Testing atomic attempt counter...")
+    with tempfile.TemporaryDirectory() as tmp:
+        store = TokenStore(os.path.join(tmp, 'tokens.json'))
+        store.add('123456', token_data(10, type='otp', attempts=0))
+
+        threads = [threading.Thread(target=lambda: [store.increment('123456') for _ in range(100)]) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert store.get('123456')['attempts'] == 800
+        assert store.increment('missing') is None
+    print("✓ 800 concurrent increments counted")
+
+def test_write_behind():
+    """Test that new tokens reach disk at once, expiries on flush, merged with other processes"""
+    print("\n💾 Testing token persistence...")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'tokens.json')
+        store = TokenStore(path)
+        store.add('a', token_data(30))
+        with open(path, 'r', encoding='utf-8') as f:
+            assert set(json.load(f)) == {'a'}, "A new token is written without waiting for a flush"
+        assert TokenStore(path).get('a') is not None, "Another worker can check it straight away"
+
+        # Another worker process creates one token and consumes another
+        other = TokenStore(path)
+        other.add('b', token_data(30))
+        other.remove('a')
+        other.flush()
+        assert store.get('b') is not None, "Token written by another process should be visible"
+        assert store.get('a') is None, "Token consumed by another process should be gone"
+
+        store.add('c', token_data(30))
+        store.add('stale', token_data(-1))
+        assert store.expire() == 1
+        with open(path, 'r', encoding='utf-8') as f:
+            assert set(json.load(f)) == {'b', 'c', 'stale'}, "Expiry is written behind"
+        store.flush()
+        with open(path, 'r', encoding='utf-8') as f:
+            assert set(json.load(f)) == {'b', 'c'}
+    print("✓ Writes merge with tokens written by other processes")
+
+def test_write_through_across_workers():
+    """Test that OTP attempts and token consumption are shared by worker processes at once"""
+    print("\n🔐 Testing write-through attempts and consumption...")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'tokens.json')
+        first, second = TokenStore(path), TokenStore(path)
+        first.add('123456', token_data(10, type='otp', attempts=0))
+        first.add('reset-token', token_data(30))
+        first.flush()
+
+        # Each worker's failed guess counts against the same budget without waiting for a flush
+        assert first.increment('123456') == 1
+        assert second.increment('123456') == 2
+        assert first.increment('123456') == 3
+        assert second.get('123456')['attempts'] == 3
+
+        # Only one worker consumes a token; the other sees it gone straight away
+        assert second.remove('reset-token') is True
+        assert first.remove('reset-token') is False
+        assert first.get('reset-token') is None
+        assert TokenStore(path).get('123456')['attempts'] == 3
+    print("✓ Attempts and consumption visible to every worker immediately")
+
+if __name__ == "__main__":
+    print("🧪 Token Store Tests")
+    print("=" * 50)
+    test_expiry_heap()
+    test_atomic_attempts()
+    test_write_behind()
+    test_write_through_across_workers()
+    print("\n🎉 All token store tests passed!")
@@ -0,0 +1,20 @@
+"""
+Test scripts call isolate_app_data() before importing app, so the app runs
+against a throwaway data directory (never the tracked data/) and starts no
+notification workers, token sweeper or journal compactor.
+"""
+import os
+import atexit
+import shutil
+import tempfile
+
+
+def isolate_app_data() -> str:
+    """Point ROTA_DATA_DIR at one temporary directory per test run and switch background work off"""
+    # Processes spawned by a test (allowance batch workers) inherit the directory in use
+    if 'ROTA_TEST_DATA_DIR' not in os.environ:
+        os.environ['ROTA_TEST_DATA_DIR'] = tempfile.mkdtemp(prefix='rota-test-')
+        os.environ['ROTA_DATA_DIR'] = os.environ['ROTA_TEST_DATA_DIR']
+        atexit.register(shutil.rmtree, os.environ['ROTA_TEST_DATA_DIR'], True)
+    os.environ['ROTA_BACKGROUND_WORKERS'] = '0'
+    return os.environ['ROTA_DATA_DIR']
@@ -0,0 +1,203 @@
+"""
+In-memory store for password reset tokens and SMS OTPs.
+
+Tokens live in a dict with a min-heap of expiry times beside it, so
+expiring the oldest ones is O(log n) and checking a token only stats the
+file. Adding a token, removing one (consuming it) and counting OTP attempts
+are written through to password_reset_tokens.json (same layout as before)
+under the file lock at once: another worker process can check a new reset
+link or OTP straight away, and cannot reuse a consumed token or hand out
+fresh attempts. Only expiry is written behind, by a background thread that
+sweeps expired tokens every few seconds. Reads and writes merge with the
+file whenever it changes, so tokens that another worker process created or
+consumed are seen here too.
+"""
+import os
+import json
+import heapq
+import atexit
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from file_cache import file_lock, file_signature
+
+
+def _expiry_ts(data: Dict) -> float:
+    return datetime.fromisoformat(data['expiry']).timestamp()
+
+
+class TokenStore:
+    """Reset tokens and OTPs keyed by token string, with TTL expiry"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock_path = os.path.splitext(path)[0] + '.lock'
+        self._tokens: Dict[str, Dict] = {}
+        # (expiry timestamp, token); entries for removed tokens are skipped lazily
+        self._heap: List[Tuple[float, str]] = []
+        # Tokens added/changed or removed here since the last flush
+        self._changed: Set[str] = set()
+        self._removed: Set[str] = set()
+        self._disk_signature = None
+        self._loaded = False
+        self._lock = threading.RLock()
+        self._sweeper: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    # --- persistence ---
+    def _read_file(self) -> Dict[str, Dict]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception:
+            logging.exception("Could not read %s", self.path)
+            return {}
+
+    def _merge(self, disk: Dict[str, Dict]) -> None:
+        """Combine the file's tokens with the changes made here since the last flush"""
+        merged = {token: data for token, data in disk.items() if token not in self._removed}
+        for token in self._changed:
+            if token in self._tokens:
+                merged[token] = self._tokens[token]
+        for token, data in merged.items():
+            if token not in self._tokens:
+                heapq.heappush(self._heap, (_expiry_ts(data), token))
+        self._tokens = merged
+        self._disk_signature = file_signature(self.path)
+
+    def _ensure_loaded(self) -> None:
+        if not self._loaded:
+            self._merge(self._read_file())
+            self._loaded = True
+
+    def _refresh_if_changed(self) -> None:
+        if file_signature(self.path) != self._disk_signature:
+            self._merge(self._read_file())
+
+    def _write(self) -> None:
+        # Caller holds self._lock and the file lock and has merged with the file
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self._tokens, f, indent=2)
+        os.replace(tmp, self.path)
+        self._disk_signature = file_signature(self.path)
+        self._changed.clear()
+        self._removed.clear()
+
+    def flush(self) -> None:
+        """Write pending changes to disk, merged with whatever is there now"""
+        with self._lock:
+            self._ensure_loaded()
+            if not self._changed and not self._removed:
+                return
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with file_lock(self.lock_path):
+                self._merge(self._read_file())
+                self._write()
+
+    # --- token operations ---
+    def add(self, token: str, data: Dict) -> None:
+        """Store a token and write it through at once; data must carry an ISO 'expiry' timestamp"""
+        with self._lock:
+            self._ensure_loaded()
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with file_lock(self.lock_path):
+                self._merge(self._read_file())
+                self._tokens[token] = dict(data)
+                self._changed.add(token)
+                self._removed.discard(token)
+                heapq.heappush(self._heap, (_expiry_ts(data), token))
+                self._write()
+
+    def get(self, token: str) -> Optional[Dict]:
+        """Return a copy of a token's data, or None if unknown"""
+        with self._lock:
+            self._ensure_loaded()
+            # A stat call; the file is only re-read after another process wrote it
+            self._refresh_if_changed()
+            data = self._tokens.get(token)
+            return dict(data) if data is not None else None
+
+    def remove(self, token: str) -> bool:
+        """
+        Remove a token and write it through at once; True only for the one
+        caller (in any process) that removed it, so use it to consume tokens
+        """
+        with self._lock:
+            self._ensure_loaded()
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with file_lock(self.lock_path):
+                self._merge(self._read_file())
+                if self._tokens.pop(token, None) is None:
+                    return False
+                self._changed.discard(token)
+                self._removed.add(token)
+                self._write()
+            return True
+
+    def increment(self, token: str, field: str = 'attempts') -> Optional[int]:
+        """Add one to a counter on a token across processes (written through), return the new value"""
+        with self._lock:
+            self._ensure_loaded()
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with file_lock(self.lock_path):
+                self._merge(self._read_file())
+                data = self._tokens.get(token)
+                if data is None:
+                    return None
+                data = self._tokens[token] = dict(data, **{field: data.get(field, 0) + 1})
+                self._changed.add(token)
+                self._write()
+            return data[field]
+
+    def expire(self, now: Optional[datetime] = None) -> int:
+        """Drop every token whose expiry has passed, return how many were dropped"""
+        now_ts = (now or datetime.now()).timestamp()
+        expired = 0
+        with self._lock:
+            self._ensure_loaded()
+            while self._heap and self._heap[0][0] < now_ts:
+                expiry, token = heapq.heappop(self._heap)
+                data = self._tokens.get(token)
+                # Skip stale heap entries for tokens removed or re-added since
+                if data is not None and _expiry_ts(data) == expiry:
+                    del self._tokens[token]
+                    self._changed.discard(token)
+                    self._removed.add(token)
+                    expired += 1
+        return expired
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._ensure_loaded()
+            return len(self._tokens)
+
+    # --- background sweeper ---
+    def start_sweeper(self, interval: float) -> None:
+        """Expire tokens and flush changes every interval seconds on a daemon thread"""
+        if self._sweeper is not None:
+            return
+
+        def run():
+            while not self._stop.wait(interval):
+                try:
+                    self.expire()
+                    self.flush()
+                except Exception:
+                    logging.exception("Token sweep failed")
+
+        self._sweeper = threading.Thread(target=run, name='token-sweeper', daemon=True)
+        self._sweeper.start()
+        atexit.register(self.flush)
+
+    def stop_sweeper(self) -> None:
+        if self._sweeper is not None:
+            self._stop.set()
+            self._sweeper.join()
+            self._sweeper = None
+            self._stop.clear()
+        self.flush()